@@ -1,12 +1,27 @@
 """
 Analyze PDF filenames to identify states and license types,
 then create a reference list for finding blank forms.
+
+With --catalog, each scanned file is recorded in the catalog (see
+catalog.py), and the list in blank_forms_needed.txt is queried from it: it
+covers every catalogued input still present, across all the directories
+scanned so far.
+
+Usage:
+    python analyze_applications.py                     # PDFs in the current directory
+    python analyze_applications.py -d /mnt/intake -r --catalog   # whole intake share, recursively
+    python analyze_applications.py --catalog --hash    # also fill in content hashes
 """
 
+import argparse
+import os
 import re
+import time
 from pathlib import Path
 from collections import defaultdict
 
+from catalog import add_catalog_arguments, catalog_from_args
+
 # State abbreviations mapping
 STATE_ABBREVIATIONS = {
     'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas',
@@ -24,43 +39,71 @@ STATE_ABBREVIATIONS = {
     'WI': 'Wisconsin', 'WY': 'Wyoming'
 }
 
-def parse_filename(filename):
-    """Extract state, license type, and application type from filename."""
-    filename_upper = filename.upper()
-    
-    # Find state abbreviation
-    state = None
-    for abbrev in STATE_ABBREVIATIONS.keys():
-        if f' {abbrev} ' in filename_upper or filename_upper.startswith(abbrev) or f'- {abbrev}' in filename_upper:
-            state = abbrev
-            break
+# License types in match priority. 'ARNP' and 'FNP' contain 'NP' (and
+# 'ARNP' contains 'RN'), so they are tested first.
+LICENSE_TYPES = (
+    'ARNP',  # Advanced Registered Nurse Practitioner
+    'FNP',   # Family Nurse Practitioner
+    'NP',    # Nurse Practitioner
+    'RN',    # Registered Nurse
+    'MD',    # Medical Doctor
+    'CSR',   # Controlled Substance Registration
+    'CDS',   # Controlled Dangerous Substance
+)
+
+# (filename token, application type) in match priority
+APP_TYPES = (
+    ('INITIAL', 'Initial'),
+    ('RENEWAL', 'Renewal'),
+    ('RX AUTH', 'RX Authorization'),
+)
+
+# A state matches at the start of the name, as a ' XX ' word, or after '- '.
+# When several do, the earliest in STATE_ABBREVIATIONS wins.
+_STATE_RANK = {abbrev: rank for rank, abbrev in enumerate(STATE_ABBREVIATIONS)}
+
+def _alternation(words):
+    """Regex alternation of two-letter words grouped by first letter (A[LKZR]|C[AOT]|...)."""
+    by_first = defaultdict(list)
+    for word in words:
+        by_first[word[0]].append(word[1])
+    return "|".join(f"{first}[{''.join(seconds)}]" for first, seconds in by_first.items())
+
+# ' XX' followed by a space or preceded by '-': both contexts start with a
+# space, so the regex engine only stops at spaces
+_STATE_CONTEXT = re.compile(
+    rf" (?:({_alternation(STATE_ABBREVIATIONS)})(?= )|(?<=- )({_alternation(STATE_ABBREVIATIONS)}))"
+)
+
+def classify(filename_upper):
+    """(state, license_type, app_type) of an upper-cased filename; None where not found."""
+    # State: best-ranked of the name's first two letters and every ' XX'
+    # context found in one scan
+    state = filename_upper[:2]
+    best = _STATE_RANK.get(state, len(_STATE_RANK))
+    for word, after_dash in _STATE_CONTEXT.findall(filename_upper):
+        rank = _STATE_RANK[word or after_dash]
+        if rank < best:
+            state, best = word or after_dash, rank
+    if best == len(_STATE_RANK):
+        state = None
     
-    # Find license type
+    # License and application type: first token in priority order that occurs
     license_type = None
-    if 'NP' in filename_upper:
-        license_type = 'NP'  # Nurse Practitioner
-    elif 'RN' in filename_upper:
-        license_type = 'RN'  # Registered Nurse
-    elif 'MD' in filename_upper:
-        license_type = 'MD'  # Medical Doctor
-    elif 'CSR' in filename_upper:
-        license_type = 'CSR'  # Controlled Substance Registration
-    elif 'CDS' in filename_upper:
-        license_type = 'CDS'  # Controlled Dangerous Substance
-    elif 'ARNP' in filename_upper:
-        license_type = 'ARNP'  # Advanced Registered Nurse Practitioner
-    elif 'FNP' in filename_upper:
-        license_type = 'FNP'  # Family Nurse Practitioner
-    
-    # Find application type
+    for token in LICENSE_TYPES:
+        if token in filename_upper:
+            license_type = token
+            break
     app_type = None
-    if 'INITIAL' in filename_upper or 'INITIAL' in filename_upper:
-        app_type = 'Initial'
-    elif 'RENEWAL' in filename_upper:
-        app_type = 'Renewal'
-    elif 'RX AUTH' in filename_upper or 'RX AUTH' in filename_upper:
-        app_type = 'RX Authorization'
-    
+    for token, name in APP_TYPES:
+        if token in filename_upper:
+            app_type = name
+            break
+    return state, license_type, app_type
+
+def parse_filename(filename):
+    """Extract state, license type, and application type from filename."""
+    state, license_type, app_type = classify(filename.upper())
     return {
         'state': state,
         'state_name': STATE_ABBREVIATIONS.get(state, 'Unknown'),
@@ -69,29 +112,87 @@ def parse_filename(filename):
         'filename': filename
     }
 
+def parse_filenames(filenames):
+    """parse_filename for a list of names, in order (names seen before are classified once)."""
+    state_names = STATE_ABBREVIATIONS
+    seen = {}
+    results = []
+    for filename in filenames:
+        parsed = seen.get(filename)
+        if parsed is None:
+            parsed = seen[filename] = classify(filename.upper())
+        state, license_type, app_type = parsed
+        results.append({
+            'state': state,
+            'state_name': state_names.get(state, 'Unknown'),
+            'license_type': license_type,
+            'app_type': app_type,
+            'filename': filename
+        })
+    return results
+
+# Output folders of the batch scripts, never scanned for originals
+OUTPUT_DIRS = {"cleared_pdfs", "purged_pdfs"}
+
+def is_original_pdf(name):
+    """True for an input PDF, not a processed output, test or blank form."""
+    lower = name.lower()
+    return (lower.endswith(".pdf") and
+            "_cleared" not in name and
+            "_flattened" not in name and
+            "_purged" not in name and
+            "test" not in lower and
+            "blank" not in lower)
+
+def scan_pdfs(root=".", recursive=False):
+    """
+    Yield (path, name) of every original PDF under root, using os.scandir.
+    Recursive scans skip hidden directories, the batch output folders and
+    symlinked directories.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name[-4:].lower() == ".pdf":
+                        if is_original_pdf(name) and entry.is_file():
+                            yield entry.path, name
+                    elif (recursive and name not in OUTPUT_DIRS and not name.startswith(".")
+                          and entry.is_dir(follow_symlinks=False)):
+                        stack.append(entry.path)
+        except OSError as e:
+            print(f"Skipping {directory}: {e}")
+
 def main():
-    current_dir = Path(".")
+    parser = argparse.ArgumentParser(description="Classify application PDFs by state, license and application type.")
+    parser.add_argument("-d", "--directory", default=".", help="Directory to scan (default: current directory)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Also scan subdirectories")
+    parser.add_argument("--hash", action="store_true",
+                        help="Hash new and changed files for the catalog now (default: on their next batch run)")
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+    catalog = catalog_from_args(args)
     
     # Find all original PDF files
-    pdf_files = []
-    for pdf_file in current_dir.glob("*.pdf"):
-        if ("_cleared" not in pdf_file.name and 
-            "_flattened" not in pdf_file.name and 
-            "_purged" not in pdf_file.name and
-            "test" not in pdf_file.name.lower() and 
-            "blank" not in pdf_file.name.lower() and
-            pdf_file.parent.name != "cleared_pdfs" and
-            pdf_file.parent.name != "purged_pdfs"):
-            pdf_files.append(pdf_file.name)
-    
-    print(f"Found {len(pdf_files)} original PDF files\n")
-    print("=" * 80)
+    started = time.perf_counter()
+    pdf_paths = sorted(scan_pdfs(args.directory, args.recursive), key=lambda entry: entry[1])
+    pdf_files = [name for _, name in pdf_paths]
     
     # Parse all files
-    applications = []
-    for filename in sorted(pdf_files):
-        info = parse_filename(filename)
-        applications.append(info)
+    applications = parse_filenames(pdf_files)
+    elapsed = time.perf_counter() - started
+    
+    if catalog:
+        synced = catalog.sync_inputs(zip((path for path, _ in pdf_paths), applications),
+                                     root=args.directory, recursive=args.recursive, hash_contents=args.hash)
+        print(f"Catalog {args.catalog}: {synced['scanned']} file(s) recorded, {synced['hashed']} hashed, "
+              f"{synced['missing']} no longer present")
+    
+    print(f"Found {len(pdf_files)} original PDF files (scanned and classified in {elapsed:.2f}s)\n")
+    print("=" * 80)
     
     # Group by state and license type
     grouped = defaultdict(list)
@@ -116,18 +217,23 @@ def main():
     print("\n" + "=" * 80)
     print("\nDETAILED LIST FOR BLANK FORM SEARCH:\n")
     
-    unique_apps = {}
-    for app in applications:
-        key = (app['state'], app['license_type'], app['app_type'])
-        if key not in unique_apps:
-            unique_apps[key] = app
-    
-    # Sort with None handling
-    sorted_apps = sorted(unique_apps.items(), key=lambda x: (
-        x[0][0] or 'ZZZ',  # state
-        x[0][1] or 'ZZZ',  # license_type
-        x[0][2] or 'ZZZ'   # app_type
-    ))
+    if catalog:
+        sorted_apps = [((app['state'], app['license_type'], app['app_type']), app)
+                       for app in catalog.forms_needed(known_only=False)]
+        catalog.close()
+    else:
+        unique_apps = {}
+        for app in applications:
+            key = (app['state'], app['license_type'], app['app_type'])
+            if key not in unique_apps:
+                unique_apps[key] = app
+        
+        # Sort with None handling
+        sorted_apps = sorted(unique_apps.items(), key=lambda x: (
+            x[0][0] or 'ZZZ',  # state
+            x[0][1] or 'ZZZ',  # license_type
+            x[0][2] or 'ZZZ'   # app_type
+        ))
     
     for (state, license_type, app_type), app in sorted_apps:
         print(f"\n{app['state_name']} ({state or 'Unknown'}) - {license_type or 'Unknown'} - {app_type or 'Unknown'}")
@@ -156,7 +262,7 @@ def main():
             f.write("\n")
     
     print(f"\n\nSummary saved to: {output_file}")
-    print(f"\nTotal unique application types needed: {len(unique_apps)}")
+    print(f"\nTotal unique application types needed: {len(sorted_apps)}")
 
 if __name__ == "__main__":
     main()
@@ -3,45 +3,109 @@ Batch process all PDFs using clear_then_flatten approach
 and save them to a new folder.
 """
 
-import os
-import sys
+import argparse
+import io
 from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject
 
-def clear_and_flatten_pdf(input_path: str, output_path: str) -> bool:
+import pdf_metrics
+from batch_manifest import MANIFEST_NAME, BatchManifest
+from batch_runner import run_batch
+from catalog import add_catalog_arguments, catalog_from_args
+from pdf_streams import PdfSource, deliver, read_source
+from save_profiles import DEFAULT_PROFILE, PYPDF_PROFILES, pypdf_bytes, write_pypdf
+
+def _qualified_name(field: DictionaryObject) -> str:
+    """Fully qualified field name: the /T values from the root field down, joined by dots."""
+    parts = []
+    node, depth = field, 0
+    while isinstance(node, dict) and depth < 32:
+        if "/T" in node:
+            parts.append(str(node["/T"]))
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+        depth += 1
+    return ".".join(reversed(parts))
+
+
+def field_page_index(writer: PdfWriter) -> Dict[int, List[str]]:
+    """
+    Map page number -> qualified names of the fields whose widgets are on
+    that page, built from each page's widget annotations in one pass.
+    """
+    index: Dict[int, List[str]] = {}
+    for page_num, page in enumerate(writer.pages):
+        annots = page.get("/Annots")
+        annots = annots.get_object() if annots is not None else None
+        if not annots:
+            continue
+        names = {}
+        for ref in annots:
+            annot = ref.get_object()
+            if not isinstance(annot, dict) or annot.get("/Subtype") != "/Widget":
+                continue
+            # Same field lookup as PdfWriter.update_page_form_field_values
+            if "/FT" in annot and "/T" in annot:
+                field = annot
+            else:
+                parent = annot.get("/Parent")
+                field = parent.get_object() if parent is not None else annot
+            names[_qualified_name(field)] = True
+        if names:
+            index[page_num] = list(names)
+    return index
+
+
+def clear_and_flatten_reader(reader: PdfReader) -> PdfWriter:
+    """
+    Clear and flatten an open PDF; returns a writer holding the result.
+    A field name -> page index built once from the widget annotations lets
+    each page be cleared and flattened with only its own fields, so the
+    cost grows with the number of widgets rather than pages x fields.
+    """
+    # Clone the whole document so the AcroForm comes along with the pages
+    with pdf_metrics.stage("pages"):
+        writer = PdfWriter(clone_from=reader)
+    pdf_metrics.count("pages", len(writer.pages))
+
+    if "/AcroForm" not in writer._root_object:
+        return writer
+
+    with pdf_metrics.stage("fields"):
+        index = field_page_index(writer)
+    pdf_metrics.count("fields", sum(len(names) for names in index.values()))
+
+    # Empty each page's fields and stamp their blank appearances into the
+    # page content in one call per page, then drop the widgets (flatten=
+    # needs pypdf 5.8+; requirements.txt pins a release that has it)
+    with pdf_metrics.stage("flatten"):
+        for page_num, names in index.items():
+            page = writer.pages[page_num]
+            try:
+                writer.update_page_form_field_values(page, {name: "" for name in names},
+                                                     auto_regenerate=False, flatten=True)
+            except Exception:
+                pass
+            page[NameObject("/Annots")] = ArrayObject(
+                ref for ref in page["/Annots"].get_object()
+                if ref.get_object().get("/Subtype") != "/Widget")
+        del writer._root_object["/AcroForm"]
+
+    return writer
+
+
+def clear_and_flatten_pdf(input_path: str, output_path: str, profile: str = DEFAULT_PROFILE) -> bool:
     """Clear and flatten a single PDF file."""
     try:
-        reader = PdfReader(input_path)
-        writer = PdfWriter()
-
-        # Copy pages
-        for page in reader.pages:
-            writer.add_page(page)
-
-        # Attempt to clear form fields
-        fields = reader.get_fields()
-        if fields:
-            # Update each field value to empty
-            # Need to update for each page that has fields
-            for page_num, page in enumerate(writer.pages):
-                try:
-                    writer.update_page_form_field_values(
-                        page,
-                        {name: "" for name in fields.keys()}
-                    )
-                except Exception:
-                    pass
-
-        # Flatten form fields (best-effort)
-        try:
-            writer.flatten_annotations()
-        except Exception:
-            # Some versions may not have this; still save cleared values
-            pass
+        with pdf_metrics.stage("open"):
+            reader = PdfReader(input_path)
+        writer = clear_and_flatten_reader(reader)
 
         # Write output
-        with open(output_path, "wb") as f:
-            writer.write(f)
+        with pdf_metrics.stage("save"):
+            write_pypdf(writer, output_path, profile)
         
         return True
     except Exception as e:
@@ -49,7 +113,27 @@ def clear_and_flatten_pdf(input_path: str, output_path: str) -> bool:
         return False
 
 
+def clear_and_flatten_bytes(source: PdfSource, destination: Optional[BinaryIO] = None,
+                            profile: str = DEFAULT_PROFILE) -> bytes:
+    """Clear and flatten an in-memory PDF (bytes or readable buffer); returns the output bytes."""
+    writer = clear_and_flatten_reader(PdfReader(io.BytesIO(read_source(source))))
+    return deliver(pypdf_bytes(writer, profile), destination)
+
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Worker processes (default: 1, 0 = one per CPU)")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Reprocess files even if unchanged since the last run")
+    parser.add_argument("-p", "--profile", choices=list(PYPDF_PROFILES), default=DEFAULT_PROFILE,
+                        help="Save profile (default: standard)")
+    pdf_metrics.add_metrics_arguments(parser)
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+    metrics = pdf_metrics.writer_from_args(args)
+    catalog = catalog_from_args(args)
+    
     # Get the current directory
     current_dir = Path(".")
     output_dir = Path("cleared_pdfs")
@@ -66,21 +150,41 @@ def main():
     
     print(f"Found {len(pdf_files)} PDF file(s) to process...\n")
     
-    successful = 0
-    failed = 0
+    # Create output paths in the cleared_pdfs folder
+    tasks = [(str(pdf_file), str(output_dir / pdf_file.name), args.profile) for pdf_file in sorted(pdf_files)]
     
-    for pdf_file in pdf_files:
-        # Create output path in the cleared_pdfs folder
-        output_path = output_dir / pdf_file.name
-        
-        print(f"Processing: {pdf_file.name}...", end=" ")
-        
-        if clear_and_flatten_pdf(str(pdf_file), str(output_path)):
-            print(f"[OK] -> {output_path}")
-            successful += 1
+    # Skip inputs whose content, profile and output are unchanged since the last run
+    manifest = BatchManifest(str(output_dir / MANIFEST_NAME))
+    options = {'profile': args.profile}
+    if not args.force:
+        tasks = manifest.filter_tasks(tasks, "clear_and_flatten", options)
+        skipped = len(pdf_files) - len(tasks)
+        if skipped:
+            print(f"Skipping {skipped} unchanged file(s) (use --force to reprocess)\n")
+    
+    def report(result):
+        name = Path(result['input']).name
+        if metrics:
+            metrics.write(result['metrics'])
+        if catalog:
+            catalog.record_run(result, "clear_and_flatten", options, manifest.input_hash(result['input']))
+        if result['ok']:
+            manifest.record(result['input'], result['output'], "clear_and_flatten", options)
+            print(f"Processing: {name}... [OK] -> {result['output']}")
         else:
-            print(f"[FAILED]")
-            failed += 1
+            print(f"Processing: {name}... [FAILED]")
+    
+    try:
+        results = run_batch(clear_and_flatten_pdf, tasks, jobs=args.jobs, on_result=report,
+                            metrics_label="clear_and_flatten" if metrics or catalog else None)
+    finally:
+        manifest.save()
+        if metrics:
+            metrics.close()
+        if catalog:
+            catalog.close()
+    successful = sum(1 for r in results if r['ok'])
+    failed = len(results) - successful
     
     print(f"\nCompleted: {successful} successful, {failed} failed")
     print(f"Output folder: {output_dir.absolute()}")
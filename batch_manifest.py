@@ -0,0 +1,149 @@
+"""
+Incremental build manifest for the PDF batch scripts.
+Records each input's content hash, the pipeline and options used, and the
+hash of the output it produced, so reruns only touch new or changed files.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+MANIFEST_NAME = ".pdf_manifest.json"
+MANIFEST_VERSION = 1
+
+# Save the manifest after this many new records, so an interrupted run
+# keeps most of its progress.
+SAVE_EVERY = 50
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stat_key(path: str) -> Optional[tuple]:
+    """(size, mtime_ns) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def normalize_options(options: Optional[dict]) -> str:
+    """Canonical JSON string of a run's options, for comparing and storing them."""
+    return json.dumps(options or {}, sort_keys=True, default=str)
+
+
+class BatchManifest:
+    """
+    Persistent record of processed inputs, stored as JSON next to the outputs.
+
+    Content hashes are only recomputed when a file's size or mtime differs
+    from the recorded value, so an unchanged archive is checked with one
+    stat() per input and output instead of re-reading every byte.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.entries = {}
+        self._dirty = 0
+        self._hashes = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError):
+                # A corrupt manifest only costs one full rebuild
+                self.entries = {}
+
+    @staticmethod
+    def _key(input_path: str) -> str:
+        return str(Path(input_path).resolve())
+
+    def _current_hash(self, path: str, recorded_stat=None, recorded_hash=None) -> Optional[str]:
+        """Hash of path, reusing recorded_hash when the stat is unchanged."""
+        stat = stat_key(path)
+        if stat is None:
+            return None
+        if recorded_stat is not None and tuple(recorded_stat) == stat and recorded_hash:
+            return recorded_hash
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat:
+            return cached[1]
+        digest = file_sha256(path)
+        self._hashes[path] = (stat, digest)
+        return digest
+
+    def input_hash(self, input_path: str) -> Optional[str]:
+        """
+        Content hash of input_path, reusing the recorded hash (or one computed
+        earlier in this run) while the file's size and mtime are unchanged.
+        """
+        entry = self.entries.get(self._key(input_path)) or {}
+        return self._current_hash(input_path, entry.get("input_stat"), entry.get("input_sha256"))
+
+    def needs_processing(self, input_path: str, output_path: str,
+                         pipeline: str, options: Optional[dict] = None) -> bool:
+        """
+        True if input_path must be (re)processed: it is new, its content,
+        pipeline or options changed, or its output is missing or stale.
+        """
+        entry = self.entries.get(self._key(input_path))
+        if entry is None:
+            return True
+        if (entry.get("pipeline") != pipeline
+                or entry.get("options") != normalize_options(options)
+                or entry.get("output") != str(Path(output_path).resolve())):
+            return True
+
+        input_hash = self._current_hash(input_path, entry.get("input_stat"), entry.get("input_sha256"))
+        if input_hash != entry.get("input_sha256"):
+            return True
+
+        output_hash = self._current_hash(output_path, entry.get("output_stat"), entry.get("output_sha256"))
+        if output_hash is None or output_hash != entry.get("output_sha256"):
+            return True
+
+        # Content unchanged; refresh stats so the next run skips hashing
+        entry["input_stat"] = list(stat_key(input_path))
+        entry["output_stat"] = list(stat_key(output_path))
+        return False
+
+    def record(self, input_path: str, output_path: str,
+               pipeline: str, options: Optional[dict] = None) -> None:
+        """Record a successful run of pipeline over input_path."""
+        self.entries[self._key(input_path)] = {
+            "input_stat": list(stat_key(input_path)),
+            "input_sha256": self._current_hash(input_path),
+            "pipeline": pipeline,
+            "options": normalize_options(options),
+            "output": str(Path(output_path).resolve()),
+            "output_stat": list(stat_key(output_path)),
+            "output_sha256": self._current_hash(output_path),
+        }
+        self._dirty += 1
+        if self._dirty >= SAVE_EVERY:
+            self.save()
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+    def filter_tasks(self, tasks: list, pipeline: str, options: Optional[dict] = None) -> list:
+        """Return the (input, output, ...) tasks that need processing."""
+        return [task for task in tasks
+                if self.needs_processing(task[0], task[1], pipeline, options)]
@@ -3,11 +3,20 @@ Batch process all PDFs using pdf_purge_and_redact.py approach
 and save them to a new folder.
 """
 
-import os
-import sys
+import argparse
 from pathlib import Path
+from typing import Iterable, Optional, Tuple
 import fitz  # PyMuPDF
 
+import pdf_metrics
+from batch_manifest import MANIFEST_NAME, BatchManifest, file_sha256
+from batch_runner import peak_rss_summary, run_batch
+from catalog import add_catalog_arguments, catalog_from_args
+from pdf_purge_and_redact import apply_redaction_zones
+from memory_budget import MemoryBudget, MemoryLimitExceeded, add_memory_arguments, budget_from_args
+from zone_registry import REGISTRY_NAME, load_registry
+from save_profiles import DEFAULT_PROFILE, SAVE_PROFILES, discard_copy, open_document, save_document
+
 
 def purge_widgets(page: fitz.Page) -> int:
     """Delete/clear AcroForm widgets (text fields, checkboxes, etc.)."""
@@ -67,31 +76,136 @@ def remove_embedded_files(doc: fitz.Document) -> int:
     return removed
 
 
-def process_pdf(input_path: str, output_path: str) -> bool:
-    """Process a single PDF file with purge and redact approach."""
-    try:
-        doc = fitz.open(input_path)
-
-        total_widgets = 0
-        total_annots = 0
-
-        for page in doc:
+def purge_pages(doc: fitz.Document, pages: Iterable[int]) -> Tuple[int, int]:
+    """Purge widgets and annotations on the given pages; returns (widgets, annotations)."""
+    total_widgets = 0
+    total_annots = 0
+    for page_num in pages:
+        page = doc[page_num]
+        with pdf_metrics.stage("widgets"):
             total_widgets += purge_widgets(page)
+        with pdf_metrics.stage("annotations"):
             total_annots += purge_annotations(page)
+    return total_widgets, total_annots
 
+
+def purge_document(doc: fitz.Document, purged: Optional[Tuple[int, int]] = None) -> dict:
+    """
+    Purge widgets, annotations and embedded files from an open document.
+    purged: (widgets, annotations) already removed by purge_pages, in which
+    case only the document-level purge runs here.
+    """
+    if purged is None:
+        purged = purge_pages(doc, range(doc.page_count))
+    total_widgets, total_annots = purged
+
+    with pdf_metrics.stage("embedded_files"):
         embedded_removed = remove_embedded_files(doc)
 
+    pdf_metrics.count("pages", doc.page_count)
+    pdf_metrics.count("widgets", total_widgets)
+    pdf_metrics.count("annotations", total_annots)
+    pdf_metrics.count("embedded_files", embedded_removed)
+
+    return {
+        "widgets": total_widgets,
+        "annotations": total_annots,
+        "embedded_files": embedded_removed,
+    }
+
+
+def _process_pdf_chunked(input_path: str, output_path: str, profile: str,
+                         zone_registry: Optional[str], memory: MemoryBudget) -> None:
+    """Bounded-memory variant of process_pdf: pages are purged chunk by chunk."""
+    work = memory.open(input_path, output_path)
+    try:
+        zones = None
+        if zone_registry:
+            with pdf_metrics.stage("zone_lookup"):
+                zones = load_registry(zone_registry).zones_for(input_path, work.doc)
+
+        widgets = annots = 0
+        for pages in work.chunks():
+            w, a = purge_pages(work.doc, pages)
+            widgets += w
+            annots += a
+        purge_document(work.doc, (widgets, annots))
+
+        if zones:
+            with pdf_metrics.stage("redaction"):
+                pdf_metrics.count("redaction_zones", apply_redaction_zones(work.doc, zones))
+
+        work.save(profile, sanitize=True)
+    finally:
+        work.close()
+
+
+def process_pdf(input_path: str, output_path: str, profile: str = DEFAULT_PROFILE,
+                zone_registry: Optional[str] = None, memory: Optional[MemoryBudget] = None) -> bool:
+    """
+    Process a single PDF file with purge and redact approach.
+    With zone_registry, the zones registered for the file's template
+    (see zone_registry.py) are true-redacted after the purge.
+    With memory, pages are purged in chunks under its RSS ceiling
+    (see memory_budget); going over the ceiling raises MemoryLimitExceeded.
+    """
+    doc = None
+    try:
+        if memory is not None:
+            _process_pdf_chunked(input_path, output_path, profile, zone_registry, memory)
+            return True
+
+        with pdf_metrics.stage("open"):
+            doc = open_document(input_path, output_path, profile)
+
+        # Identify the template before the purge removes its form fields
+        zones = None
+        if zone_registry:
+            with pdf_metrics.stage("zone_lookup"):
+                zones = load_registry(zone_registry).zones_for(input_path, doc)
+
+        purge_document(doc)
+
+        if zones:
+            with pdf_metrics.stage("redaction"):
+                pdf_metrics.count("redaction_zones", apply_redaction_zones(doc, zones))
+
         # Save with cleanup to drop orphaned objects and reduce the chance of recoverable remnants
-        doc.save(output_path, deflate=True, garbage=4, clean=True)
+        with pdf_metrics.stage("save"):
+            save_document(doc, output_path, profile, sanitize=True)
         doc.close()
 
         return True
+    except MemoryLimitExceeded:
+        # Let the batch runner report the ceiling that was hit
+        raise
     except Exception as e:
         print(f"Error: {e}")
+        if doc is not None and not doc.is_closed:
+            doc.close()
+        discard_copy(input_path, output_path, profile)
         return False
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Worker processes (default: 1, 0 = one per CPU)")
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Reprocess files even if unchanged since the last run")
+    parser.add_argument("-p", "--profile", choices=list(SAVE_PROFILES), default=DEFAULT_PROFILE,
+                        help="Save profile (default: standard; incremental keeps the purged "
+                             "content in an earlier revision)")
+    parser.add_argument("-z", "--zone-registry", default=REGISTRY_NAME,
+                        help=f"Template zone registry applied to each file (default: {REGISTRY_NAME} if present)")
+    add_memory_arguments(parser)
+    pdf_metrics.add_metrics_arguments(parser)
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+    metrics = pdf_metrics.writer_from_args(args)
+    catalog = catalog_from_args(args)
+    memory = budget_from_args(args)
+    
     # Get the current directory
     current_dir = Path(".")
     output_dir = Path("purged_pdfs")
@@ -114,23 +228,57 @@ def main():
     
     print(f"Found {len(pdf_files)} PDF file(s) to process...\n")
     
-    successful = 0
-    failed = 0
+    # Create output paths in the purged_pdfs folder
+    zone_registry = args.zone_registry if Path(args.zone_registry).is_file() else None
+    if zone_registry:
+        load_registry(zone_registry)  # Fail early on a malformed registry
+        print(f"Applying template redaction zones from {zone_registry}\n")
+    elif args.zone_registry != REGISTRY_NAME:
+        parser.error(f"zone registry not found: {args.zone_registry}")
+    
+    tasks = [(str(pdf_file), str(output_dir / pdf_file.name), args.profile, zone_registry, memory)
+             for pdf_file in sorted(pdf_files)]
     
-    for pdf_file in pdf_files:
-        # Create output path in the purged_pdfs folder
-        output_path = output_dir / pdf_file.name
-        
-        print(f"Processing: {pdf_file.name}...", end=" ")
-        
-        if process_pdf(str(pdf_file), str(output_path)):
-            print(f"[OK] -> {output_path}")
-            successful += 1
+    # Skip inputs whose content, profile, zones and output are unchanged since the last run
+    manifest = BatchManifest(str(output_dir / MANIFEST_NAME))
+    options = {'profile': args.profile}
+    if zone_registry:
+        options['zone_registry'] = file_sha256(zone_registry)
+    if not args.force:
+        tasks = manifest.filter_tasks(tasks, "purge", options)
+        skipped = len(pdf_files) - len(tasks)
+        if skipped:
+            print(f"Skipping {skipped} unchanged file(s) (use --force to reprocess)\n")
+    
+    def report(result):
+        name = Path(result['input']).name
+        if metrics:
+            metrics.write(result['metrics'])
+        if catalog:
+            catalog.record_run(result, "purge", options, manifest.input_hash(result['input']))
+        if result['ok']:
+            manifest.record(result['input'], result['output'], "purge", options)
+            print(f"Processing: {name}... [OK] -> {result['output']}")
         else:
-            print(f"[FAILED]")
-            failed += 1
+            print(f"Processing: {name}... [FAILED]"
+                  + (f" {result['error']}" if result['error'] != "worker reported failure" else ""))
+    
+    try:
+        results = run_batch(process_pdf, tasks, jobs=args.jobs, on_result=report,
+                            metrics_label="purge" if metrics or catalog else None)
+    finally:
+        manifest.save()
+        if metrics:
+            metrics.close()
+        if catalog:
+            catalog.close()
+    successful = sum(1 for r in results if r['ok'])
+    failed = len(results) - successful
     
     print(f"\nCompleted: {successful} successful, {failed} failed")
+    summary = peak_rss_summary(results)
+    if summary:
+        print(summary)
     print(f"Output folder: {output_dir.absolute()}")
 
 
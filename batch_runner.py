@@ -0,0 +1,150 @@
+"""
+Parallel batch engine shared by the PDF batch scripts.
+Runs one worker call per file on a process pool and returns the results
+in the same order as the input tasks. A file whose worker process dies
+(segfault, OOM kill) gets a failed result; the rest of the batch continues
+on a fresh pool.
+"""
+
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import pdf_metrics
+
+
+def default_jobs() -> int:
+    """Number of worker processes to use when --jobs 0 is given."""
+    return os.cpu_count() or 1
+
+
+def _new_result(args: Sequence) -> dict:
+    """A failed, empty result for one task's arguments."""
+    return {
+        'input': str(args[0]) if args else None,
+        'output': str(args[1]) if len(args) > 1 else None,
+        'ok': False,
+        'error': None,
+        'elapsed': 0.0,
+        'metrics': None,
+        'peak_rss_bytes': None,
+        'value': None,
+    }
+
+
+def _run_task(task: Tuple[Callable, Sequence, Optional[str]]) -> dict:
+    """
+    Run a single worker call and capture its outcome.
+    Executed inside the worker process, so it must never raise.
+    """
+    worker, args, metrics_label = task
+    started = time.perf_counter()
+    result = _new_result(args)
+    metrics = None
+    pdf_metrics.reset_peak_rss()
+    try:
+        if metrics_label:
+            with pdf_metrics.track(result['input'], result['output'], metrics_label) as metrics:
+                value = worker(*args)
+        else:
+            value = worker(*args)
+        result['value'] = value
+        result['ok'] = bool(value)
+        if not result['ok']:
+            result['error'] = "worker reported failure"
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    result['elapsed'] = time.perf_counter() - started
+    result['peak_rss_bytes'] = pdf_metrics.peak_rss_bytes()
+    if metrics is not None:
+        metrics.ok = result['ok']
+        metrics.error = result['error']
+        result['metrics'] = metrics.to_dict()
+    return result
+
+
+def _run_isolated(call: Tuple[Callable, Sequence, Optional[str]]) -> dict:
+    """_run_task in a single-worker pool of its own; a crash fails only this task."""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_run_task, call).result()
+        except BrokenProcessPool:
+            result = _new_result(call[1])
+            result['error'] = "BrokenProcessPool: worker process died"
+            return result
+
+
+def peak_rss_summary(results: List[dict]) -> Optional[str]:
+    """One-line report of the largest per-file peak RSS in results, if known."""
+    measured = [r for r in results if r.get('peak_rss_bytes')]
+    if not measured:
+        return None
+    peak = max(measured, key=lambda r: r['peak_rss_bytes'])
+    return f"Peak RSS: {peak['peak_rss_bytes'] / 2**20:.0f} MiB ({os.path.basename(peak['input'] or '')})"
+
+
+def run_batch(worker: Callable, tasks: Iterable[Sequence], jobs: int = 1,
+              on_result: Optional[Callable[[dict], None]] = None,
+              metrics_label: Optional[str] = None) -> List[dict]:
+    """
+    Run worker(*args) for every args tuple in tasks.
+
+    Args:
+        worker: Module-level function (must be picklable). By convention the
+                first two arguments are the input and output paths.
+        tasks: Argument tuples, one per file
+        jobs: Number of worker processes (1 = run in this process, 0 = one per CPU)
+        on_result: Optional callback invoked with each result as it becomes
+                   available, in task order
+        metrics_label: Pipeline name to collect pdf_metrics under; when set,
+                       each result carries a 'metrics' record (else None)
+
+    Returns:
+        One result dict per task, in task order, with keys
+        'input', 'output', 'ok', 'error', 'elapsed', 'metrics',
+        'peak_rss_bytes' (the worker's peak RSS while it ran, where supported)
+        and 'value' (the worker's return value, which must be picklable).
+    """
+    calls = [(worker, tuple(args), metrics_label) for args in tasks]
+    if jobs == 0:
+        jobs = default_jobs()
+    jobs = max(1, min(jobs, len(calls) or 1))
+
+    results = []
+    if jobs == 1:
+        for call in calls:
+            result = _run_task(call)
+            results.append(result)
+            if on_result:
+                on_result(result)
+        return results
+
+    # Each worker opens, processes and saves its own document; futures are
+    # collected in submission order, so output stays deterministic.
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        futures = [executor.submit(_run_task, call) for call in calls]
+        for index, call in enumerate(calls):
+            try:
+                result = futures[index].result()
+            except BrokenProcessPool:
+                # A worker died (segfault, OOM kill), failing every unfinished
+                # task. Rerun this one on its own to tell whether it was the
+                # cause, then the rest on a fresh pool.
+                executor.shutdown(wait=True)
+                result = _run_isolated(call)
+                executor = ProcessPoolExecutor(max_workers=jobs)
+                for later in range(index + 1, len(calls)):
+                    future = futures[later]
+                    if future.cancelled() or future.exception() is not None:
+                        futures[later] = executor.submit(_run_task, calls[later])
+            results.append(result)
+            if on_result:
+                on_result(result)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
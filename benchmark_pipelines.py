@@ -0,0 +1,237 @@
+"""
+Throughput benchmark for the PDF clearing pipelines.
+Builds (or reuses) a synthetic corpus, times every pipeline and engine on
+each file in a fresh process under each save profile, and reports
+pages/sec, fields/sec, peak RSS and output size.
+"""
+
+import argparse
+import contextlib
+import functools
+import importlib
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# name -> (module, function); each function takes (input_path, output_path, profile=...)
+PIPELINES = {
+    "clearer.pymupdf": ("pdf_clearer", "clear_pdf_answers_pymupdf"),
+    "clearer.pypdf": ("pdf_clearer", "clear_pdf_answers_pypdf"),
+    "clearer.xref": ("pdf_clearer", "clear_pdf_answers_xref"),
+    "clear_then_flatten": ("clear_then_flatten", "clear_then_flatten"),
+    "batch_clear_flatten": ("batch_clear_flatten", "clear_and_flatten_pdf"),
+    "purge_and_redact": ("pdf_purge_and_redact", "purge_and_redact_pdf"),
+    "batch_purge_redact": ("batch_purge_redact", "process_pdf"),
+    "single_pass": ("pdf_pipeline", "run_pipeline"),
+}
+
+
+def _peak_rss_mb(who=None) -> Optional[float]:
+    """Peak resident set size in MiB, or None where unsupported."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss / divisor
+
+
+def _load(pipeline: str, profile: str):
+    module_name, func_name = PIPELINES[pipeline]
+    func = getattr(importlib.import_module(module_name), func_name)
+    return functools.partial(func, profile=profile)
+
+
+def _measure_file(pipeline: str, input_path: str, output_path: str, repeat: int,
+                  profile: str = "standard") -> Dict:
+    """Run one pipeline on one file; executed in a fresh spawned process."""
+    func = _load(pipeline, profile)
+    baseline = _peak_rss_mb()
+
+    times = []
+    error = None
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            try:
+                result = func(input_path, output_path)
+                if result is False:
+                    error = "pipeline reported failure"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            times.append(time.perf_counter() - started)
+            if error:
+                break
+
+    return {
+        "seconds": statistics.median(times),
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": _peak_rss_mb(),
+        "output_bytes": os.path.getsize(output_path) if os.path.exists(output_path) else None,
+        "error": error,
+    }
+
+
+def _measure_batch(pipeline: str, files: List[str], output_dir: str, jobs: int,
+                   profile: str = "standard") -> Dict:
+    """Run one pipeline over the whole corpus through the batch engine."""
+    from batch_runner import run_batch
+
+    func = _load(pipeline, profile)
+    tasks = [(path, str(Path(output_dir) / Path(path).name)) for path in files]
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run_batch(func, tasks, jobs=jobs)
+    seconds = time.perf_counter() - started
+
+    peak = _peak_rss_mb()
+    if jobs != 1 and resource is not None:
+        # Largest single worker, not the sum across the pool
+        peak = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    failures = [r for r in results if not r["ok"]]
+    return {
+        "seconds": seconds,
+        "baseline_rss_mb": None,
+        "peak_rss_mb": peak,
+        "output_bytes": sum(os.path.getsize(t[1]) for t in tasks if os.path.exists(t[1])),
+        "error": f"{len(failures)} file(s) failed" if failures else None,
+    }
+
+
+def _in_fresh_process(func, *args) -> Dict:
+    """Run func in a newly spawned interpreter so peak RSS is per measurement."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        return executor.submit(func, *args).result()
+
+
+def _row(pipeline: str, profile: str, label: str, pages: int, fields: int, input_bytes: int,
+         measured: Dict) -> Dict:
+    seconds = measured["seconds"]
+    return {
+        "pipeline": pipeline,
+        "profile": profile,
+        "input": label,
+        "pages": pages,
+        "fields": fields,
+        "input_bytes": input_bytes,
+        "pages_per_sec": pages / seconds if seconds else None,
+        "fields_per_sec": fields / seconds if seconds else None,
+        **measured,
+    }
+
+
+def run_benchmarks(corpus: List[Dict], pipelines: List[str], repeat: int = 3,
+                   batch_jobs: Optional[List[int]] = None,
+                   save_profiles: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Benchmark each pipeline on each corpus file, then (optionally) over the
+    whole corpus through the batch engine at each worker count in batch_jobs.
+    Every measurement is repeated for each name in save_profiles (default:
+    standard only).
+
+    Returns:
+        One result dict per measurement.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="pdf_bench_") as tmp:
+        for pipeline in pipelines:
+            for save_profile in save_profiles or ["standard"]:
+                for info in corpus:
+                    output_path = str(Path(tmp) / f"{pipeline}_{save_profile}_{Path(info['path']).name}")
+                    measured = _in_fresh_process(_measure_file, pipeline, info["path"], output_path,
+                                                 repeat, save_profile)
+                    rows.append(_row(pipeline, save_profile, info.get("profile", Path(info["path"]).name),
+                                     info["pages"], info["fields"], info["bytes"], measured))
+                    _print_row(rows[-1])
+
+                for jobs in batch_jobs or []:
+                    out_dir = Path(tmp) / f"{pipeline}_{save_profile}_batch_j{jobs}"
+                    out_dir.mkdir()
+                    files = [info["path"] for info in corpus]
+                    measured = _in_fresh_process(_measure_batch, pipeline, files, str(out_dir), jobs,
+                                                 save_profile)
+                    rows.append(_row(pipeline, save_profile, f"corpus (jobs={jobs})",
+                                     sum(i["pages"] for i in corpus), sum(i["fields"] for i in corpus),
+                                     sum(i["bytes"] for i in corpus), measured))
+                    _print_row(rows[-1])
+    return rows
+
+
+def _fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def _print_header() -> None:
+    print(f"{'Pipeline':<22} {'Save':<11} {'Input':<22} {'Time (s)':>9} {'Pages/s':>9} {'Fields/s':>10} "
+          f"{'Peak RSS MB':>12} {'Out KB':>9}")
+    print("-" * 112)
+
+
+def _print_row(row: Dict) -> None:
+    out_kb = row["output_bytes"] / 1024 if row["output_bytes"] is not None else None
+    line = (f"{row['pipeline']:<22} {row['profile']:<11} {row['input']:<22} {_fmt(row['seconds'], '9.3f')} "
+            f"{_fmt(row['pages_per_sec'], '9.1f')} {_fmt(row['fields_per_sec'], '10.0f')} "
+            f"{_fmt(row['peak_rss_mb'], '12.1f')} {_fmt(out_kb, '9.0f')}")
+    if row["error"]:
+        line += f"  [FAILED: {row['error']}]"
+    print(line)
+
+
+def main():
+    from save_profiles import SAVE_PROFILES
+    from synthetic_forms import CORPUS_PROFILES, build_corpus, load_corpus
+
+    parser = argparse.ArgumentParser(description="Benchmark the PDF clearing pipelines on a synthetic corpus.")
+    parser.add_argument("-d", "--corpus-dir",
+                        help="Corpus directory; PDFs already there are benchmarked as they are "
+                             "(default: build one in a temporary directory)")
+    parser.add_argument("--profiles", nargs="+", choices=list(CORPUS_PROFILES),
+                        help="Corpus profiles to build or select (default: all)")
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINES),
+                        help="Pipelines to benchmark (default: all)")
+    parser.add_argument("-r", "--repeat", type=int, default=3,
+                        help="Runs per file; the median is reported (default: 3)")
+    parser.add_argument("--batch-jobs", type=int, nargs="*", default=[],
+                        help="Also time each pipeline over the whole corpus with these worker counts")
+    parser.add_argument("-s", "--save-profiles", nargs="+", choices=list(SAVE_PROFILES), default=["standard"],
+                        help="Save profiles to compare (default: standard); pypdf-based pipelines "
+                             "report incremental as failed")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="pdf_corpus_") as tmp:
+        corpus_dir = args.corpus_dir or tmp
+        if any(Path(corpus_dir).glob("*.pdf")):
+            corpus = load_corpus(corpus_dir, args.profiles)
+            print(f"Using {len(corpus)} existing file(s) in {corpus_dir}\n")
+        else:
+            print(f"Building synthetic corpus in {corpus_dir}...")
+            corpus = build_corpus(corpus_dir, args.profiles)
+            print(f"Built {len(corpus)} file(s)\n")
+
+        _print_header()
+        rows = run_benchmarks(corpus, args.pipelines or list(PIPELINES), args.repeat, args.batch_jobs,
+                             args.save_profiles)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
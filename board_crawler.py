@@ -0,0 +1,278 @@
+"""
+Crawl state board websites for PDF form links.
+
+Starting from each board URL in find_blank_forms.STATE_BOARD_PATTERNS, pages
+on the board's own host are fetched breadth-first, up to a link depth and a
+page budget per board. Each URL is fetched at most once. Every board is
+crawled concurrently through one http_fetch.AsyncFetcher, which provides the
+shared connection pool, per-host rate limit, retries and the HTTP cache.
+Links are parsed from each page as it streams in, and pages are capped at
+--max-page-kb. Links ending in .pdf are recorded, on any host, without
+being downloaded, as are links that turn out to serve application/pdf.
+With --catalog, each board's links are also stored in the catalog (see
+catalog.py).
+
+Usage:
+    python board_crawler.py                              # every board, board_pdf_links.json
+    python board_crawler.py --state AZ CA --depth 2 --max-pages 40
+    python board_crawler.py --board AZ:nursing=http://127.0.0.1:8000/   # a local fixture site
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import http_cache
+import http_fetch
+from catalog import add_catalog_arguments, catalog_from_args
+
+DEFAULT_DEPTH = 2
+DEFAULT_MAX_PAGES = 30
+DEFAULT_MAX_PAGE_KB = 512
+DEFAULT_OUTPUT = "board_pdf_links.json"
+
+# Links never worth fetching as pages
+_SKIPPED_EXTENSIONS = (
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".jpg", ".jpeg", ".png", ".gif",
+    ".svg", ".mp3", ".mp4", ".css", ".js", ".ico", ".xml", ".rss",
+)
+
+
+class LinkParser(HTMLParser):
+    """Incremental parser collecting (href, link text) for each <a>/<area>; honours <base href>."""
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links: List[Tuple[str, str]] = []
+        self._href: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "base":
+            href = dict(attrs).get("href")
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        elif tag in ("a", "area"):
+            self._close_link()
+            href = dict(attrs).get("href")
+            if href:
+                if tag == "area":
+                    self.links.append((urljoin(self.base_url, href), dict(attrs).get("alt") or ""))
+                else:
+                    self._href = urljoin(self.base_url, href)
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._close_link()
+
+    def _close_link(self):
+        if self._href is not None:
+            self.links.append((self._href, " ".join("".join(self._text).split())))
+        self._href = None
+        self._text = []
+
+    def close(self):
+        super().close()
+        self._close_link()
+
+
+def normalize_link(url: str) -> Optional[str]:
+    """Absolute http(s) URL without its fragment, or None for other schemes."""
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return parts._replace(netloc=parts.netloc.lower(), path=parts.path or "/").geturl()
+
+
+def is_pdf_link(url: str) -> bool:
+    return urlsplit(url).path.lower().endswith(".pdf")
+
+
+def site_of(url: str) -> str:
+    """Host of a URL without a leading www., for same-site checks."""
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def board_targets(states: Optional[List[str]] = None) -> List[dict]:
+    """{'state', 'board_type', 'board_url'} for every board in STATE_BOARD_PATTERNS."""
+    from find_blank_forms import STATE_BOARD_PATTERNS
+    return [
+        {"state": state, "board_type": board_type, "board_url": url}
+        for state, boards in sorted(STATE_BOARD_PATTERNS.items())
+        if not states or state in states
+        for board_type, url in boards.items()
+    ]
+
+
+async def crawl_board(fetcher: http_fetch.AsyncFetcher, board_url: str, depth: int = DEFAULT_DEPTH,
+                      max_pages: int = DEFAULT_MAX_PAGES,
+                      max_page_bytes: int = DEFAULT_MAX_PAGE_KB * 1024) -> dict:
+    """
+    Breadth-first crawl of one board site.
+
+    Returns:
+        Dict with 'pages_crawled', 'pdf_links' ({'url', 'text', 'found_on'},
+        in discovery order) and 'errors' ({'url', 'error'}).
+    """
+    start = normalize_link(board_url)
+    site = site_of(start)
+    seen = {start}
+    frontier = [start]
+    anchors = {start: ("", None)}    # page URL -> (link text, page it was found on)
+    pdfs: Dict[str, dict] = {}
+    errors = []
+    pages = 0
+
+    async def visit(url: str):
+        parser = LinkParser(url)
+
+        def begin(final_url: str):
+            # Resolve relative links against the page actually served
+            parser.base_url = final_url
+
+        try:
+            response = await fetcher.get(url, consume=parser.feed, max_bytes=max_page_bytes, begin=begin)
+        except Exception as e:
+            return url, None, [], f"{type(e).__name__}: {e}"
+        parser.close()
+        if response.status != 200:
+            return url, response, [], f"HTTP {response.status}"
+        return url, response, parser.links, None
+
+    for level in range(depth + 1):
+        batch = frontier[:max_pages - pages]
+        if not batch:
+            break
+        pages += len(batch)
+        next_frontier = []
+        # One level at a time, kept in frontier order so results are reproducible
+        for url, response, links, error in await asyncio.gather(*(visit(url) for url in batch)):
+            if error:
+                errors.append({"url": url, "error": error})
+                continue
+            page_url = normalize_link(response.url) or url
+            if level == 0:
+                # Follow a redirected board root (http -> https, a new domain)
+                site = site_of(page_url)
+            seen.add(page_url)
+            if "application/pdf" in (response.headers.get("Content-Type") or "").lower():
+                text, found_on = anchors[url]
+                pdfs.setdefault(url, {"url": url, "text": text, "found_on": found_on})
+                continue
+            for href, text in links:
+                link = normalize_link(href)
+                if link is None:
+                    continue
+                if is_pdf_link(link):
+                    pdfs.setdefault(link, {"url": link, "text": text, "found_on": page_url})
+                elif (link not in seen and site_of(link) == site and level < depth
+                      and not urlsplit(link).path.lower().endswith(_SKIPPED_EXTENSIONS)):
+                    seen.add(link)
+                    anchors[link] = (text, page_url)
+                    next_frontier.append(link)
+        frontier = next_frontier
+
+    return {"pages_crawled": pages, "pdf_links": list(pdfs.values()), "errors": errors}
+
+
+async def crawl_boards(targets: List[dict], depth: int = DEFAULT_DEPTH, max_pages: int = DEFAULT_MAX_PAGES,
+                       max_page_bytes: int = DEFAULT_MAX_PAGE_KB * 1024,
+                       concurrency: int = http_fetch.DEFAULT_CONCURRENCY,
+                       rate: Optional[float] = http_fetch.DEFAULT_RATE, burst: int = http_fetch.DEFAULT_BURST,
+                       retries: int = http_fetch.DEFAULT_RETRIES, cache=None, on_result=None) -> List[dict]:
+    """
+    crawl_board for every target concurrently; returns one record per target
+    (the target's keys plus crawl_board's) in target order.
+    on_result(record) is called as each board finishes.
+    """
+    async with http_fetch.AsyncFetcher(concurrency=concurrency, rate=rate, burst=burst,
+                                       retries=retries, cache=cache) as fetcher:
+        async def run(target):
+            record = dict(target)
+            record.update(await crawl_board(fetcher, target["board_url"], depth, max_pages, max_page_bytes))
+            if on_result:
+                on_result(record)
+            return record
+
+        return await asyncio.gather(*(run(target) for target in targets))
+
+
+def _board_argument(value: str) -> dict:
+    """STATE:TYPE=URL -> target dict."""
+    try:
+        key, url = value.split("=", 1)
+        state, board_type = key.split(":", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected STATE:TYPE=URL, got {value!r}")
+    return {"state": state, "board_type": board_type, "board_url": url}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl state board websites for PDF form links.")
+    parser.add_argument("--state", nargs="+", help="Only these states (default: all)")
+    parser.add_argument("--board", action="append", type=_board_argument, metavar="STATE:TYPE=URL",
+                        help="Crawl this board instead of STATE_BOARD_PATTERNS (repeatable)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH,
+                        help=f"Link depth followed from the board URL (default: {DEFAULT_DEPTH})")
+    parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES,
+                        help=f"Pages fetched per board (default: {DEFAULT_MAX_PAGES})")
+    parser.add_argument("--max-page-kb", type=int, default=DEFAULT_MAX_PAGE_KB,
+                        help=f"Bytes read per page, in KiB (default: {DEFAULT_MAX_PAGE_KB})")
+    parser.add_argument("-c", "--concurrency", type=int, default=http_fetch.DEFAULT_CONCURRENCY,
+                        help=f"Requests in flight at once (default: {http_fetch.DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=http_fetch.DEFAULT_RATE,
+                        help=f"Requests per second per host (default: {http_fetch.DEFAULT_RATE:g}, 0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=http_fetch.DEFAULT_BURST,
+                        help=f"Back-to-back requests allowed per host (default: {http_fetch.DEFAULT_BURST})")
+    parser.add_argument("--retries", type=int, default=http_fetch.DEFAULT_RETRIES,
+                        help=f"Retries after errors, 429 and 5xx (default: {http_fetch.DEFAULT_RETRIES})")
+    parser.add_argument("--cache-dir", default=http_cache.DEFAULT_CACHE_DIR,
+                        help=f"HTTP response cache directory (default: {http_cache.DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch from the network")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT,
+                        help=f"JSON output file (default: {DEFAULT_OUTPUT})")
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+
+    targets = args.board or board_targets(args.state)
+    cache = None if args.no_cache else http_cache.HttpCache(args.cache_dir)
+    catalog = catalog_from_args(args)
+
+    def report(record):
+        if catalog:
+            catalog.record_board_links(record)
+        errors = f", {len(record['errors'])} error(s)" if record["errors"] else ""
+        print(f"{record['state']} {record['board_type']:<9} {len(record['pdf_links']):>4} PDF link(s) "
+              f"from {record['pages_crawled']} page(s){errors}  {record['board_url']}")
+
+    print(f"Crawling {len(targets)} board site(s), depth {args.depth}, up to {args.max_pages} page(s) each\n")
+    started = time.perf_counter()
+    records = asyncio.run(crawl_boards(
+        targets, depth=args.depth, max_pages=args.max_pages, max_page_bytes=args.max_page_kb * 1024,
+        concurrency=args.concurrency, rate=args.rate, burst=args.burst, retries=args.retries,
+        cache=cache, on_result=report))
+    if catalog:
+        catalog.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    print(f"\n{sum(len(r['pdf_links']) for r in records)} PDF link(s) from "
+          f"{sum(r['pages_crawled'] for r in records)} page(s) in {time.perf_counter() - started:.1f}s")
+    if cache:
+        print(cache.summary())
+    print(f"Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+SQLite catalog shared by the intake, search and processing scripts.
+
+The scripts use it when run with --catalog [FILE]. One database
+(catalog.db by default) holds:
+
+- inputs: every application PDF seen by analyze_applications or a batch run,
+  with its parsed state, license and application type, size, mtime, content
+  hash and page/field counts.
+- runs: the latest status of each input in each pipeline (ok/failed,
+  output, error, options, timing, counters).
+- searches / form_urls: find_blank_forms results per application.
+- boards / board_links: PDF links found by board_crawler.
+
+The "forms needed" list and the website data are indexed queries over these
+tables instead of text files parsed back with regular expressions. Content
+hashes are reused while a file's size and mtime are unchanged, as in
+batch_manifest. The database runs in WAL mode, so a report can read it
+while a batch is writing.
+
+    with Catalog() as catalog:
+        catalog.sync_inputs(records, root="/mnt/intake", recursive=True)
+        catalog.forms_needed()             # [{'state', 'state_name', 'license_type', 'app_type', 'files'}]
+        catalog.record_run(result, "purge")
+        catalog.search_results()           # form_search_results.json records
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from batch_manifest import file_sha256, normalize_options, stat_key
+from search_checkpoint import application_key
+
+DEFAULT_CATALOG = "catalog.db"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    id           INTEGER PRIMARY KEY,
+    path         TEXT NOT NULL UNIQUE,
+    directory    TEXT NOT NULL,
+    filename     TEXT NOT NULL,
+    state        TEXT,
+    state_name   TEXT,
+    license_type TEXT,
+    app_type     TEXT,
+    size         INTEGER,
+    mtime_ns     INTEGER,
+    sha256       TEXT,
+    pages        INTEGER,
+    fields       INTEGER,
+    widgets      INTEGER,
+    present      INTEGER NOT NULL DEFAULT 1,
+    seen_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inputs_application ON inputs (state, license_type, app_type, present);
+CREATE INDEX IF NOT EXISTS inputs_directory ON inputs (directory);
+CREATE INDEX IF NOT EXISTS inputs_sha256 ON inputs (sha256);
+
+CREATE TABLE IF NOT EXISTS runs (
+    input_id       INTEGER NOT NULL REFERENCES inputs (id) ON DELETE CASCADE,
+    pipeline       TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    output         TEXT,
+    error          TEXT,
+    options        TEXT,
+    input_sha256   TEXT,
+    elapsed        REAL,
+    peak_rss_bytes INTEGER,
+    counts         TEXT,
+    processed_at   REAL NOT NULL,
+    PRIMARY KEY (input_id, pipeline)
+);
+CREATE INDEX IF NOT EXISTS runs_status ON runs (pipeline, status);
+
+CREATE TABLE IF NOT EXISTS searches (
+    id           INTEGER PRIMARY KEY,
+    key          TEXT NOT NULL UNIQUE,
+    state        TEXT,
+    state_name   TEXT,
+    license_type TEXT,
+    app_type     TEXT,
+    board_url    TEXT,
+    searched_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS searches_application ON searches (state, license_type, app_type);
+
+CREATE TABLE IF NOT EXISTS form_urls (
+    search_id INTEGER NOT NULL REFERENCES searches (id) ON DELETE CASCADE,
+    kind      TEXT NOT NULL,
+    rank      INTEGER NOT NULL,
+    title     TEXT,
+    url       TEXT NOT NULL,
+    PRIMARY KEY (search_id, kind, rank)
+);
+
+CREATE TABLE IF NOT EXISTS boards (
+    state         TEXT NOT NULL,
+    board_type    TEXT NOT NULL,
+    board_url     TEXT NOT NULL,
+    pages_crawled INTEGER,
+    errors        INTEGER,
+    crawled_at    REAL NOT NULL,
+    PRIMARY KEY (state, board_type)
+);
+
+CREATE TABLE IF NOT EXISTS board_links (
+    state      TEXT NOT NULL,
+    board_type TEXT NOT NULL,
+    rank       INTEGER NOT NULL,
+    url        TEXT NOT NULL,
+    text       TEXT,
+    found_on   TEXT,
+    PRIMARY KEY (state, board_type, rank),
+    FOREIGN KEY (state, board_type) REFERENCES boards (state, board_type) ON DELETE CASCADE
+);
+"""
+
+# Same order as analyze_applications' list: unknown values sort last
+_APPLICATION_ORDER = ("state IS NULL, state, license_type IS NULL, license_type, "
+                      "app_type IS NULL, app_type")
+
+_COUNTED = ("pages", "fields", "widgets")
+
+
+def _absolute(path: str) -> str:
+    return os.path.abspath(path)
+
+
+class Catalog:
+    """
+    The catalog database at path (created on first use).
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG):
+        self.path = Path(path)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("PRAGMA foreign_keys = ON")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"{self.path}: catalog schema version {version}, expected {SCHEMA_VERSION}")
+        with self.db:
+            self.db.executescript(_SCHEMA)
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # -- inputs --------------------------------------------------------------
+
+    def sync_inputs(self, records: Iterable[Tuple[str, dict]], root: Optional[str] = None,
+                    recursive: bool = False, hash_contents: bool = False) -> Dict[str, int]:
+        """
+        Upsert scanned inputs: (path, parse_filename dict) pairs.
+
+        When root is given, catalogued inputs under it (only directly in it
+        unless recursive) that were not in records are marked as no longer
+        present; their run history is kept. With hash_contents, files whose
+        size or mtime changed (or that were never hashed) are hashed now;
+        otherwise their hash is cleared and filled in by the next batch run.
+
+        Returns:
+            Dict with 'scanned', 'hashed' and 'missing' counts.
+        """
+        now = time.time()
+        known = {row["path"]: (row["size"], row["mtime_ns"], row["sha256"])
+                 for row in self.db.execute("SELECT path, size, mtime_ns, sha256 FROM inputs")}
+        rows = []
+        hashed = 0
+        for path, app in records:
+            path = _absolute(path)
+            stat = stat_key(path)
+            if stat is None:
+                continue
+            size, mtime_ns, digest = known.get(path, (None, None, None))
+            if (size, mtime_ns) != stat:
+                digest = None
+            if digest is None and hash_contents:
+                digest = file_sha256(path)
+                hashed += 1
+            rows.append((path, os.path.dirname(path), app["filename"], app["state"], app["state_name"],
+                         app["license_type"], app["app_type"], stat[0], stat[1], digest, now))
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO inputs (path, directory, filename, state, state_name, license_type, app_type, "
+                "                    size, mtime_ns, sha256, present, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (path) DO UPDATE SET filename = excluded.filename, state = excluded.state, "
+                "    state_name = excluded.state_name, license_type = excluded.license_type, "
+                "    app_type = excluded.app_type, size = excluded.size, mtime_ns = excluded.mtime_ns, "
+                "    sha256 = excluded.sha256, present = 1, seen_at = excluded.seen_at", rows)
+            missing = 0
+            if root is not None:
+                root = _absolute(root)
+                if recursive:
+                    prefix = root.rstrip(os.sep) + os.sep
+                    where = "(directory = ? OR substr(directory, 1, ?) = ?)"
+                    params = (root, len(prefix), prefix)
+                else:
+                    where, params = "directory = ?", (root,)
+                missing = self.db.execute(
+                    f"UPDATE inputs SET present = 0 WHERE present AND seen_at < ? AND {where}",
+                    (now, *params)).rowcount
+        return {"scanned": len(rows), "hashed": hashed, "missing": missing}
+
+    def _input_id(self, path: str, digest: Optional[str] = None) -> Tuple[int, Optional[str]]:
+        """
+        (id, current content hash) of an input, cataloguing it if it is new.
+        digest is the input's current hash when the caller already knows it.
+        """
+        path = _absolute(path)
+        stat = stat_key(path)
+        row = self.db.execute("SELECT id, size, mtime_ns, sha256 FROM inputs WHERE path = ?",
+                              (path,)).fetchone()
+        if row is not None and stat is not None and (row["size"], row["mtime_ns"]) == stat and row["sha256"]:
+            return row["id"], row["sha256"]
+        if stat is None:
+            digest = None
+        elif digest is None:
+            digest = file_sha256(path)
+        size, mtime_ns = stat or (None, None)
+        if row is not None:
+            self.db.execute("UPDATE inputs SET size = ?, mtime_ns = ?, sha256 = ?, present = ? WHERE id = ?",
+                            (size, mtime_ns, digest, int(stat is not None), row["id"]))
+            return row["id"], digest
+        from analyze_applications import parse_filename
+        app = parse_filename(os.path.basename(path))
+        cursor = self.db.execute(
+            "INSERT INTO inputs (path, directory, filename, state, state_name, license_type, app_type, "
+            "                    size, mtime_ns, sha256, present, seen_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, os.path.dirname(path), app["filename"], app["state"], app["state_name"],
+             app["license_type"], app["app_type"], size, mtime_ns, digest, int(stat is not None), time.time()))
+        return cursor.lastrowid, digest
+
+    def forms_needed(self, known_only: bool = True) -> List[dict]:
+        """
+        Distinct (state, license type, application type) of the present
+        inputs, with their file counts, in analyze_applications' order.
+        known_only drops applications without a state or license type.
+        """
+        where = "present"
+        if known_only:
+            where += " AND state IS NOT NULL AND license_type IS NOT NULL"
+        return [dict(row) for row in self.db.execute(
+            "SELECT state, state_name, license_type, app_type, COUNT(*) AS files FROM inputs "
+            f"WHERE {where} GROUP BY state, license_type, app_type ORDER BY {_APPLICATION_ORDER}")]
+
+    def input_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM inputs WHERE present").fetchone()[0]
+
+    # -- pipeline runs -------------------------------------------------------
+
+    def record_run(self, result: dict, pipeline: str, options: Optional[dict] = None,
+                   input_sha256: Optional[str] = None) -> None:
+        """
+        Record a batch_runner result as the input's latest run of pipeline.
+        Page/field/widget counts from the result's metrics are copied onto the input.
+        Pass input_sha256 when the input's current hash is known (e.g. from
+        BatchManifest.input_hash) so it is not read again.
+        """
+        counts = (result.get("metrics") or {}).get("counts") or {}
+        with self.db:
+            input_id, digest = self._input_id(result["input"], input_sha256)
+            self.db.execute(
+                "INSERT OR REPLACE INTO runs (input_id, pipeline, status, output, error, options, input_sha256, "
+                "                             elapsed, peak_rss_bytes, counts, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (input_id, pipeline, "ok" if result["ok"] else "failed", result.get("output"),
+                 result.get("error"), normalize_options(options), digest, result.get("elapsed"),
+                 result.get("peak_rss_bytes"), json.dumps(counts, sort_keys=True) if counts else None,
+                 time.time()))
+            if any(name in counts for name in _COUNTED):
+                self.db.execute(
+                    "UPDATE inputs SET pages = coalesce(?, pages), fields = coalesce(?, fields), "
+                    "                  widgets = coalesce(?, widgets) WHERE id = ?",
+                    (*(counts.get(name) for name in _COUNTED), input_id))
+
+    def run_summary(self) -> List[dict]:
+        """{'pipeline', 'status', 'inputs'} counts over the latest runs."""
+        return [dict(row) for row in self.db.execute(
+            "SELECT pipeline, status, COUNT(*) AS inputs FROM runs GROUP BY pipeline, status "
+            "ORDER BY pipeline, status")]
+
+    # -- form searches -------------------------------------------------------
+
+    def record_search(self, result: dict) -> None:
+        """Store a find_blank_forms result, replacing the application's previous one."""
+        with self.db:
+            self.db.execute(
+                "INSERT INTO searches (key, state, state_name, license_type, app_type, board_url, searched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET board_url = excluded.board_url, "
+                "    searched_at = excluded.searched_at",
+                (application_key(result), result["state"], result["state_name"], result["license_type"],
+                 result["app_type"], result["board_url"], time.time()))
+            search_id = self.db.execute("SELECT id FROM searches WHERE key = ?",
+                                        (application_key(result),)).fetchone()[0]
+            self.db.execute("DELETE FROM form_urls WHERE search_id = ?", (search_id,))
+            self.db.executemany(
+                "INSERT INTO form_urls (search_id, kind, rank, title, url) VALUES (?, ?, ?, ?, ?)",
+                [(search_id, "search", rank, hit.get("title"), hit["url"])
+                 for rank, hit in enumerate(result["search_results"])]
+                + [(search_id, "suggested", rank, None, url)
+                   for rank, url in enumerate(result["suggested_urls"])])
+
+    def search_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+
+    def search_results(self, known_only: bool = False) -> Iterator[dict]:
+        """
+        Stored search results as form_search_results.json records, in
+        application order. known_only drops applications without a state
+        or license type (the website only lists those).
+        """
+        where = "WHERE state IS NOT NULL AND license_type IS NOT NULL" if known_only else ""
+        urls: Dict[int, dict] = {}
+        for row in self.db.execute("SELECT search_id, kind, title, url FROM form_urls "
+                                   "ORDER BY search_id, kind, rank"):
+            entry = urls.setdefault(row["search_id"], {"search": [], "suggested": []})
+            if row["kind"] == "search":
+                entry["search"].append({"title": row["title"], "url": row["url"]})
+            else:
+                entry["suggested"].append(row["url"])
+        for row in self.db.execute(
+                "SELECT id, state, state_name, license_type, app_type, board_url FROM searches "
+                f"{where} ORDER BY {_APPLICATION_ORDER}"):
+            entry = urls.get(row["id"], {"search": [], "suggested": []})
+            yield {
+                "state": row["state"],
+                "state_name": row["state_name"],
+                "license_type": row["license_type"],
+                "app_type": row["app_type"],
+                "board_url": row["board_url"],
+                "search_results": entry["search"],
+                "suggested_urls": entry["suggested"],
+            }
+
+    # -- board crawls --------------------------------------------------------
+
+    def record_board_links(self, record: dict) -> None:
+        """Store a board_crawler record, replacing the board's previous crawl."""
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO boards (state, board_type, board_url, pages_crawled, errors, crawled_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record["state"], record["board_type"], record["board_url"], record["pages_crawled"],
+                 len(record["errors"]), time.time()))
+            self.db.execute("DELETE FROM board_links WHERE state = ? AND board_type = ?",
+                            (record["state"], record["board_type"]))
+            self.db.executemany(
+                "INSERT INTO board_links (state, board_type, rank, url, text, found_on) VALUES (?, ?, ?, ?, ?, ?)",
+                [(record["state"], record["board_type"], rank, link["url"], link["text"], link["found_on"])
+                 for rank, link in enumerate(record["pdf_links"])])
+
+    def board_links(self, state: Optional[str] = None) -> List[dict]:
+        """{'state', 'board_type', 'url', 'text', 'found_on'} of crawled PDF links, optionally for one state."""
+        where, params = ("WHERE state = ?", (state,)) if state else ("", ())
+        return [dict(row) for row in self.db.execute(
+            f"SELECT state, board_type, url, text, found_on FROM board_links {where} "
+            "ORDER BY state, board_type, rank", params)]
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def add_catalog_arguments(parser) -> None:
+    """Add --catalog [FILE] to an argparse parser."""
+    parser.add_argument("--catalog", nargs="?", const=DEFAULT_CATALOG, metavar="FILE",
+                        help=f"Record inputs, runs and searches in this SQLite catalog "
+                             f"(default when given without FILE: {DEFAULT_CATALOG})")
+
+
+def catalog_from_args(args) -> Optional[Catalog]:
+    """Catalog for the parsed arguments, or None without --catalog."""
+    if not args.catalog:
+        return None
+    return Catalog(args.catalog)
@@ -0,0 +1,396 @@
+"""
+Local HTTP clearing service.
+An asyncio HTTP/1.1 server that accepts a PDF upload plus a pipeline name,
+runs the job on a bounded process pool and streams the result back.
+
+Endpoints:
+    POST /process/<pipeline>   Body: raw PDF bytes. Pipelines: clear, flatten,
+                               purge, purge+zones. For purge+zones pass the
+                               zones.json content in the X-Redaction-Zones
+                               header (or a URL-encoded ?zones= parameter).
+                               Optional ?method= selects the clear engine and
+                               ?profile= the save profile (fast, standard,
+                               compact).
+    GET  /stats                Queue depth, in-flight jobs and latency stats
+    GET  /health               Liveness check
+
+Usage:
+    python clear_service.py --port 8080 --workers 4 --queue-limit 16
+    curl --data-binary @form.pdf -o cleared.pdf http://127.0.0.1:8080/process/clear
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+PIPELINES = ("clear", "flatten", "purge", "purge+zones")
+
+CLEAR_METHODS = ("auto", "pypdf", "pymupdf", "xref")
+
+# Save profiles usable in memory; incremental needs a file to append to
+SAVE_PROFILES = ("fast", "standard", "compact")
+
+STREAM_CHUNK = 64 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+LATENCY_WINDOW = 1000
+
+HTTP_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+def run_pipeline(pipeline: str, data: bytes, options: dict) -> bytes:
+    """Run one pipeline on PDF bytes; executed in a pool worker process."""
+    if pipeline == "clear":
+        from pdf_clearer import clear_pdf_bytes
+        return clear_pdf_bytes(data, method=options.get("method", "auto"), profile=options.get("profile", "standard"))
+    if pipeline == "flatten":
+        from batch_clear_flatten import clear_and_flatten_bytes
+        return clear_and_flatten_bytes(data, profile=options.get("profile", "standard"))
+    if pipeline in ("purge", "purge+zones"):
+        from pdf_purge_and_redact import purge_and_redact_bytes
+        return purge_and_redact_bytes(data, zones=options.get("zones"), profile=options.get("profile", "standard"))
+    raise ValueError(f"Unknown pipeline: {pipeline}")
+
+
+def _warm_worker() -> int:
+    """Import the pipeline modules so the first real job does not pay for it."""
+    import batch_clear_flatten  # noqa: F401
+    import pdf_clearer  # noqa: F401
+    import pdf_purge_and_redact  # noqa: F401
+    return os.getpid()
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[dict] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ClearingService:
+    """
+    HTTP front end for the clearing pipelines.
+
+    At most `workers` jobs run at once on the process pool; up to
+    `queue_limit` more wait for a worker. Beyond that, requests are rejected
+    with 503 and a Retry-After header instead of queueing without bound.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, workers: int = 0,
+                 queue_limit: int = 16, max_upload_bytes: int = 100 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self.max_upload_bytes = max_upload_bytes
+        self.executor = None
+        self.server = None
+        self.connections = set()
+
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.pool_restarts = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.started_at = time.time()
+
+    async def start(self) -> None:
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Start every worker up front, before any connection threads or
+        # requests exist, so no fork happens mid-traffic
+        await self._warm(self.executor)
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                 limit=MAX_HEADER_BYTES)
+        # Report the real port when started with port 0
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _warm(self, executor: ProcessPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_worker)
+                               for _ in range(self.workers)))
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        """
+        Swap a pool broken by a dead worker (segfault, OOM kill) for a new
+        one. Every request running on it fails, so only the first replaces it.
+        """
+        if self.executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.pool_restarts += 1
+        warming = asyncio.ensure_future(self._warm(self.executor))
+        # A pool that breaks while warming is replaced by the next failed request
+        warming.add_done_callback(lambda task: task.exception())
+
+    async def serve_forever(self) -> None:
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self.server:
+            self.server.close()
+            # Idle keep-alive connections would otherwise hold wait_closed() open
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Queue depth, throughput counters and latency percentiles (ms)."""
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "pool_restarts": self.pool_restarts,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "latency_ms": {
+                "count": len(latencies),
+                "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1000, 2) if latencies else None,
+            },
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                keep_alive = request["keep_alive"]
+                try:
+                    await self._dispatch(request, writer)
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the service is shutting down
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[dict]:
+        """Parse one HTTP/1.1 request; returns None on a clean EOF."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise HTTPError(400, "Incomplete request")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Request headers too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        body = b""
+        if method == "POST":
+            if "content-length" not in headers:
+                raise HTTPError(411, "Content-Length required")
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+            if length > self.max_upload_bytes:
+                raise HTTPError(413, f"Upload exceeds {self.max_upload_bytes} bytes")
+            body = await reader.readexactly(length)
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        url = urlsplit(target)
+        return {
+            "method": method,
+            "path": unquote(url.path),
+            "query": parse_qs(url.query),
+            "headers": headers,
+            "body": body,
+            "keep_alive": keep_alive,
+        }
+
+    async def _dispatch(self, request: dict, writer: asyncio.StreamWriter) -> None:
+        path = request["path"].rstrip("/")
+        if path == "/health":
+            await self._send_json(writer, 200, {"status": "ok"}, request["keep_alive"])
+        elif path == "/stats":
+            await self._send_json(writer, 200, self.stats(), request["keep_alive"])
+        elif path.startswith("/process"):
+            if request["method"] != "POST":
+                raise HTTPError(405, "Use POST with the PDF as the request body")
+            await self._process(request, writer)
+        else:
+            raise HTTPError(404, f"No such endpoint: {request['path']}")
+
+    def _job_options(self, request: dict) -> tuple:
+        """Validate the request and return (pipeline, options)."""
+        query = request["query"]
+        pipeline = request["path"].rstrip("/")[len("/process"):].strip("/")
+        pipeline = pipeline or query.get("pipeline", ["clear"])[0]
+        pipeline = pipeline.replace(" ", "+").replace("purge_zones", "purge+zones")
+        if pipeline not in PIPELINES:
+            raise HTTPError(400, f"Unknown pipeline '{pipeline}'. Choose from: {', '.join(PIPELINES)}")
+        if not request["body"]:
+            raise HTTPError(400, "Empty request body; send the PDF bytes")
+
+        options = {}
+        method = query.get("method", ["auto"])[0]
+        if method not in CLEAR_METHODS:
+            raise HTTPError(400, f"Unknown method '{method}'")
+        options["method"] = method
+
+        profile = query.get("profile", ["standard"])[0]
+        if profile not in SAVE_PROFILES:
+            raise HTTPError(400, f"Unknown profile '{profile}'. Choose from: {', '.join(SAVE_PROFILES)}")
+        options["profile"] = profile
+
+        if pipeline == "purge+zones":
+            raw = request["headers"].get("x-redaction-zones") or query.get("zones", [None])[0]
+            if not raw:
+                raise HTTPError(400, "purge+zones requires an X-Redaction-Zones header")
+            try:
+                zones = json.loads(raw)
+            except ValueError:
+                raise HTTPError(400, "Redaction zones are not valid JSON")
+            if not isinstance(zones, dict):
+                raise HTTPError(400, "Redaction zones must map pageIndex -> list of rects")
+            options["zones"] = zones
+        return pipeline, options
+
+    async def _process(self, request: dict, writer: asyncio.StreamWriter) -> None:
+        pipeline, options = self._job_options(request)
+
+        # Backpressure: refuse work once every worker is busy and the queue is full
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPError(503, "Server busy, retry later", {"Retry-After": "1"})
+
+        self.pending += 1
+        started = time.perf_counter()
+        executor = self.executor
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(executor, run_pipeline, pipeline, request["body"], options)
+        except BrokenProcessPool as e:
+            self.failed += 1
+            self._replace_pool(executor)
+            raise HTTPError(500, f"Worker pool failed: {e}")
+        except Exception as e:
+            # Unreadable or unsupported PDFs surface as pipeline exceptions
+            self.failed += 1
+            raise HTTPError(422, f"{type(e).__name__}: {e}")
+        finally:
+            self.pending -= 1
+        elapsed = time.perf_counter() - started
+        self.latencies.append(elapsed)
+        self.completed += 1
+
+        await self._send_head(writer, 200, {
+            "Content-Type": "application/pdf",
+            "Content-Length": str(len(result)),
+            "Content-Disposition": f'attachment; filename="{pipeline.replace("+", "_")}.pdf"',
+            "X-Processing-Time-Ms": f"{elapsed * 1000:.1f}",
+        }, request["keep_alive"])
+        view = memoryview(result)
+        for offset in range(0, len(view), STREAM_CHUNK):
+            writer.write(view[offset:offset + STREAM_CHUNK])
+            await writer.drain()
+
+    async def _send_head(self, writer: asyncio.StreamWriter, status: int, headers: dict, keep_alive: bool) -> None:
+        lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}"]
+        headers = dict(headers)
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict,
+                         keep_alive: bool, headers: Optional[dict] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+        head.update(headers or {})
+        await self._send_head(writer, status, head, keep_alive)
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_error(self, writer: asyncio.StreamWriter, error: HTTPError, keep_alive: bool) -> None:
+        await self._send_json(writer, error.status, {"error": str(error)}, keep_alive, error.headers)
+
+
+async def serve(args) -> None:
+    service = ClearingService(args.host, args.port, args.workers, args.queue_limit,
+                              args.max_upload_mb * 1024 * 1024)
+    await service.start()
+    print(f"Clearing service listening on http://{service.host}:{service.port}")
+    print(f"  Workers: {service.workers}, queue limit: {service.queue_limit}")
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP service for clearing and purging PDF uploads.")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=8080, help="Port (default: 8080)")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="Worker processes (default: 0 = one per CPU)")
+    parser.add_argument("-q", "--queue-limit", type=int, default=16,
+                        help="Jobs allowed to wait for a worker before returning 503 (default: 16)")
+    parser.add_argument("--max-upload-mb", type=int, default=100,
+                        help="Largest accepted upload in MB (default: 100)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
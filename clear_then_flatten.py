@@ -1,29 +1,20 @@
-import sys
-from pypdf import PdfReader, PdfWriter
 
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: python clear_then_flatten.py input.pdf output.pdf")
-        sys.exit(1)
+import argparse
+from pypdf import PdfReader, PdfWriter
 
-    input_pdf = sys.argv[1]
-    output_pdf = sys.argv[2]
+from batch_clear_flatten import field_page_index
+from save_profiles import DEFAULT_PROFILE, PYPDF_PROFILES, write_pypdf
 
+def clear_then_flatten(input_pdf: str, output_pdf: str, profile: str = DEFAULT_PROFILE) -> bool:
+    """Clear all form field values, flatten the form and write output_pdf; returns True."""
     reader = PdfReader(input_pdf)
-    writer = PdfWriter()
-
-    # Copy pages
-    for page in reader.pages:
-        writer.add_page(page)
+    # Clone the whole document so the writer keeps the /AcroForm
+    writer = PdfWriter(clone_from=reader)
 
-    # Attempt to clear form fields
-    if reader.get_fields():
-        fields = reader.get_fields()
-        # Update each field value to empty
-        writer.update_page_form_field_values(
-            writer.pages[0],  # pypdf requires a page reference; values apply across doc
-            {name: "" for name in fields.keys()}
-        )
+    # Attempt to clear form fields, passing each page only the fields whose widgets it holds
+    if "/AcroForm" in writer._root_object:
+        for page_num, names in field_page_index(writer).items():
+            writer.update_page_form_field_values(writer.pages[page_num], {name: "" for name in names})
 
     # Flatten form fields (best-effort)
     try:
@@ -32,11 +23,20 @@ def main():
         # Some versions may not have this; still save cleared values
         pass
 
-    with open(output_pdf, "wb") as f:
-        writer.write(f)
+    write_pypdf(writer, output_pdf, profile)
+    return True
 
-    print(f"Done. Output: {output_pdf}")
+def main():
+    parser = argparse.ArgumentParser(usage="python clear_then_flatten.py input.pdf output.pdf [--profile PROFILE]")
+    parser.add_argument("input_pdf")
+    parser.add_argument("output_pdf")
+    parser.add_argument("-p", "--profile", choices=list(PYPDF_PROFILES), default=DEFAULT_PROFILE,
+                        help="Save profile (default: standard)")
+    args = parser.parse_args()
+
+    clear_then_flatten(args.input_pdf, args.output_pdf, args.profile)
+
+    print(f"Done. Output: {args.output_pdf}")
 
 if __name__ == "__main__":
     main()
-
@@ -1,77 +1,288 @@
 """
 Embed JSON data directly into HTML file to avoid CORS issues
+
+With --catalog, the data is queried from the catalog (catalog.db, see
+catalog.py) when it holds search results, else read from
+form_search_results.json.
+
+It is embedded in a compact columnar form rather than as an array of
+records:
+- state, license_type and app_type are dictionary-encoded columns of
+  small integers;
+- every other string (titles, URLs) is interned once in a string table,
+  sorted so that URLs of the same site sit next to each other;
+- URLs drop a shared prefix such as the DuckDuckGo redirect;
+- suggested URLs are stored as a reference to their list of paths under
+  the board URL.
+The JSON is minified, and decodeForms() in index.html rebuilds the records.
+
+The search index is built here too: every word of the state names and
+abbreviations, license types and application types maps to the dictionary
+values it occurs in, and each value maps to its sorted record ids
+(delta-encoded). The page expands the words into their prefixes once at
+load and answers a search or a filter button by intersecting those id
+sets instead of scanning every record.
+
+Card markup comes from here as well, as templates for the card header and
+board links; badge colors are classes in the page's stylesheet. The page
+fills a header once per distinct (state, license type, application type)
+and the board links once per distinct board URL and suggested paths, keyed
+by their dictionary and string ids, so no markup is stored per record. It
+only renders the cards in view, from these fragments plus the record's
+search links.
+
+Next to the page, index.html.gz and index.html.br (when the brotli package
+is installed) are written for servers that serve precompressed files. They
+are build outputs and are not committed. The sizes before and after are
+printed.
+
+Usage:
+    python embed_json_in_html.py
+    python embed_json_in_html.py --json form_search_results.json --no-compress
 """
 
+import argparse
+import gzip
 import json
+import re
 from pathlib import Path
 
-# Read the JSON file
-json_file = Path("form_search_results.json")
-html_file = Path("index.html")
-
-with open(json_file, 'r', encoding='utf-8') as f:
-    data = json.load(f)
-
-# Filter out invalid entries
-filtered_data = [item for item in data if item.get('state') and item.get('state') != 'None' and item.get('license_type') and item.get('license_type') != 'None']
-
-# Read the HTML file
-with open(html_file, 'r', encoding='utf-8') as f:
-    html_content = f.read()
-
-# Find the script section and replace the loadForms function
-# We'll embed the data as a JavaScript variable
-json_str = json.dumps(filtered_data, ensure_ascii=False, indent=2)
-
-# Replace the async loadForms function with one that uses embedded data
-old_load_function = """        // Load form data
-        async function loadForms() {
-            try {
-                const response = await fetch('form_search_results.json');
-                allForms = await response.json();
-                
-                // Filter out unknown/invalid entries
-                allForms = allForms.filter(form => 
-                    form.state && form.state !== 'None' && 
-                    form.license_type && form.license_type !== 'None'
-                );
-                
-                filteredForms = [...allForms];
-                updateStats();
-                renderForms();
-                document.getElementById('lastUpdated').textContent = new Date().toLocaleDateString();
-            } catch (error) {
-                console.error('Error loading forms:', error);
-                document.getElementById('formGrid').innerHTML = 
-                    '<div class="no-results">Error loading form data. Please ensure form_search_results.json is available.</div>';
-            }
-        }"""
-
-new_load_function = f"""        // Embedded form data (loaded directly to avoid CORS issues)
-        const embeddedFormData = {json_str};
-        
-        // Load form data
-        function loadForms() {{
-            try {{
-                allForms = embeddedFormData;
-                filteredForms = [...allForms];
-                updateStats();
-                renderForms();
-                document.getElementById('lastUpdated').textContent = new Date().toLocaleDateString();
-            }} catch (error) {{
-                console.error('Error loading forms:', error);
-                document.getElementById('formGrid').innerHTML = 
-                    '<div class="no-results">Error loading form data.</div>';
-            }}
-        }}"""
-
-# Replace in HTML
-html_content = html_content.replace(old_load_function, new_load_function)
-
-# Write the updated HTML
-with open(html_file, 'w', encoding='utf-8') as f:
-    f.write(html_content)
-
-print(f"Successfully embedded {len(filtered_data)} forms into {html_file}")
-print(f"Filtered out {len(data) - len(filtered_data)} invalid entries")
+from catalog import DEFAULT_CATALOG, Catalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PAYLOAD_VERSION = 4
+
+# Shared URL prefixes, longest first; a URL stores the index of the first match
+URL_PREFIXES = (
+    "//duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.",
+    "//duckduckgo.com/l/?uddg=https%3A%2F%2F",
+    "//duckduckgo.com/l/?uddg=http%3A%2F%2F",
+    "https://www.",
+    "https://",
+    "http://",
+)
+
+# Card markup; the page fills each {slot} with the HTML-escaped value
+CARD_HEADER = (
+    '<div class="form-header"><div>'
+    '<div class="form-title">{state_name}</div>'
+    '<div class="form-info">{license_type} - {app_type}</div></div>'
+    '<span class="form-badge badge-{license_type}">{state}</span></div>'
+)
+BOARD_LINK = '<a href="{url}" target="_blank" rel="noopener" class="board-link">Official Board Website</a>'
+SUGGESTED_LINK = '<a href="{url}" target="_blank" rel="noopener" class="board-link suggested">Suggested Link</a>'
+
+# Searchable columns, in the facet numbering used by the index
+FACETS = ('state', 'license_type', 'app_type')
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# The page's data block, replaced on every build
+_DATA_BLOCK = re.compile(r'(<script id="formData" type="application/json">)(.*?)(</script>)', re.S)
+
+
+def load_forms(catalog_path=None, json_path="form_search_results.json"):
+    """Search results with a known state and license type, from the catalog or the JSON file."""
+    data = []
+    if catalog_path and Path(catalog_path).exists():
+        with Catalog(catalog_path) as catalog:
+            data = list(catalog.search_results(known_only=True))
+        if data:
+            print(f"Read {len(data)} application(s) from {catalog_path}")
+    if not data:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    # Filter out invalid entries
+    return [item for item in data if item.get('state') and item.get('state') != 'None' and item.get('license_type') and item.get('license_type') != 'None']
+
+
+def _split_url(url):
+    for index, prefix in enumerate(URL_PREFIXES):
+        if url.startswith(prefix):
+            return index, url[len(prefix):]
+    return -1, url
+
+
+def encode_forms(forms):
+    """
+    Columnar payload for a list of form records (see decodeForms in index.html).
+
+    Layout:
+        strings        interned strings, sorted
+        states         [abbreviation, name] pairs; the state column indexes them
+        licenseTypes, appTypes   dictionaries of the other two columns
+        urlPrefixes    URL_PREFIXES
+        suggestedPaths lists of suggested-URL suffixes under board_url
+        columns        one array per field, one entry per record:
+                         board_url       string index, or -1 for none
+                         search_results  flat [title, url prefix, url rest, ...] indexes
+                         suggested_urls  suggestedPaths index, or a list of string indexes
+    """
+    texts = set()
+    states, license_types, app_types, path_lists = {}, {}, {}, {}
+    rows = []
+    for form in forms:
+        board_url = form.get('board_url')
+        hits = []
+        for hit in form.get('search_results') or []:
+            prefix, rest = _split_url(hit['url'])
+            hits.append((hit['title'], prefix, rest))
+            texts.update((hit['title'], rest))
+        suggested = form.get('suggested_urls') or []
+        if board_url and all(url.startswith(board_url) for url in suggested):
+            paths = tuple(url[len(board_url):] for url in suggested)
+            suggested = path_lists.setdefault(paths, len(path_lists))
+        else:
+            texts.update(suggested)
+        if board_url:
+            texts.add(board_url)
+        state = states.setdefault((form['state'], form.get('state_name') or form['state']), len(states))
+        rows.append((state,
+                     license_types.setdefault(form['license_type'], len(license_types)),
+                     app_types.setdefault(form.get('app_type'), len(app_types)),
+                     board_url, hits, suggested))
+
+    strings = sorted(texts)
+    index = {text: i for i, text in enumerate(strings)}
+    return {
+        'version': PAYLOAD_VERSION,
+        'strings': strings,
+        'states': [list(pair) for pair in states],
+        'licenseTypes': list(license_types),
+        'appTypes': list(app_types),
+        'urlPrefixes': list(URL_PREFIXES),
+        'suggestedPaths': [list(paths) for paths in path_lists],
+        'columns': {
+            'state': [row[0] for row in rows],
+            'license_type': [row[1] for row in rows],
+            'app_type': [row[2] for row in rows],
+            'board_url': [index[row[3]] if row[3] else -1 for row in rows],
+            'search_results': [[i for title, prefix, rest in row[4] for i in (index[title], prefix, index[rest])]
+                               for row in rows],
+            'suggested_urls': [row[5] if isinstance(row[5], int) else [index[url] for url in row[5]]
+                               for row in rows],
+        },
+    }
+
+
+def _delta(ids):
+    """Sorted ids as gaps from the previous id (the first from 0)."""
+    return [current - previous for previous, current in zip([0] + ids, ids)]
+
+
+def build_search_index(payload):
+    """
+    Search index for an encode_forms payload:
+        words   {word: [facet, value, facet, value, ...]}, facet indexing FACETS
+        facets  per facet, per dictionary value, the delta-encoded ids of its records
+    Words are lowercase [a-z0-9] runs, as tokenized by the page, which maps
+    each of their prefixes to the union of the words' values.
+    """
+    values = (
+        [f"{abbreviation} {name}" for abbreviation, name in payload['states']],
+        [value or "" for value in payload['licenseTypes']],
+        [value or "" for value in payload['appTypes']],
+    )
+    words = {}
+    for facet, facet_values in enumerate(values):
+        for value, text in enumerate(facet_values):
+            for word in dict.fromkeys(_WORD.findall(text.lower())):
+                words.setdefault(word, []).extend((facet, value))
+
+    facets = []
+    for facet, name in enumerate(FACETS):
+        ids = [[] for _ in values[facet]]
+        for record, value in enumerate(payload['columns'][name]):
+            ids[value].append(record)
+        facets.append([_delta(value_ids) for value_ids in ids])
+    return {'words': words, 'facets': facets}
+
+
+def build_fragments():
+    """Card markup templates: CARD_HEADER, BOARD_LINK and SUGGESTED_LINK."""
+    return {'header': CARD_HEADER, 'boardLink': BOARD_LINK, 'suggestedLink': SUGGESTED_LINK}
+
+
+def minified_json(value):
+    """Compact JSON that is safe inside a <script> element."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def embed(html_content, payload_json):
+    """index.html with its formData block replaced by payload_json."""
+    if not _DATA_BLOCK.search(html_content):
+        raise ValueError('index.html has no <script id="formData" type="application/json"> block')
+    return _DATA_BLOCK.sub(lambda m: m.group(1) + payload_json + m.group(3), html_content, count=1)
+
+
+def write_compressed(path):
+    """Write path.gz and, if brotli is installed, path.br; returns {suffix: size}."""
+    data = Path(path).read_bytes()
+    sizes = {}
+    gz_path = Path(f"{path}.gz")
+    gz_path.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    sizes['.gz'] = gz_path.stat().st_size
+    if brotli is not None:
+        br_path = Path(f"{path}.br")
+        br_path.write_bytes(brotli.compress(data, quality=11))
+        sizes['.br'] = br_path.stat().st_size
+    return sizes
+
+
+def _kib(size):
+    return f"{size / 1024:.1f} KiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed the form search results into index.html.")
+    parser.add_argument("--catalog", nargs="?", const=DEFAULT_CATALOG, metavar="FILE",
+                        help=f"Read search results from this catalog "
+                             f"(default when given without FILE: {DEFAULT_CATALOG})")
+    parser.add_argument("--json", default="form_search_results.json",
+                        help="Results file used when the catalog has none (default: form_search_results.json)")
+    parser.add_argument("--html", default="index.html", help="Page to embed into (default: index.html)")
+    parser.add_argument("--no-compress", action="store_true", help="Do not write the .gz/.br assets")
+    args = parser.parse_args()
+
+    filtered_data = load_forms(args.catalog, args.json)
+    html_file = Path(args.html)
+
+    # Read the HTML file
+    with open(html_file, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+
+    payload = encode_forms(filtered_data)
+    payload['index'] = build_search_index(payload)
+    payload['fragments'] = build_fragments()
+    payload_json = minified_json(payload)
+    try:
+        html_content = embed(html_content, payload_json)
+    except ValueError as e:
+        parser.error(f"{html_file}: {e}")
+
+    # Write the updated HTML
+    with open(html_file, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+    print(f"Successfully embedded {len(filtered_data)} forms into {html_file}")
+
+    # Size report: the old indent=2 array against the columnar payload
+    before = json.dumps(filtered_data, ensure_ascii=False, indent=2).encode('utf-8')
+    after = payload_json.encode('utf-8')
+    print(f"\nEmbedded data: {_kib(len(before))} (indent=2 JSON) -> {_kib(len(after))} (columnar), "
+          f"gzip {_kib(len(gzip.compress(before, 9)))} -> {_kib(len(gzip.compress(after, 9)))}")
+    print(f"Page: {_kib(html_file.stat().st_size)}")
+    if not args.no_compress:
+        for suffix, size in write_compressed(html_file).items():
+            print(f"  {html_file}{suffix}: {_kib(size)}")
+        if brotli is None:
+            print("  (install brotli to also write .br)")
+
 
+if __name__ == "__main__":
+    main()
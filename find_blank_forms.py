@@ -1,16 +1,53 @@
 """
 Web search helper to find blank application forms for each state and license type.
 This script searches for forms and provides URLs, but cannot directly download files.
+
+Searches run one at a time by default. With --concurrency N they run
+concurrently on asyncio over one pooled HTTP session, rate-limited per host
+(--rate requests/second) and retried with backoff. Either way the results
+and form_search_results.json come out in the same order. --search-url (or the
+FORM_SEARCH_URL environment variable) points the searches at another
+DuckDuckGo-compatible HTML endpoint, such as a local stand-in server.
+
+Responses are cached in .http_cache (see http_cache): a rerun within the
+TTL (--cache-ttl hours) needs no network, and older entries are
+revalidated with ETag/Last-Modified. --no-cache turns this off.
+
+Each result is appended to form_search_results.jsonl as soon as it is
+found. After a crash or Ctrl-C, --resume skips the applications already
+there. The JSON and HTML reports are built from that checkpoint.
+
+With --catalog, the applications come from the catalog (see catalog.py)
+once analyze_applications has filled it, else from blank_forms_needed.txt.
+Each result is also stored in the catalog, where embed_json_in_html reads it.
+
+Usage:
+    python find_blank_forms.py
+    python find_blank_forms.py --concurrency 8 --rate 2
+    python find_blank_forms.py --search-url http://127.0.0.1:8000/html/
+    python find_blank_forms.py --cache-ttl 1 --cache-max-mb 16
+    python find_blank_forms.py --concurrency 8 --resume
 """
 
-import requests
+import argparse
+import asyncio
+import os
+import sys
 from bs4 import BeautifulSoup
 import json
 import time
 from pathlib import Path
-from urllib.parse import quote, urljoin
+from urllib.parse import quote
 import re
 
+import http_cache
+import http_fetch
+from catalog import add_catalog_arguments, catalog_from_args
+from search_checkpoint import CHECKPOINT_NAME, SearchCheckpoint, application_key
+
+SEARCH_URL = os.environ.get("FORM_SEARCH_URL", "https://html.duckduckgo.com/html/")
+SEARCH_HEADERS = http_fetch.DEFAULT_HEADERS
+
 # State board website patterns (common URLs)
 STATE_BOARD_PATTERNS = {
     'AZ': {
@@ -109,37 +146,60 @@ def get_board_type(license_type):
         return 'pharmacy'
     return 'nursing'  # default
 
-def search_google(query, max_results=3):
+def build_query(state_name, license_type, app_type):
+    """Search query for one application."""
+    if license_type and app_type:
+        return f"{state_name} {license_type} {app_type} application blank form PDF"
+    elif license_type:
+        return f"{state_name} {license_type} application blank form PDF"
+    return f"{state_name} application blank form PDF"
+
+def search_url_for(query, search_url=SEARCH_URL):
+    """URL of the HTML results page for query."""
+    return f"{search_url}?q={quote(query)}"
+
+def parse_search_results(html, max_results=3):
+    """Title and URL of the first max_results hits on a DuckDuckGo HTML results page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    results = []
+    for link in soup.find_all('a', class_='result__a', limit=max_results):
+        href = link.get('href', '')
+        text = link.get_text(strip=True)
+        if href:
+            results.append({'title': text, 'url': href})
+    return results
+
+def search_google(query, max_results=3, search_url=SEARCH_URL, cache=None):
     """Search Google for the query and return top results."""
     try:
         # Using DuckDuckGo HTML search as fallback (no API key needed)
-        url = f"https://html.duckduckgo.com/html/?q={quote(query)}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            for link in soup.find_all('a', class_='result__a', limit=max_results):
-                href = link.get('href', '')
-                text = link.get_text(strip=True)
-                if href:
-                    results.append({'title': text, 'url': href})
-            return results
+        response = http_cache.fetch(search_url_for(query, search_url), cache, headers=SEARCH_HEADERS, timeout=10)
+        if response.status == 200:
+            return parse_search_results(response.text, max_results)
     except Exception as e:
         print(f"  Search error: {e}")
     return []
 
-def find_form_urls(state, state_name, license_type, app_type):
-    """Find URLs for blank forms."""
+async def search_async(fetcher, query, max_results=3, search_url=SEARCH_URL):
+    """search_google on an http_fetch.AsyncFetcher (shared pool, rate limit, retries)."""
+    try:
+        response = await fetcher.get(search_url_for(query, search_url))
+        if response.status == 200:
+            return parse_search_results(response.text, max_results)
+        print(f"  Search error: HTTP {response.status} for {query!r}")
+    except Exception as e:
+        print(f"  Search error: {e}")
+    return []
+
+def new_result(state, state_name, license_type, app_type, search_results):
+    """Result record for one application: board URL, search hits and suggested URLs."""
     results = {
         'state': state,
         'state_name': state_name,
         'license_type': license_type,
         'app_type': app_type,
         'board_url': None,
-        'search_results': [],
+        'search_results': search_results,
         'suggested_urls': []
     }
     
@@ -149,19 +209,6 @@ def find_form_urls(state, state_name, license_type, app_type):
         if board_type in STATE_BOARD_PATTERNS[state]:
             results['board_url'] = STATE_BOARD_PATTERNS[state][board_type]
     
-    # Create search query
-    if license_type and app_type:
-        query = f"{state_name} {license_type} {app_type} application blank form PDF"
-    elif license_type:
-        query = f"{state_name} {license_type} application blank form PDF"
-    else:
-        query = f"{state_name} application blank form PDF"
-    
-    # Search for forms
-    print(f"  Searching: {query}")
-    search_results = search_google(query, max_results=5)
-    results['search_results'] = search_results
-    
     # Create suggested URLs based on common patterns
     if results['board_url']:
         base = results['board_url']
@@ -176,19 +223,54 @@ def find_form_urls(state, state_name, license_type, app_type):
     
     return results
 
-def main():
-    # Load the applications list
-    applications_file = Path("blank_forms_needed.txt")
-    if not applications_file.exists():
-        print("Error: blank_forms_needed.txt not found. Run analyze_applications.py first.")
-        return
+def find_form_urls(state, state_name, license_type, app_type, search_url=SEARCH_URL, cache=None):
+    """Find URLs for blank forms."""
+    query = build_query(state_name, license_type, app_type)
     
-    # Parse applications from the file
-    applications = []
+    # Search for forms
+    print(f"  Searching: {query}")
+    search_results = search_google(query, max_results=5, search_url=search_url, cache=cache)
+    return new_result(state, state_name, license_type, app_type, search_results)
+
+async def find_all_form_urls_async(applications, concurrency=http_fetch.DEFAULT_CONCURRENCY,
+                                   rate=http_fetch.DEFAULT_RATE, burst=http_fetch.DEFAULT_BURST,
+                                   retries=http_fetch.DEFAULT_RETRIES, search_url=SEARCH_URL,
+                                   cache=None, on_result=None):
+    """
+    find_form_urls for every application, concurrently.
+    
+    Returns the results in application order. When on_result is given,
+    on_result(index, app, result) is called as each one finishes instead
+    and None is returned, so a long run does not hold every result.
+    """
+    results = None if on_result else [None] * len(applications)
+    pending = iter(enumerate(applications))
+    
+    async with http_fetch.AsyncFetcher(concurrency=concurrency, rate=rate, burst=burst,
+                                       retries=retries, cache=cache) as fetcher:
+        # A fixed set of workers pulls applications, so only `concurrency`
+        # searches (not one task per application) exist at any time
+        async def worker():
+            for index, app in pending:
+                query = build_query(app['state_name'], app['license_type'], app['app_type'])
+                search_results = await search_async(fetcher, query, max_results=5, search_url=search_url)
+                result = new_result(app['state'], app['state_name'], app['license_type'], app['app_type'],
+                                    search_results)
+                if on_result:
+                    on_result(index + 1, app, result)
+                else:
+                    results[index] = result
+        
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results
+
+def load_applications(applications_file):
+    """Applications listed in blank_forms_needed.txt (entries with a known state and license)."""
     with open(applications_file, 'r', encoding='utf-8') as f:
         content = f.read()
         
     # Extract application info
+    applications = []
     pattern = r'(\w+) \((\w+)\) - (.+?) - (.+?)\n'
     matches = re.findall(pattern, content)
     
@@ -201,41 +283,33 @@ def main():
                 'license_type': license_type,
                 'app_type': app_type
             })
+    return applications
+
+def print_result(result):
+    if result['board_url']:
+        print(f"  Board URL: {result['board_url']}")
     
-    print(f"Found {len(applications)} applications to search for\n")
-    print("=" * 80)
-    
-    all_results = []
-    
-    for i, app in enumerate(applications, 1):
-        print(f"\n[{i}/{len(applications)}] {app['state_name']} ({app['state']}) - {app['license_type']} - {app['app_type']}")
-        result = find_form_urls(
-            app['state'],
-            app['state_name'],
-            app['license_type'],
-            app['app_type']
-        )
-        all_results.append(result)
-        
-        if result['board_url']:
-            print(f"  Board URL: {result['board_url']}")
-        
-        if result['search_results']:
-            print(f"  Found {len(result['search_results'])} search results:")
-            for idx, sr in enumerate(result['search_results'][:3], 1):
-                print(f"    {idx}. {sr['title'][:60]}...")
-                print(f"       {sr['url']}")
-        
-        # Small delay to avoid rate limiting
-        time.sleep(1)
-    
-    # Save results to JSON
-    output_file = Path("form_search_results.json")
+    if result['search_results']:
+        print(f"  Found {len(result['search_results'])} search results:")
+        for idx, sr in enumerate(result['search_results'][:3], 1):
+            print(f"    {idx}. {sr['title'][:60]}...")
+            print(f"       {sr['url']}")
+
+def write_json(results, output_file):
+    """
+    Write results as a JSON array, one record at a time (same text as
+    json.dump(list(results), f, indent=2, ensure_ascii=False)).
+    """
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_results, f, indent=2, ensure_ascii=False)
-    
-    # Create HTML report
-    html_file = Path("form_search_results.html")
+        first = True
+        for result in results:
+            f.write("[\n  " if first else ",\n  ")
+            f.write(json.dumps(result, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+            first = False
+        f.write("[]" if first else "\n]")
+
+def write_html(results, html_file):
+    """Write the HTML report, one record at a time."""
     with open(html_file, 'w', encoding='utf-8') as f:
         f.write("""<!DOCTYPE html>
 <html>
@@ -254,7 +328,7 @@ def main():
     <h1>Blank Application Form Search Results</h1>
 """)
         
-        for result in all_results:
+        for result in results:
             f.write(f"""
     <div class="app">
         <h2>{result['state_name']} ({result['state']}) - {result['license_type']} - {result['app_type']}</h2>
@@ -282,21 +356,125 @@ def main():
 </body>
 </html>
 """)
+
+def main():
+    parser = argparse.ArgumentParser(description="Search for blank application forms.")
+    parser.add_argument("-c", "--concurrency", type=int, default=1,
+                        help="Searches in flight at once (default: 1 = one at a time, 1s apart)")
+    parser.add_argument("--rate", type=float, default=http_fetch.DEFAULT_RATE,
+                        help=f"Concurrent mode: requests per second per host (default: {http_fetch.DEFAULT_RATE:g}, 0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=http_fetch.DEFAULT_BURST,
+                        help=f"Concurrent mode: back-to-back requests allowed per host (default: {http_fetch.DEFAULT_BURST})")
+    parser.add_argument("--retries", type=int, default=http_fetch.DEFAULT_RETRIES,
+                        help=f"Concurrent mode: retries after errors, 429 and 5xx (default: {http_fetch.DEFAULT_RETRIES})")
+    parser.add_argument("--search-url", default=SEARCH_URL,
+                        help=f"HTML search endpoint (default: {SEARCH_URL})")
+    parser.add_argument("--cache-dir", default=http_cache.DEFAULT_CACHE_DIR,
+                        help=f"HTTP response cache directory (default: {http_cache.DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-ttl", type=float, default=http_cache.DEFAULT_TTL / 3600,
+                        help=f"Hours a cached response is used without revalidation (default: {http_cache.DEFAULT_TTL / 3600:g})")
+    parser.add_argument("--cache-max-mb", type=float, default=http_cache.DEFAULT_MAX_BYTES / 2**20,
+                        help=f"Cache size limit in MiB (default: {http_cache.DEFAULT_MAX_BYTES / 2**20:g})")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch from the network")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_NAME,
+                        help=f"JSON-lines file each result is appended to (default: {CHECKPOINT_NAME})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the checkpoint and skip applications it already holds")
+    add_catalog_arguments(parser)
+    args = parser.parse_args()
+    cache = None if args.no_cache else http_cache.HttpCache(
+        args.cache_dir, ttl=args.cache_ttl * 3600, max_bytes=int(args.cache_max_mb * 2**20))
+    catalog = catalog_from_args(args)
+    
+    # Load the applications list
+    applications_file = Path("blank_forms_needed.txt")
+    if catalog and catalog.input_count():
+        applications = catalog.forms_needed()
+        print(f"Reading applications from the catalog ({args.catalog})")
+    elif applications_file.exists():
+        applications = load_applications(applications_file)
+    else:
+        print("Error: blank_forms_needed.txt not found. Run analyze_applications.py first.")
+        return
+    
+    checkpoint = SearchCheckpoint(args.checkpoint, resume=args.resume)
+    
+    # Search each distinct application once, skipping those already checkpointed
+    pending = {}
+    for app in applications:
+        if app not in checkpoint:
+            pending.setdefault(application_key(app), app)
+    pending = list(pending.values())
+    
+    print(f"Found {len(applications)} applications to search for\n")
+    if args.resume:
+        print(f"Resuming from {args.checkpoint}: {len(applications) - len(pending)} already done, {len(pending)} to search\n")
+    print("=" * 80)
+    
+    started = time.perf_counter()
+    try:
+        if args.concurrency > 1:
+            def report(index, app, result):
+                checkpoint.append(result)
+                if catalog:
+                    catalog.record_search(result)
+                print(f"\n[{index}/{len(pending)}] {app['state_name']} ({app['state']}) - {app['license_type']} - {app['app_type']}")
+                print_result(result)
+            
+            asyncio.run(find_all_form_urls_async(
+                pending, concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+                retries=args.retries, search_url=args.search_url, cache=cache, on_result=report))
+        else:
+            for i, app in enumerate(pending, 1):
+                print(f"\n[{i}/{len(pending)}] {app['state_name']} ({app['state']}) - {app['license_type']} - {app['app_type']}")
+                hits = cache.hits if cache else 0
+                result = find_form_urls(
+                    app['state'],
+                    app['state_name'],
+                    app['license_type'],
+                    app['app_type'],
+                    search_url=args.search_url,
+                    cache=cache
+                )
+                checkpoint.append(result)
+                if catalog:
+                    catalog.record_search(result)
+                print_result(result)
+                
+                # Small delay to avoid rate limiting (not needed after a cache hit)
+                if i < len(pending) and (cache is None or cache.hits == hits):
+                    time.sleep(1)
+    except KeyboardInterrupt:
+        checkpoint.close()
+        if catalog:
+            catalog.close()
+        print(f"\n\nInterrupted: {len(checkpoint)} of {len(applications)} applications saved to {args.checkpoint}")
+        print("Run again with --resume to continue.")
+        sys.exit(130)
+    
+    # Build the reports from the checkpoint, in application order
+    output_file = Path("form_search_results.json")
+    write_json(checkpoint.results(applications), output_file)
+    html_file = Path("form_search_results.html")
+    write_html(checkpoint.results(applications), html_file)
+    checkpoint.close()
+    if catalog:
+        catalog.close()
     
     print(f"\n\nResults saved to:")
     print(f"  - {output_file} (JSON)")
     print(f"  - {html_file} (HTML - open in browser)")
-    print(f"\nTotal applications searched: {len(all_results)}")
+    print(f"\nTotal applications searched: {len(pending)} in {time.perf_counter() - started:.1f}s")
+    if cache:
+        print(cache.summary())
 
 if __name__ == "__main__":
     try:
-        import requests
         from bs4 import BeautifulSoup
     except ImportError:
         print("Installing required packages...")
         import subprocess
-        subprocess.check_call(["pip", "install", "requests", "beautifulsoup4"])
-        import requests
+        subprocess.check_call(["pip", "install", "beautifulsoup4"])
         from bs4 import BeautifulSoup
     
     main()
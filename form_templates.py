@@ -0,0 +1,239 @@
+"""
+Form template fingerprints and an on-disk field-schema cache.
+
+Most inputs are the same board form filled in by different applicants. Every
+filled copy of a form shares its zone_registry.structural_fingerprint (page
+count, page sizes, field names and types), which is what groups inputs by
+template.
+
+The cache stores each form's field schema once as JSON: each field's xref,
+name, type, flags, page and rect. The clearing engines reuse it to skip
+rediscovering the field tree. Schemas are looked up by a cheap key built
+from the page count and the raw /AcroForm /Fields array (see lookup_key),
+so a hit reads a handful of objects and never walks the field tree or the
+pages. Copies that were re-saved with renumbered objects
+get a different key and a fresh schema.
+
+Usage:
+    python form_templates.py group *.pdf            # group inputs by template
+    python form_templates.py group -d forms --json templates.json
+    python form_templates.py schema form.pdf        # print a form's field schema
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+import pdf_metrics
+from pdf_clearer import iter_acroform_fields
+from zone_registry import structural_fingerprint
+
+SCHEMA_VERSION = 2
+DEFAULT_CACHE_DIR = ".template_cache"
+
+_REF = re.compile(r"(\d+) \d+ R")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?|-?\.\d+")
+
+# One TemplateCache per directory per process
+_caches: Dict[str, "TemplateCache"] = {}
+
+
+def walk_fields(doc: fitz.Document) -> List[tuple]:
+    """(xref, field_type, flags, partial_name) for every node of the field tree."""
+    fields = []
+    for xref, field_type, flags in iter_acroform_fields(doc):
+        name_type, name = doc.xref_get_key(xref, "T")
+        fields.append((xref, field_type, flags, None if name_type == "null" else name))
+    return fields
+
+
+def lookup_key(doc: fitz.Document) -> str:
+    """
+    Cache key of doc's field schema: page count, the raw /AcroForm /Fields
+    array and the /T of its first and last field as a spot check. Cheap to
+    compute; it does not descend into /Kids or touch page content.
+    """
+    fields_type, fields = doc.xref_get_key(doc.pdf_catalog(), "AcroForm/Fields")
+    if fields_type == "xref":
+        fields = doc.xref_object(int(_REF.findall(fields)[0]), compressed=True)
+    digest = hashlib.sha1(f"pages:{doc.page_count}\n{fields}\n".encode())
+    top_level = _REF.findall(fields)
+    for xref in (int(x) for x in top_level[:1] + top_level[-1:]):
+        digest.update(f"{doc.xref_get_key(xref, 'T')[1]}\n".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def _rect(value: str) -> Optional[List[float]]:
+    numbers = [float(n) for n in _NUMBER.findall(value or "")]
+    return numbers[:4] if len(numbers) >= 4 else None
+
+
+def build_schema(doc: fitz.Document, key: Optional[str] = None) -> dict:
+    """Field schema of doc: one record per field-tree node, with page and rect for widgets."""
+    fields = walk_fields(doc)
+    placement = {}
+    for page_num in range(doc.page_count):
+        annots_type, annots = doc.xref_get_key(doc.page_xref(page_num), "Annots")
+        if annots_type == "null":
+            continue
+        for xref in (int(x) for x in _REF.findall(annots)):
+            placement.setdefault(xref, page_num)
+
+    records = []
+    for xref, field_type, flags, name in fields:
+        page = placement.get(xref)
+        records.append({
+            "xref": xref,
+            "name": name,
+            "type": field_type,
+            "flags": flags,
+            "page": page,
+            "rect": _rect(doc.xref_get_key(xref, "Rect")[1]) if page is not None else None,
+        })
+    return {
+        "version": SCHEMA_VERSION,
+        "key": key or lookup_key(doc),
+        "fingerprint": structural_fingerprint(doc),
+        "pages": doc.page_count,
+        "fields": records,
+    }
+
+
+class TemplateCache:
+    """
+    Field schemas by lookup_key, kept in memory and as one JSON file per
+    key in directory.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = Path(directory)
+        self._schemas: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        if key not in self._schemas:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    schema = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if schema.get("version") != SCHEMA_VERSION:
+                return None
+            self._schemas[key] = schema
+        return self._schemas[key]
+
+    def put(self, schema: dict) -> None:
+        """Store schema in memory and on disk (atomically, so concurrent workers are safe)."""
+        key = schema["key"]
+        self._schemas[key] = schema
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path(key).with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+        os.replace(tmp_path, self._path(key))
+
+    def schema_for(self, doc: fitz.Document) -> dict:
+        """
+        Cached schema for doc's lookup_key, otherwise a freshly built one,
+        which is stored for the next copy of the form.
+        """
+        key = lookup_key(doc)
+        schema = self.get(key)
+        if schema is not None:
+            self.hits += 1
+            pdf_metrics.count("template_cache_hits")
+            return schema
+        self.misses += 1
+        pdf_metrics.count("template_cache_misses")
+        schema = build_schema(doc, key)
+        self.put(schema)
+        return schema
+
+
+def get_cache(directory: str = DEFAULT_CACHE_DIR) -> TemplateCache:
+    """Process-wide TemplateCache for directory."""
+    key = str(Path(directory).resolve())
+    if key not in _caches:
+        _caches[key] = TemplateCache(directory)
+    return _caches[key]
+
+
+def group_by_template(pdf_paths: List[str], cache: Optional[TemplateCache] = None) -> List[dict]:
+    """
+    Group PDFs by template fingerprint.
+
+    Returns:
+        One {'fingerprint', 'files', 'fields', 'pages'} dict per template,
+        largest group first.
+    """
+    groups = defaultdict(list)
+    info = {}
+    for path in pdf_paths:
+        try:
+            with fitz.open(path) as doc:
+                schema = cache.schema_for(doc) if cache else build_schema(doc)
+        except Exception as e:
+            groups[f"error: {type(e).__name__}"].append(str(path))
+            continue
+        groups[schema["fingerprint"]].append(str(path))
+        info[schema["fingerprint"]] = (len(schema["fields"]), schema["pages"])
+    return sorted(
+        ({"fingerprint": fingerprint, "files": files,
+          "fields": info.get(fingerprint, (None, None))[0], "pages": info.get(fingerprint, (None, None))[1]}
+         for fingerprint, files in groups.items()),
+        key=lambda group: (-len(group["files"]), group["fingerprint"]),
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fingerprint form templates and cache their field schemas.")
+    parser.add_argument("command", choices=["group", "schema"])
+    parser.add_argument("pdfs", nargs="*", help="PDF files")
+    parser.add_argument("-d", "--directory", help="Also include every PDF in this directory")
+    parser.add_argument("-c", "--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Schema cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--json", help="Write the grouping to this JSON file")
+    args = parser.parse_args()
+
+    pdfs = list(args.pdfs)
+    if args.directory:
+        pdfs += sorted(str(p) for p in Path(args.directory).glob("*.pdf"))
+    if not pdfs:
+        parser.error("no PDF files given")
+
+    cache = get_cache(args.cache_dir)
+    if args.command == "schema":
+        for pdf in pdfs:
+            with fitz.open(pdf) as doc:
+                print(json.dumps(cache.schema_for(doc), indent=2))
+        return
+
+    groups = group_by_template(pdfs, cache)
+    print(f"{len(pdfs)} file(s), {len(groups)} template(s)\n")
+    for group in groups:
+        print(f"{group['fingerprint'][:16]}  {len(group['files']):>5} file(s)  "
+              f"{group['pages'] or '-'} page(s)  {group['fields'] or 0} field(s)")
+        for path in group["files"][:3]:
+            print(f"    {path}")
+        if len(group["files"]) > 3:
+            print(f"    ... {len(group['files']) - 3} more")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(groups, f, indent=2)
+        print(f"\nGrouping saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+On-disk HTTP response cache for the form finder's searches and page fetches.
+
+Responses are stored one JSON file per normalized URL: scheme and host
+lowercased, the fragment dropped, query parameters sorted and whitespace in
+their values collapsed. So the same search query always maps to the same entry.
+Only 200 responses are cached.
+
+- A fresh entry (younger than the TTL) is returned with no network request.
+- A stale entry with an ETag or Last-Modified is revalidated with a
+  conditional request. On 304 Not Modified it is served again and its age reset.
+- Otherwise the URL is fetched and the entry replaced.
+
+After each store, the least recently used entries are evicted until the
+directory fits within max_bytes.
+
+    cache = HttpCache(".http_cache", ttl=24 * 3600)
+    response = fetch(url, cache)              # blocking, on a requests session
+    AsyncFetcher(cache=cache).get(url)        # asyncio (see http_fetch)
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from http_fetch import DEFAULT_HEADERS, DEFAULT_TIMEOUT, FetchResponse
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = ".http_cache"
+DEFAULT_TTL = 7 * 24 * 3600      # seconds
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Response headers kept with a cached body
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def normalize_url(url: str) -> str:
+    """Cache key form of a URL (see module docstring)."""
+    parts = urlsplit(url.strip())
+    query = sorted((key, " ".join(value.split())) for key, value in parse_qsl(parts.query, keep_blank_values=True))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+
+class HttpCache:
+    """
+    Cached 200 responses by normalized URL, one JSON file each in directory.
+
+    Args:
+        directory: Cache directory (created on first store)
+        ttl: Seconds an entry is served without revalidation
+        max_bytes: Size the directory is trimmed to after each store
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evicted = 0
+        self._size: Optional[int] = None
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(normalize_url(url).encode()).hexdigest()}.json"
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """Stored entry for url (fresh or stale), or None."""
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != CACHE_VERSION:
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers from an entry's validators."""
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def response(self, entry: dict) -> FetchResponse:
+        """FetchResponse for a cached entry; marks it recently used."""
+        try:
+            os.utime(self._path(entry["url"]))
+        except OSError:
+            pass
+        return FetchResponse(entry["final_url"], entry["status"], CaseInsensitiveDict(entry["headers"]),
+                             entry["text"], attempts=0)
+
+    def store(self, url: str, response: FetchResponse) -> None:
+        """Store a 200 response (atomically, so concurrent writers are safe), then evict."""
+        if response.status != 200:
+            return
+        entry = {
+            "version": CACHE_VERSION,
+            "url": url,
+            "final_url": response.url,
+            "stored_at": time.time(),
+            "status": response.status,
+            "headers": {name: response.headers[name] for name in _KEPT_HEADERS if response.headers.get(name)},
+            "text": response.text,
+        }
+        self._write(entry)
+
+    def refresh(self, entry: dict) -> None:
+        """Reset a revalidated (304) entry's age."""
+        entry["stored_at"] = time.time()
+        self._write(entry)
+
+    def _write(self, entry: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(entry["url"])
+        tmp_path = path.with_suffix(f".{os.getpid()}.{id(entry)}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        try:
+            old_size = path.stat().st_size
+        except OSError:
+            old_size = 0
+        os.replace(tmp_path, path)
+        if self._size is not None:
+            self._size += path.stat().st_size - old_size
+        self.evict()
+
+    def _entries(self) -> list:
+        """(mtime, size, path) of every stored entry."""
+        try:
+            with os.scandir(self.directory) as it:
+                return [(e.stat().st_mtime, e.stat().st_size, e.path) for e in it if e.name.endswith(".json")]
+        except OSError:
+            return []
+
+    def size_bytes(self) -> int:
+        """Total size of the stored entries (scanned once, then tracked)."""
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the directory fits in max_bytes."""
+        if self.size_bytes() <= self.max_bytes:
+            return
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evicted += 1
+        self._size = total
+
+    def summary(self) -> str:
+        return (f"HTTP cache: {self.hits} hit(s), {self.revalidated} revalidated, "
+                f"{self.misses} miss(es), {self.evicted} evicted")
+
+
+def fetch(url: str, cache: Optional[HttpCache] = None, session=None,
+          headers: Optional[dict] = None, timeout: float = DEFAULT_TIMEOUT) -> FetchResponse:
+    """
+    Blocking GET through the cache (session defaults to the requests module).
+    Raises requests.RequestException like requests.get.
+    """
+    session = session or requests
+    headers = dict(headers or DEFAULT_HEADERS)
+    entry = cache.lookup(url) if cache else None
+    if entry is not None and cache.is_fresh(entry):
+        cache.hits += 1
+        return cache.response(entry)
+    if entry is not None:
+        headers.update(cache.conditional_headers(entry))
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if entry is not None and response.status_code == 304:
+        cache.revalidated += 1
+        cache.refresh(entry)
+        return cache.response(entry)
+    result = FetchResponse(response.url, response.status_code, response.headers, response.text)
+    if cache is not None:
+        cache.misses += 1
+        cache.store(url, result)
+    return result
@@ -0,0 +1,268 @@
+"""
+Concurrent, rate-limited HTTP fetching for the form finder.
+
+AsyncFetcher runs GET requests from asyncio code over one shared
+requests.Session, so every request reuses the same per-host connection pool.
+The blocking requests calls run on a thread pool sized to the concurrency
+limit. Each host gets its own token bucket (rate requests/second, bursts of
+up to `burst`). Connection errors, timeouts, 429 and 5xx responses are retried
+with exponential backoff and jitter, and a Retry-After header is honoured.
+Passing consume= streams an HTML body to consume(text_chunk) as it arrives
+(on the worker thread), up to max_bytes, so a parser can work on it
+without waiting for the whole page. Non-HTML bodies are not read.
+With an http_cache.HttpCache, fresh cached responses are returned without
+waiting for a slot or a token, and stale ones are revalidated.
+
+    async with AsyncFetcher(concurrency=8, rate=2.0) as fetcher:
+        responses = await asyncio.gather(*(fetcher.get(url) for url in urls))
+"""
+
+import asyncio
+import codecs
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 1.0       # requests per second per host
+DEFAULT_BURST = 1
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5    # seconds before the first retry, doubled each time
+DEFAULT_TIMEOUT = 10
+STREAM_CHUNK = 16 * 1024
+MAX_RETRY_AFTER = 60
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+class FetchResponse:
+    """Outcome of a fetch: final URL, status, headers (case-insensitive) and decoded body text."""
+
+    __slots__ = ("url", "status", "headers", "text", "attempts")
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], text: str, attempts: int = 1):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.text = text
+        self.attempts = attempts
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+def is_html(headers: Mapping[str, str]) -> bool:
+    """True for HTML (or unlabelled) responses."""
+    content_type = (headers.get("Content-Type") or "").lower()
+    return not content_type or "html" in content_type
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, at most `burst`
+    stored. A rate of None or 0 means no limit.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        if not self.rate:
+            return
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def host_of(url: str) -> str:
+    """Rate-limiting key of a URL: its host[:port]."""
+    return urlsplit(url).netloc.lower()
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class AsyncFetcher:
+    """
+    Shared connection pool, per-host rate limits and retries for concurrent GETs.
+    Create and use it inside one event loop.
+
+    Args:
+        concurrency: Requests in flight at once (also the pool size per host)
+        rate: Requests per second per host (None or 0 = unlimited)
+        burst: Requests a host may receive back to back before the rate applies
+        retries: Extra attempts after a connection error, timeout, 429 or 5xx
+        backoff: Delay before the first retry in seconds; doubles on each retry
+        timeout: Per-request timeout in seconds
+        cache: Optional http_cache.HttpCache for the responses
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rate: Optional[float] = DEFAULT_RATE,
+                 burst: int = DEFAULT_BURST, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, timeout: float = DEFAULT_TIMEOUT,
+                 headers: Optional[dict] = None, cache=None):
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="fetch")
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Token bucket of the URL's host."""
+        host = host_of(url)
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    def _get(self, url: str, headers: Optional[dict], consume=None,
+             max_bytes: Optional[int] = None, begin=None) -> FetchResponse:
+        """Blocking GET on the shared session; runs on the thread pool."""
+        if consume is None:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            return FetchResponse(response.url, response.status_code, response.headers, response.text)
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            parts = []
+            if response.status_code == 200 and is_html(response.headers):
+                if begin is not None:
+                    begin(response.url)
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                size = 0
+                for chunk in response.iter_content(STREAM_CHUNK):
+                    text = decoder.decode(chunk)
+                    consume(text)
+                    parts.append(text)
+                    size += len(chunk)
+                    if max_bytes and size >= max_bytes:
+                        break
+            return FetchResponse(response.url, response.status_code, response.headers, "".join(parts))
+
+    async def get(self, url: str, headers: Optional[dict] = None, consume=None,
+                  max_bytes: Optional[int] = None, begin=None) -> FetchResponse:
+        """
+        GET url, waiting for a concurrency slot and the host's token bucket
+        before every attempt. With consume, a 200 HTML body is streamed to
+        consume(text) (at most max_bytes of it) and is also kept in .text;
+        a cached body is passed to consume in one piece. begin(final_url),
+        if given, is called with the URL after redirects before the first
+        text is consumed.
+
+        Returns:
+            The final FetchResponse, which may be a non-2xx status once
+            retries are used up.
+
+        Raises:
+            requests.RequestException: The last attempt failed to connect or timed out.
+        """
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                self.cache.hits += 1
+                return self._cached(entry, consume, begin)
+            headers = {**(headers or {}), **self.cache.conditional_headers(entry)}
+
+        loop = asyncio.get_running_loop()
+        bucket = self.bucket(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            await bucket.acquire()
+            error = response = None
+            async with self._slots:
+                self.requests += 1
+                try:
+                    response = await loop.run_in_executor(self.executor, self._get, url, headers,
+                                                          consume, max_bytes, begin)
+                    response.attempts = attempt
+                except requests.RequestException as e:
+                    error = e
+
+            retryable = error is not None or response.status in RETRY_STATUSES
+            if not retryable or attempt > self.retries:
+                if error is not None:
+                    self.failed += 1
+                    raise error
+                if entry is not None and response.status == 304:
+                    self.cache.revalidated += 1
+                    self.cache.refresh(entry)
+                    return self._cached(entry, consume, begin)
+                if not response.ok:
+                    self.failed += 1
+                if self.cache is not None:
+                    self.cache.misses += 1
+                    self.cache.store(url, response)
+                return response
+
+            self.retried += 1
+            delay = self.backoff * 2 ** (attempt - 1)
+            delay += random.uniform(0, delay)
+            if response is not None:
+                delay = max(delay, _retry_after(response.headers.get("Retry-After")) or 0)
+            await asyncio.sleep(delay)
+
+    def _cached(self, entry: dict, consume, begin=None) -> FetchResponse:
+        response = self.cache.response(entry)
+        if consume is not None and response.status == 200 and is_html(response.headers):
+            if begin is not None:
+                begin(response.url)
+            consume(response.text)
+        return response
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
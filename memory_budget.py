@@ -0,0 +1,195 @@
+"""
+Bounded-memory page processing for very large PDFs.
+
+An open MuPDF document keeps every object it has parsed or modified in
+memory until it is closed, so dropping Python page and widget references
+alone does not bound RSS on 1,000+ page packets. In bounded-memory mode the
+document is processed as a working copy at the output path, a chunk of
+pages at a time. After each chunk the changes are appended to the working
+copy with an incremental save, the document is closed and reopened, and
+the process RSS is checked against an optional ceiling. The final save
+rewrites the file with the chosen save profile, so no earlier (filled-in)
+revision survives unless the profile is incremental.
+
+    budget = MemoryBudget(max_rss_mb=1024, chunk_pages=25)
+    work = budget.open(input_path, output_path)
+    try:
+        for pages in work.chunks():
+            for page_num in pages:
+                process(work.doc[page_num])
+        work.save(profile)
+    finally:
+        work.close()
+
+Going over the ceiling raises MemoryLimitExceeded, so a batch worker fails
+that one file instead of being OOM-killed. The final save still loads the
+document's whole object graph; the ceiling is checked right before it.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import shutil
+from typing import Iterator, Optional
+
+import fitz  # PyMuPDF
+
+import pdf_metrics
+from save_profiles import save_document
+
+DEFAULT_CHUNK_PAGES = 25
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+    _malloc_trim = _libc.malloc_trim
+except (OSError, AttributeError):  # not glibc
+    _malloc_trim = None
+
+
+class MemoryLimitExceeded(MemoryError):
+    """The process RSS went over the MemoryBudget ceiling."""
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process in bytes (Linux), else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def release_memory() -> None:
+    """Collect dropped objects, empty MuPDF's object store and return free heap to the OS."""
+    gc.collect()
+    fitz.TOOLS.store_shrink(100)
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+
+
+class MemoryBudget:
+    """
+    Page-chunking and RSS-ceiling settings for the bounded-memory mode.
+    Holds no per-document state, so one instance can be shared by every
+    file of a batch (and pickled to worker processes).
+
+    Args:
+        max_rss_mb: RSS ceiling in MiB, checked after every chunk (None = no ceiling)
+        chunk_pages: Pages processed between checkpoints
+    """
+
+    def __init__(self, max_rss_mb: Optional[float] = None, chunk_pages: int = DEFAULT_CHUNK_PAGES):
+        if chunk_pages < 1:
+            raise ValueError("chunk_pages must be at least 1")
+        self.max_rss_mb = max_rss_mb
+        self.chunk_pages = chunk_pages
+
+    def check(self) -> Optional[int]:
+        """
+        Raise MemoryLimitExceeded if RSS is over the ceiling even after
+        releasing memory. Returns the RSS in bytes (None where unsupported).
+        """
+        rss = current_rss_bytes()
+        if rss is None or self.max_rss_mb is None:
+            return rss
+        limit = self.max_rss_mb * 1024 * 1024
+        if rss > limit:
+            release_memory()
+            rss = current_rss_bytes()
+            if rss > limit:
+                raise MemoryLimitExceeded(
+                    f"RSS {rss / 2**20:.0f} MiB is over the {self.max_rss_mb:g} MiB ceiling")
+        return rss
+
+    def open(self, input_path: str, output_path: str) -> "ChunkedDocument":
+        """Start bounded-memory processing of input_path into output_path."""
+        return ChunkedDocument(input_path, output_path, self)
+
+
+class ChunkedDocument:
+    """
+    Working copy of a PDF at its output path, processed chunk by chunk.
+    Use .doc only inside a chunk: it is replaced at every checkpoint, and
+    page or widget objects must not be kept across chunks. Closing it
+    before save() deletes the working copy (unless it is the input file),
+    since it still holds the original content.
+    """
+
+    def __init__(self, input_path: str, output_path: str, budget: MemoryBudget):
+        self.output_path = str(output_path)
+        self.budget = budget
+        self.saved = False
+        self._copied = os.path.abspath(input_path) != os.path.abspath(self.output_path)
+        with pdf_metrics.stage("open"):
+            if self._copied:
+                shutil.copyfile(input_path, self.output_path)
+            self.doc = fitz.open(self.output_path)
+            if not self.doc.can_save_incrementally():
+                # Repaired or unusual files: rewrite once so checkpoints can append
+                self._replace(lambda doc, path: doc.save(path, garbage=1))
+
+    def _replace(self, save, reopen: bool = True) -> None:
+        """Save the working copy through save(doc, tmp_path) and replace it."""
+        tmp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        try:
+            save(self.doc, tmp_path)
+            self.doc.close()
+            os.replace(tmp_path, self.output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.doc = fitz.open(self.output_path) if reopen else None
+
+    def checkpoint(self) -> None:
+        """Append the changes so far to the working copy and reopen it with nothing cached."""
+        with pdf_metrics.stage("checkpoint"):
+            self.doc.save(self.output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            self.doc.close()
+            self.doc = None
+            release_memory()
+            self.budget.check()
+            self.doc = fitz.open(self.output_path)
+        pdf_metrics.count("page_chunks")
+
+    def chunks(self) -> Iterator[range]:
+        """Page-number ranges of at most chunk_pages pages, with a checkpoint after each."""
+        page_count = self.doc.page_count
+        for start in range(0, page_count, self.budget.chunk_pages):
+            yield range(start, min(start + self.budget.chunk_pages, page_count))
+            self.checkpoint()
+
+    def save(self, profile: str, sanitize: bool = False) -> None:
+        """Final save of the working copy with a save profile (see save_profiles)."""
+        release_memory()
+        self.budget.check()
+        with pdf_metrics.stage("save"):
+            if profile == "incremental":
+                self.doc.save(self.output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+            else:
+                self._replace(lambda doc, path: save_document(doc, path, profile, sanitize),
+                              reopen=False)
+        self.saved = True
+
+    def close(self) -> None:
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+        if self._copied and not self.saved and os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+def add_memory_arguments(parser) -> None:
+    """Add --max-rss-mb and --chunk-pages to an argparse parser."""
+    parser.add_argument("--max-rss-mb", type=float,
+                        help="Bounded-memory mode: fail a file once RSS exceeds this many MiB")
+    parser.add_argument("--chunk-pages", type=int,
+                        help="Bounded-memory mode: pages processed between checkpoints "
+                             f"(default: {DEFAULT_CHUNK_PAGES})")
+
+
+def budget_from_args(args) -> Optional[MemoryBudget]:
+    """MemoryBudget for the parsed arguments, or None if neither option was given."""
+    if args.max_rss_mb is None and args.chunk_pages is None:
+        return None
+    return MemoryBudget(args.max_rss_mb, args.chunk_pages or DEFAULT_CHUNK_PAGES)
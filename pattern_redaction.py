@@ -0,0 +1,203 @@
+"""
+Pattern-based TRUE redaction.
+Finds SSNs, dates, emails, phone and license numbers (or custom regexes) in
+the page text and redacts them, for filled-in content that is baked into the
+page rather than held in form fields.
+
+Each page's words and positions are extracted once into a PageWordIndex.
+All patterns are compiled into a single regex and matched against that
+index in one pass, every hit becomes a redact annotation, and
+apply_redactions() runs once per page.
+
+Matches are redacted word by word, so a match inside a longer word (for
+example "Email:jane@x.org") removes the whole word.
+"""
+
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+import pdf_metrics
+from save_profiles import DEFAULT_PROFILE, SAVE_PROFILES, open_document, save_document
+
+BUILTIN_PATTERNS = {
+    "ssn": r"\b(?!000|666|9\d\d)\d{3}[- ]?(?!00)\d{2}[- ]?(?!0000)\d{4}\b",
+    "date": (r"\b(?:0?[1-9]|1[0-2])[/.-](?:0?[1-9]|[12]\d|3[01])[/.-](?:19|20)?\d{2}\b"
+             r"|\b(?:19|20)\d{2}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])\b"
+             r"|(?i:\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+"
+             r"(?:0?[1-9]|[12]\d|3[01]),?\s+(?:19|20)\d{2}\b)"),
+    "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
+    "phone": r"(?:\(\d{3}\)\s?|\b\d{3}[-.\s])\d{3}[-.\s]\d{4}\b",
+    "license_number": r"(?i:\b(?:APRN|ARNP|CNS|CNM|CRNA|LPN|LVN|RN|NP|PA|MD|DO)[-\s#:]*\d{4,10}\b)",
+}
+
+# Default set used when no pattern names are given
+DEFAULT_PATTERNS = ("ssn", "date", "email", "phone", "license_number")
+
+
+class PageWordIndex:
+    """
+    Text of one page with every character offset mapped back to its word.
+    Words on the same line are joined by a space and lines by a newline, so
+    patterns can span several words ("Jan 5, 1990", "123 45 6789").
+    """
+
+    def __init__(self, words: List[tuple]):
+        parts = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.rects: List[fitz.Rect] = []
+        self.lines: List[tuple] = []
+        offset = 0
+        previous_line = None
+        for x0, y0, x1, y1, text, block, line, _ in words:
+            if previous_line is not None:
+                separator = " " if (block, line) == previous_line else "\n"
+                parts.append(separator)
+                offset += 1
+            previous_line = (block, line)
+            self.starts.append(offset)
+            parts.append(text)
+            offset += len(text)
+            self.ends.append(offset)
+            self.rects.append(fitz.Rect(x0, y0, x1, y1))
+            self.lines.append((block, line))
+        self.text = "".join(parts)
+
+    @classmethod
+    def from_page(cls, page: fitz.Page) -> "PageWordIndex":
+        return cls(page.get_text("words"))
+
+    def rects_for_span(self, start: int, end: int) -> List[fitz.Rect]:
+        """Rectangles covering the words that overlap text[start:end], one per line."""
+        first = bisect.bisect_right(self.starts, start) - 1
+        if first < 0 or self.ends[first] <= start:
+            first += 1
+        rects: Dict[tuple, fitz.Rect] = {}
+        i = first
+        while i < len(self.starts) and self.starts[i] < end:
+            key = self.lines[i]
+            rects[key] = rects[key] | self.rects[i] if key in rects else fitz.Rect(self.rects[i])
+            i += 1
+        return list(rects.values())
+
+
+def select_patterns(names: Optional[Iterable[str]] = None,
+                    regexes: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    Build a label -> regex mapping from built-in pattern names plus custom
+    regexes (labelled custom_1, custom_2, ...). With neither given, all
+    DEFAULT_PATTERNS are used.
+    """
+    selected = {}
+    unknown = [name for name in names or () if name not in BUILTIN_PATTERNS]
+    if unknown:
+        raise ValueError(f"Unknown pattern(s): {', '.join(unknown)}. "
+                         f"Choose from: {', '.join(BUILTIN_PATTERNS)}")
+    for name in names or ():
+        selected[name] = BUILTIN_PATTERNS[name]
+    for i, regex in enumerate(regexes or (), 1):
+        selected[f"custom_{i}"] = regex
+    if not selected:
+        selected = {name: BUILTIN_PATTERNS[name] for name in DEFAULT_PATTERNS}
+    return selected
+
+
+def compile_patterns(patterns: Dict[str, str]) -> "re.Pattern":
+    """Compile label -> regex pairs into one alternation with a named group per label."""
+    for label, regex in patterns.items():
+        try:
+            compiled = re.compile(regex)
+        except re.error as e:
+            raise ValueError(f"Invalid regex for '{label}': {e}") from e
+        if compiled.groupindex:
+            raise ValueError(f"Regex for '{label}' must not use named groups")
+    return re.compile("|".join(f"(?P<{label}>{regex})" for label, regex in patterns.items()))
+
+
+def find_matches(index: PageWordIndex, regex: "re.Pattern") -> List[Tuple[str, str, List[fitz.Rect]]]:
+    """Every (label, matched text, rects) hit of regex in one page index."""
+    matches = []
+    for match in regex.finditer(index.text):
+        if match.start() == match.end():
+            continue
+        matches.append((match.lastgroup, match.group(), index.rects_for_span(match.start(), match.end())))
+    return matches
+
+
+def redact_patterns(doc: fitz.Document, regex: "re.Pattern",
+                    pages: Optional[Iterable[int]] = None) -> Dict[str, int]:
+    """
+    TRUE-redact every match of regex (see compile_patterns) in doc.
+    Text under the matches is removed; overlapping image pixels are blanked.
+
+    Returns:
+        Number of matches per pattern label.
+    """
+    image_mode = getattr(fitz, "PDF_REDACT_IMAGE_PIXELS", fitz.PDF_REDACT_IMAGE_REMOVE)
+    counts: Dict[str, int] = {}
+    for page_index in (range(doc.page_count) if pages is None else pages):
+        page = doc[page_index]
+        with pdf_metrics.stage("pattern_index"):
+            index = PageWordIndex.from_page(page)
+        if not index.text:
+            continue
+        with pdf_metrics.stage("pattern_match"):
+            matches = find_matches(index, regex)
+        if not matches:
+            continue
+        with pdf_metrics.stage("redaction"):
+            for label, _, rects in matches:
+                counts[label] = counts.get(label, 0) + 1
+                for rect in rects:
+                    page.add_redact_annot(rect, fill=(1, 1, 1))
+            page.apply_redactions(images=image_mode)
+    pdf_metrics.count("pattern_matches", sum(counts.values()))
+    return counts
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="TRUE-redact text matching built-in or custom patterns.")
+    parser.add_argument("input_pdf", help="Path to input PDF")
+    parser.add_argument("output_pdf", help="Path to output PDF")
+    parser.add_argument("--patterns", nargs="+", choices=list(BUILTIN_PATTERNS),
+                        help="Built-in patterns (default: all, unless --regex is given)")
+    parser.add_argument("--regex", action="append", default=[],
+                        help="Custom regular expression (repeatable)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List matches without writing output")
+    parser.add_argument("-p", "--profile", choices=list(SAVE_PROFILES), default=DEFAULT_PROFILE,
+                        help="Save profile (default: standard)")
+    args = parser.parse_args()
+
+    try:
+        regex = compile_patterns(select_patterns(args.patterns, args.regex))
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.dry_run:
+        doc = fitz.open(args.input_pdf)
+        for page in doc:
+            for label, text, _ in find_matches(PageWordIndex.from_page(page), regex):
+                print(f"page {page.number + 1}: {label}: {text}")
+        doc.close()
+        return
+
+    doc = open_document(args.input_pdf, args.output_pdf, args.profile)
+    try:
+        counts = redact_patterns(doc, regex)
+        save_document(doc, args.output_pdf, args.profile, sanitize=True)
+    finally:
+        doc.close()
+
+    for label, n in sorted(counts.items()):
+        print(f"{label:<16} {n}")
+    print(f"Output: {args.output_pdf}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Residual-data audit for cleared and purged PDFs.
+
+Scans each file's object table directly, without loading pages or widgets,
+for data that should not have survived processing:
+
+- values: field objects with a non-empty /V (or /RV rich text)
+- checked: widgets whose /AS appearance state is not /Off
+- annotations: user-data annotations (notes, ink, stamps, markup, attachments)
+- embedded_files: embedded file streams
+- xfa: an XFA form, whose datasets can hold the answers
+- revisions: earlier revisions kept by incremental saves
+
+With strict=True (for purged outputs) every remaining widget and
+annotation is a finding too. Files are audited in parallel with the
+shared batch engine and the results written as one JSON report.
+
+Usage:
+    python pdf_audit.py purged_pdfs cleared_pdfs --jobs 0 --json audit.json
+    python pdf_audit.py purged_pdfs --strict
+"""
+
+import json
+import re
+import time
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+
+from batch_runner import run_batch
+
+# Annotation subtypes that carry user-entered data
+USER_DATA_ANNOT_SUBTYPES = {
+    "Text", "FreeText", "Ink", "Stamp", "Highlight", "Underline", "Squiggly", "StrikeOut",
+    "FileAttachment", "Sound", "Caret", "Line", "Square", "Circle", "Polygon", "PolyLine",
+}
+
+# Every annotation subtype, for strict mode
+ANNOT_SUBTYPES = USER_DATA_ANNOT_SUBTYPES | {
+    "Widget", "Link", "Popup", "Redact", "Movie", "Screen", "PrinterMark", "TrapNet",
+    "Watermark", "3D", "RichMedia", "Projection",
+}
+
+FINDING_CATEGORIES = ("values", "checked", "annotations", "embedded_files", "xfa", "revisions")
+
+_KEY = {key: re.compile(rf"/{key}(?![A-Za-z0-9#])") for key in ("V", "RV", "AS")}
+_SUBTYPE = re.compile(r"/Subtype\s*/([A-Za-z0-9]+)")
+_TYPE = re.compile(r"/Type\s*/([A-Za-z0-9]+)")
+
+# Values that mean "no value"
+_EMPTY_VALUES = {"", "()", "<>", "[]", "/Off", "null"}
+
+
+def _value(doc: fitz.Document, xref: int, key: str) -> Optional[str]:
+    value_type, value = doc.xref_get_key(xref, key)
+    return None if value_type == "null" else value
+
+
+def _field_name(doc: fitz.Document, xref: int) -> Optional[str]:
+    """Partial name of a field, or of its parent for kid widgets."""
+    name = _value(doc, xref, "T")
+    if name is None:
+        name = _value(doc, xref, "Parent/T")
+    return name
+
+
+def audit_document(doc: fitz.Document, strict: bool = False) -> dict:
+    """
+    Scan an open document's object table for residual data.
+
+    Returns:
+        Dict with 'findings' (category -> list of items, see
+        FINDING_CATEGORIES), 'objects', 'widgets' and 'annotations'.
+    """
+    findings: Dict[str, list] = {category: [] for category in FINDING_CATEGORIES}
+    widgets = annotations = 0
+
+    for xref in range(1, doc.xref_length()):
+        try:
+            obj = doc.xref_object(xref, compressed=True)
+        except Exception:
+            continue
+        if not obj.startswith("<<"):
+            continue
+
+        type_match = _TYPE.search(obj)
+        obj_type = type_match.group(1) if type_match else None
+        if obj_type == "EmbeddedFile":
+            findings["embedded_files"].append({"xref": xref})
+            continue
+
+        subtype_match = _SUBTYPE.search(obj)
+        subtype = subtype_match.group(1) if subtype_match else None
+        is_annot = subtype in ANNOT_SUBTYPES and (obj_type in (None, "Annot"))
+        if is_annot:
+            if subtype == "Widget":
+                widgets += 1
+            else:
+                annotations += 1
+            if subtype in USER_DATA_ANNOT_SUBTYPES or strict:
+                findings["annotations"].append({"xref": xref, "subtype": subtype})
+
+        # Field values live on field dictionaries and on merged field/widgets
+        for key in ("V", "RV"):
+            if _KEY[key].search(obj):
+                value = _value(doc, xref, key)
+                if value is not None and value.strip() not in _EMPTY_VALUES:
+                    findings["values"].append({"xref": xref, "name": _field_name(doc, xref),
+                                               "key": key, "value": value[:80]})
+        if subtype == "Widget" and _KEY["AS"].search(obj):
+            state = _value(doc, xref, "AS")
+            if state not in (None, "/Off"):
+                findings["checked"].append({"xref": xref, "name": _field_name(doc, xref),
+                                            "state": state})
+
+    if _value(doc, doc.pdf_catalog(), "AcroForm/XFA") is not None:
+        findings["xfa"].append({"xref": doc.pdf_catalog()})
+    if doc.version_count > 1:
+        findings["revisions"].append({"count": doc.version_count})
+
+    return {
+        "findings": findings,
+        "objects": doc.xref_length() - 1,
+        "widgets": widgets,
+        "annotations": annotations,
+    }
+
+
+def audit_pdf(path: str, strict: bool = False) -> dict:
+    """Audit one PDF file (see audit_document); adds 'path' and 'clean'."""
+    with fitz.open(path) as doc:
+        if doc.needs_pass:
+            raise ValueError("encrypted PDF")
+        report = audit_document(doc, strict)
+    report["path"] = str(path)
+    report["clean"] = not any(report["findings"].values())
+    return report
+
+
+def find_pdfs(paths: Sequence[str]) -> List[str]:
+    """PDF files given directly, plus every PDF under the given directories."""
+    pdfs = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            pdfs.extend(sorted(str(p) for p in path.rglob("*.pdf")))
+        elif path.is_file():
+            pdfs.append(str(path))
+    return pdfs
+
+
+def audit_paths(paths: Sequence[str], jobs: int = 1, strict: bool = False,
+                on_result=None) -> dict:
+    """
+    Audit every PDF under paths on a process pool.
+
+    Returns:
+        Report dict with 'generated', 'strict', 'seconds', 'summary' and
+        one entry per file in 'files' (files that could not be read carry
+        'error' instead of findings).
+    """
+    pdfs = find_pdfs(paths)
+    started = time.perf_counter()
+    results = run_batch(partial(audit_pdf, strict=strict), [(pdf,) for pdf in pdfs], jobs=jobs,
+                        on_result=on_result)
+
+    files = []
+    summary = {"files": len(results), "clean": 0, "dirty": 0, "errors": 0,
+               "findings": {category: 0 for category in FINDING_CATEGORIES}}
+    for result in results:
+        report = result.get("value")
+        if not result["ok"] or not report:
+            summary["errors"] += 1
+            files.append({"path": result["input"], "error": result["error"]})
+            continue
+        files.append(report)
+        summary["clean" if report["clean"] else "dirty"] += 1
+        for category, items in report["findings"].items():
+            summary["findings"][category] += len(items)
+
+    return {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "paths": [str(p) for p in paths],
+        "strict": strict,
+        "seconds": round(time.perf_counter() - started, 3),
+        "summary": summary,
+        "files": files,
+    }
+
+
+def main():
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Audit cleared/purged PDFs for residual data.")
+    parser.add_argument("paths", nargs="*", default=["purged_pdfs", "cleared_pdfs"],
+                        help="PDF files or directories (default: purged_pdfs cleared_pdfs)")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="Worker processes (default: 0 = one per CPU)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Treat every remaining widget and annotation as a finding (purged outputs)")
+    parser.add_argument("--json", help="Write the full report to this JSON file")
+    args = parser.parse_args()
+
+    def report(result):
+        value = result.get("value")
+        if not result["ok"] or not value:
+            print(f"[ERROR] {result['input']}: {result['error']}")
+        elif not value["clean"]:
+            counts = ", ".join(f"{category}={len(items)}"
+                               for category, items in value["findings"].items() if items)
+            print(f"[DIRTY] {result['input']}: {counts}")
+
+    audit = audit_paths(args.paths, jobs=args.jobs, strict=args.strict, on_result=report)
+    summary = audit["summary"]
+    print(f"\nAudited {summary['files']} file(s) in {audit['seconds']:.1f}s: "
+          f"{summary['clean']} clean, {summary['dirty']} with residual data, {summary['errors']} error(s)")
+    for category, n in summary["findings"].items():
+        if n:
+            print(f"  {category:<15} {n}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(audit, f, indent=2)
+        print(f"Report saved to: {args.json}")
+
+    sys.exit(1 if summary["dirty"] or summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,18 @@ PDF Answer Remover
 Completely removes all filled-in answers from PDF forms, leaving only the blank template.
 """
 
+import io
 import os
+import re
 import sys
 from pathlib import Path
-from typing import List, Optional
+from typing import BinaryIO, Iterable, List, Optional, Set
+
+import pdf_metrics
+from batch_manifest import MANIFEST_NAME, BatchManifest
+from batch_runner import peak_rss_summary, run_batch
+from catalog import Catalog, add_catalog_arguments, catalog_from_args
+from pdf_streams import PdfSource, deliver, read_source
 
 try:
     import pypdf
@@ -22,205 +30,590 @@ except ImportError:
     os.system(f"{sys.executable} -m pip install pymupdf")
     import fitz  # PyMuPDF
 
+from save_profiles import (DEFAULT_PROFILE, SAVE_PROFILES, discard_copy, document_bytes,
+                           open_document, pypdf_bytes, save_document, write_pypdf)
+from memory_budget import MemoryBudget, MemoryLimitExceeded, add_memory_arguments, budget_from_args
 
-def clear_pdf_answers_pymupdf(input_path: str, output_path: Optional[str] = None) -> bool:
-    """
-    Completely clear all form field values from PDF using PyMuPDF.
-    This method ensures all filled information is removed, leaving only the blank template.
-    """
+
+def _update_widget(widget: "fitz.Widget") -> None:
+    with pdf_metrics.stage("widget_update"):
+        widget.update()
+
+
+def _clear_widget(widget: "fitz.Widget") -> None:
     try:
-        doc = fitz.open(input_path)
-        
-        # Process each page to clear all form fields
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Get all widgets (form fields) on this page
-            widgets = list(page.widgets())
-            
-            for widget in widgets:
-                try:
-                    field_type = widget.field_type
-                    
-                    # Clear the field value based on its type
-                    if field_type == fitz.PDF_WIDGET_TYPE_TEXT:
-                        # Text fields - completely clear
-                        widget.field_value = ""
-                        widget.update()
-                        # Double-check and clear again
-                        if widget.field_value:
-                            widget.field_value = ""
-                            widget.update()
-                            
-                    elif field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
-                        # Checkboxes - uncheck
-                        widget.field_value = False
-                        widget.update()
-                        
-                    elif field_type == fitz.PDF_WIDGET_TYPE_RADIOBUTTON:
-                        # Radio buttons - unselect
-                        widget.field_value = False
-                        widget.update()
-                        
-                    elif field_type == fitz.PDF_WIDGET_TYPE_COMBOBOX:
-                        # Combo boxes (dropdowns) - clear selection
-                        widget.field_value = ""
-                        widget.update()
-                        # Try to reset choice
-                        try:
-                            if hasattr(widget, 'choice_values') and widget.choice_values:
-                                widget.field_value = ""
-                                widget.update()
-                        except:
-                            pass
-                            
-                    elif field_type == fitz.PDF_WIDGET_TYPE_LISTBOX:
-                        # List boxes - clear selection
-                        widget.field_value = ""
-                        widget.update()
-                        try:
-                            if hasattr(widget, 'choice_values') and widget.choice_values:
-                                widget.field_value = ""
-                                widget.update()
-                        except:
-                            pass
-                            
-                    elif field_type == fitz.PDF_WIDGET_TYPE_SIGNATURE:
-                        # Signature fields - clear
-                        widget.field_value = ""
-                        widget.update()
-                        
-                    else:
-                        # Unknown field type - try to clear anyway
-                        try:
-                            widget.field_value = ""
-                            widget.update()
-                        except:
-                            try:
-                                widget.field_value = False
-                                widget.update()
-                            except:
-                                pass
-                
-                except Exception as e:
-                    # If clearing fails, try reset
-                    try:
-                        widget.reset()
-                    except:
-                        pass
-            
-            # Also clear any annotations that might contain form data
+        field_type = widget.field_type
+
+        # Clear the field value based on its type
+        if field_type == fitz.PDF_WIDGET_TYPE_TEXT:
+            # Text fields - completely clear
+            widget.field_value = ""
+            _update_widget(widget)
+            # Double-check and clear again
+            if widget.field_value:
+                widget.field_value = ""
+                _update_widget(widget)
+
+        elif field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+            # Checkboxes - uncheck
+            widget.field_value = False
+            _update_widget(widget)
+
+        elif field_type == fitz.PDF_WIDGET_TYPE_RADIOBUTTON:
+            # Radio buttons - unselect
+            widget.field_value = False
+            _update_widget(widget)
+
+        elif field_type == fitz.PDF_WIDGET_TYPE_COMBOBOX:
+            # Combo boxes (dropdowns) - clear selection
+            widget.field_value = ""
+            _update_widget(widget)
+            # Try to reset choice
             try:
-                annots = list(page.annots())
-                for annot in annots:
-                    annot_type = annot.type[1] if annot.type else ""
-                    # Remove annotations that contain user data
-                    if annot_type in ["Text", "FreeText", "Ink", "Stamp", "Highlight", "Underline", "Squiggly", "StrikeOut"]:
-                        page.delete_annot(annot)
+                if hasattr(widget, 'choice_values') and widget.choice_values:
+                    widget.field_value = ""
+                    _update_widget(widget)
             except:
                 pass
-        
-        # Final verification pass - ensure all fields are truly empty
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            widgets = list(page.widgets())
-            for widget in widgets:
+
+        elif field_type == fitz.PDF_WIDGET_TYPE_LISTBOX:
+            # List boxes - clear selection
+            widget.field_value = ""
+            _update_widget(widget)
+            try:
+                if hasattr(widget, 'choice_values') and widget.choice_values:
+                    widget.field_value = ""
+                    _update_widget(widget)
+            except:
+                pass
+
+        elif field_type == fitz.PDF_WIDGET_TYPE_SIGNATURE:
+            # Signature fields - clear
+            widget.field_value = ""
+            _update_widget(widget)
+
+        else:
+            # Unknown field type - try to clear anyway
+            try:
+                widget.field_value = ""
+                _update_widget(widget)
+            except:
                 try:
-                    # Check if field still has a value
-                    current_value = widget.field_value
-                    if current_value:
-                        # Force clear based on type
-                        if isinstance(current_value, str) and current_value.strip():
-                            widget.field_value = ""
-                            widget.update()
-                        elif isinstance(current_value, bool) and current_value:
-                            widget.field_value = False
-                            widget.update()
-                        elif isinstance(current_value, (list, tuple)) and current_value:
-                            widget.field_value = ""
-                            widget.update()
+                    widget.field_value = False
+                    _update_widget(widget)
                 except:
                     pass
-        
-        # Save the cleared PDF
+
+    except Exception as e:
+        # If clearing fails, try reset
+        try:
+            widget.reset()
+        except:
+            pass
+
+
+def _clear_page_pymupdf(page: "fitz.Page", load_widgets: bool = True) -> int:
+    """Clear the widgets and user-data annotations of one page; returns widgets processed."""
+    processed = 0
+    if load_widgets:
+        with pdf_metrics.stage("widgets"):
+            # Get all widgets (form fields) on this page
+            widgets = list(page.widgets())
+        processed = len(widgets)
+        for widget in widgets:
+            _clear_widget(widget)
+
+    # Also clear any annotations that might contain form data
+    with pdf_metrics.stage("annotations"):
+        try:
+            annots = list(page.annots())
+            for annot in annots:
+                annot_type = annot.type[1] if annot.type else ""
+                # Remove annotations that contain user data
+                if annot_type in ["Text", "FreeText", "Ink", "Stamp", "Highlight", "Underline", "Squiggly", "StrikeOut"]:
+                    page.delete_annot(annot)
+                    pdf_metrics.count("annotations")
+        except:
+            pass
+
+    return processed
+
+
+def _verify_page_pymupdf(page: "fitz.Page") -> None:
+    """Force-clear any widget on page that still has a value."""
+    for widget in page.widgets():
+        try:
+            # Check if field still has a value
+            current_value = widget.field_value
+            if current_value:
+                # Force clear based on type
+                if isinstance(current_value, str) and current_value.strip():
+                    widget.field_value = ""
+                    _update_widget(widget)
+                elif isinstance(current_value, bool) and current_value:
+                    widget.field_value = False
+                    _update_widget(widget)
+                elif isinstance(current_value, (list, tuple)) and current_value:
+                    widget.field_value = ""
+                    _update_widget(widget)
+        except:
+            pass
+
+
+def clear_pages_pymupdf(doc: "fitz.Document", pages: Iterable[int],
+                        widget_pages: Optional[Set[int]] = None) -> int:
+    """
+    Clear, then verify, the widgets and user-data annotations on the given
+    pages. Widgets are only loaded on pages in widget_pages when it is given.
+    Returns the number of widgets processed.
+    """
+    pages = list(pages)
+    processed = 0
+
+    # Process each page to clear all form fields
+    for page_num in pages:
+        processed += _clear_page_pymupdf(doc[page_num],
+                                         widget_pages is None or page_num in widget_pages)
+
+    # Final verification pass - ensure all fields are truly empty
+    with pdf_metrics.stage("verify"):
+        for page_num in pages:
+            _verify_page_pymupdf(doc[page_num])
+
+    return processed
+
+
+def _schema_widget_pages(schema: Optional[dict]) -> Optional[Set[int]]:
+    if schema is None:
+        return None
+    return {field["page"] for field in schema["fields"] if field["page"] is not None}
+
+
+def clear_document_pymupdf(doc: "fitz.Document", schema: Optional[dict] = None) -> int:
+    """
+    Clear every form field and user-data annotation in an open document
+    using the PyMuPDF widget API. Returns the number of widgets processed.
+    With a field schema (form_templates), widgets are only loaded on the
+    pages the schema places them on; the verification pass still covers
+    every page.
+    """
+    processed = clear_pages_pymupdf(doc, range(doc.page_count), _schema_widget_pages(schema))
+    pdf_metrics.count("pages", len(doc))
+    pdf_metrics.count("widgets", processed)
+    return processed
+
+
+def _template_schema(doc: "fitz.Document", template_cache: Optional[str]) -> Optional[dict]:
+    """Field schema of doc from the form_templates cache in template_cache, if given."""
+    if not template_cache:
+        return None
+    from form_templates import get_cache  # imports this module
+    with pdf_metrics.stage("template"):
+        return get_cache(template_cache).schema_for(doc)
+
+
+def clear_pdf_answers_pymupdf(input_path: str, output_path: Optional[str] = None,
+                              profile: str = DEFAULT_PROFILE,
+                              template_cache: Optional[str] = None,
+                              memory: Optional[MemoryBudget] = None) -> bool:
+    """
+    Completely clear all form field values from PDF using PyMuPDF.
+    This method ensures all filled information is removed, leaving only the blank template.
+    With a MemoryBudget, pages are cleared in chunks with memory released
+    between them (see memory_budget).
+    """
+    doc = None
+    try:
         if output_path is None:
             output_path = input_path.replace(".pdf", "_cleared.pdf")
         
-        # Save with garbage collection to ensure clean output
-        doc.save(output_path, garbage=4, deflate=True)
+        if memory is not None:
+            _clear_pdf_chunked(input_path, output_path, profile, template_cache, memory)
+            return True
+        
+        with pdf_metrics.stage("open"):
+            doc = open_document(input_path, output_path, profile)
+        clear_document_pymupdf(doc, _template_schema(doc, template_cache))
+        
+        # Save the cleared PDF using the selected save profile
+        with pdf_metrics.stage("save"):
+            save_document(doc, output_path, profile)
         doc.close()
         
         return True
         
+    except MemoryLimitExceeded:
+        # Never retry with the pypdf fallback, which loads the whole document
+        raise
     except Exception as e:
         print(f"Error with PyMuPDF method: {e}")
         import traceback
         traceback.print_exc()
+        if doc is not None and not doc.is_closed:
+            doc.close()
+        discard_copy(input_path, output_path, profile)
         return False
 
 
-def clear_pdf_answers_pypdf(input_path: str, output_path: Optional[str] = None) -> bool:
+def _clear_pdf_chunked(input_path: str, output_path: str, profile: str,
+                       template_cache: Optional[str], memory: MemoryBudget) -> None:
+    """Bounded-memory variant of clear_pdf_answers_pymupdf."""
+    work = memory.open(input_path, output_path)
+    try:
+        widget_pages = _schema_widget_pages(_template_schema(work.doc, template_cache))
+        processed = 0
+        for pages in work.chunks():
+            processed += clear_pages_pymupdf(work.doc, pages, widget_pages)
+        pdf_metrics.count("pages", work.doc.page_count)
+        pdf_metrics.count("widgets", processed)
+        work.save(profile)
+    finally:
+        work.close()
+
+
+# Annotation subtypes that carry user-entered data rather than form structure
+USER_DATA_ANNOT_SUBTYPES = {
+    "/Text", "/FreeText", "/Ink", "/Stamp", "/Highlight", "/Underline", "/Squiggly", "/StrikeOut"
+}
+
+# Field flag bit marking a /Btn field as a pushbutton (PDF 32000-1, table 226)
+PUSHBUTTON_FLAG = 1 << 16
+
+_XREF_REF = re.compile(r"(\d+) \d+ R")
+
+
+def _xref_list(value: str) -> List[int]:
+    """Object numbers referenced in a PDF array string like '[7 0 R 9 0 R]'."""
+    return [int(x) for x in _XREF_REF.findall(value)]
+
+
+def _xref_value(doc: "fitz.Document", xref: int, key: str) -> Optional[str]:
+    """Value of a key in an object dictionary, or None if absent."""
+    value_type, value = doc.xref_get_key(xref, key)
+    return None if value_type == "null" else value
+
+
+def iter_acroform_fields(doc: "fitz.Document"):
     """
-    Clear form fields from PDF using pypdf.
-    This is a fallback method.
+    Walk the /AcroForm field tree once, iteratively, without loading widgets.
+
+    Yields:
+        (xref, field_type, field_flags) for every node in the tree, with /FT
+        and /Ff inherited from parent fields as the PDF spec requires.
     """
+    fields = _xref_value(doc, doc.pdf_catalog(), "AcroForm/Fields")
+    if not fields:
+        return
+    stack = [(xref, None, 0) for xref in reversed(_xref_list(fields))]
+    seen = set()
+    while stack:
+        xref, inherited_type, inherited_flags = stack.pop()
+        if xref in seen or xref <= 0:
+            continue
+        seen.add(xref)
+        field_type = _xref_value(doc, xref, "FT") or inherited_type
+        flags = _xref_value(doc, xref, "Ff")
+        flags = int(flags) if flags and flags.lstrip("-").isdigit() else inherited_flags
+        yield xref, field_type, flags
+        kids = _xref_value(doc, xref, "Kids")
+        if kids:
+            stack.extend((kid, field_type, flags) for kid in reversed(_xref_list(kids)))
+
+
+def _clear_field_xref(doc: "fitz.Document", xref: int, field_type: Optional[str], flags: int) -> None:
+    """Reset the value and appearance entries of one field/widget object."""
+    if field_type == "/Btn":
+        if flags & PUSHBUTTON_FLAG:
+            return  # Pushbuttons hold no user data; keep their captions
+        # Checkboxes and radio buttons: turn off, keep the on/off appearances
+        if _xref_value(doc, xref, "V") is not None:
+            doc.xref_set_key(xref, "V", "/Off")
+        if _xref_value(doc, xref, "AS") is not None:
+            doc.xref_set_key(xref, "AS", "/Off")
+        return
+
+    # Text, choice, signature and unknown fields: drop the value and the
+    # appearance stream that renders it; viewers rebuild it via NeedAppearances
+    for key in ("V", "RV", "I", "AP"):
+        if _xref_value(doc, xref, key) is not None:
+            doc.xref_set_key(xref, key, "null")
+
+
+def _widget_field_type(doc: "fitz.Document", xref: int) -> tuple:
+    """(field_type, field_flags) of a widget not reached from the field tree."""
+    field_type, flags = None, 0
+    while xref and field_type is None:
+        field_type = _xref_value(doc, xref, "FT")
+        value = _xref_value(doc, xref, "Ff")
+        if value and value.lstrip("-").isdigit() and not flags:
+            flags = int(value)
+        parent = _xref_value(doc, xref, "Parent")
+        xref = _xref_list(parent)[0] if parent and _xref_list(parent) else 0
+    return field_type, flags
+
+
+def clear_document_xref(doc: "fitz.Document", schema: Optional[dict] = None) -> int:
+    """
+    Clear every form field and user-data annotation in an open document by
+    editing the field objects directly (see clear_pdf_answers_xref).
+    With a field schema (form_templates) matching doc, its recorded field
+    objects are cleared directly instead of walking the field tree.
+    Returns the number of field and widget objects reset.
+    """
+    cleared = set()
+    with pdf_metrics.stage("field_tree"):
+        if schema is not None:
+            fields = ((field["xref"], field["type"], field["flags"]) for field in schema["fields"])
+        else:
+            fields = iter_acroform_fields(doc)
+        for xref, field_type, flags in fields:
+            _clear_field_xref(doc, xref, field_type, flags)
+            cleared.add(xref)
+    pdf_metrics.count("fields", len(cleared))
+
+    # Page-level pass over the /Annots arrays: widgets missing from the
+    # field tree, plus annotations that carry user data
+    for page_num in range(doc.page_count):
+        with pdf_metrics.stage("page_annots"):
+            annots = _xref_value(doc, doc.page_xref(page_num), "Annots")
+            if not annots:
+                continue
+            to_delete = []
+            for xref in _xref_list(annots):
+                if xref in cleared:
+                    continue
+                subtype = _xref_value(doc, xref, "Subtype")
+                if subtype == "/Widget":
+                    _clear_field_xref(doc, xref, *_widget_field_type(doc, xref))
+                    cleared.add(xref)
+                    pdf_metrics.count("orphan_widgets")
+                elif subtype in USER_DATA_ANNOT_SUBTYPES:
+                    to_delete.append(xref)
+        if to_delete:
+            with pdf_metrics.stage("annotations"):
+                page = doc[page_num]
+                for xref in to_delete:
+                    try:
+                        page.delete_annot(page.load_annot(xref))
+                        pdf_metrics.count("annotations")
+                    except Exception:
+                        pass
+                page = None
+    pdf_metrics.count("pages", doc.page_count)
+
+    # Let viewers build blank appearances for fields whose /AP was dropped
+    acro_form_type, acro_form = doc.xref_get_key(doc.pdf_catalog(), "AcroForm")
+    if acro_form_type == "xref":
+        doc.xref_set_key(_xref_list(acro_form)[0], "NeedAppearances", "true")
+    elif acro_form_type == "dict":
+        doc.xref_set_key(doc.pdf_catalog(), "AcroForm/NeedAppearances", "true")
+
+    return len(cleared)
+
+
+def clear_pdf_answers_xref(input_path: str, output_path: Optional[str] = None,
+                           profile: str = DEFAULT_PROFILE,
+                           template_cache: Optional[str] = None) -> bool:
+    """
+    Clear all form field values by editing the field objects directly.
+    Walks the /AcroForm field tree once, resets /V, /AS and the appearance
+    entries on each xref, and sets NeedAppearances instead of regenerating
+    every widget appearance. Removes the same user-data annotations as the
+    PyMuPDF method. With template_cache, the field schema cached for the
+    document's template (form_templates) replaces the field-tree walk.
+    """
+    doc = None
     try:
-        reader = pypdf.PdfReader(input_path)
-        writer = pypdf.PdfWriter()
+        if output_path is None:
+            output_path = input_path.replace(".pdf", "_cleared.pdf")
         
-        # Clear form fields at document level
-        if "/AcroForm" in reader.trailer.get("/Root", {}):
-            acro_form = reader.trailer["/Root"]["/AcroForm"]
-            if "/Fields" in acro_form:
-                fields = acro_form["/Fields"]
-                # Clear all field values
-                for field_ref in fields:
-                    if isinstance(field_ref, pypdf.generic.IndirectObject):
-                        field = field_ref.get_object()
-                        if "/V" in field:
-                            del field["/V"]
-                        if "/DV" in field:
-                            del field["/DV"]
-                        # Clear kids if present
-                        if "/Kids" in field:
-                            kids = field["/Kids"]
-                            for kid_ref in kids:
-                                if isinstance(kid_ref, pypdf.generic.IndirectObject):
-                                    kid = kid_ref.get_object()
-                                    if "/V" in kid:
-                                        del kid["/V"]
-                                    if "/DV" in kid:
-                                        del kid["/DV"]
+        with pdf_metrics.stage("open"):
+            doc = open_document(input_path, output_path, profile)
+        clear_document_xref(doc, _template_schema(doc, template_cache))
         
-        # Copy pages
-        for page in reader.pages:
-            # Clear annotations on page
-            if "/Annots" in page:
-                annots = page.get("/Annots", [])
-                if annots:
-                    for annot_ref in annots:
-                        if isinstance(annot_ref, pypdf.generic.IndirectObject):
-                            annot = annot_ref.get_object()
-                            if "/V" in annot:
-                                annot["/V"] = pypdf.generic.TextStringObject("")
-                            if "/DV" in annot:
-                                annot["/DV"] = pypdf.generic.TextStringObject("")
-            
-            writer.add_page(page)
+        with pdf_metrics.stage("save"):
+            save_document(doc, output_path, profile)
+        doc.close()
         
-        # Create empty AcroForm
-        if "/AcroForm" in reader.trailer["/Root"]:
-            new_acro_form = pypdf.generic.DictionaryObject()
-            writer._root_object.update({
-                pypdf.generic.NameObject("/AcroForm"): new_acro_form
-            })
+        return True
+        
+    except Exception as e:
+        print(f"Error with xref method: {e}")
+        import traceback
+        traceback.print_exc()
+        if doc is not None and not doc.is_closed:
+            doc.close()
+        discard_copy(input_path, output_path, profile)
+        return False
+
+
+def _pypdf_key(ref) -> int:
+    """Identity of a field reference: its object number, or id() for direct objects."""
+    return ref.idnum if isinstance(ref, pypdf.generic.IndirectObject) else id(ref)
+
+
+def _pypdf_flags(value, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def iter_acroform_fields_pypdf(root: "pypdf.generic.DictionaryObject"):
+    """
+    pypdf counterpart of iter_acroform_fields: walk the whole /AcroForm
+    field tree of a document catalog iteratively.
+
+    Yields:
+        (key, field, field_type, field_flags) for every node in the tree,
+        where key identifies the object (see _pypdf_key) and /FT and /Ff are
+        inherited from parent fields.
+    """
+    acro_form = root.get("/AcroForm")
+    acro_form = acro_form.get_object() if acro_form is not None else None
+    fields = acro_form.get("/Fields") if isinstance(acro_form, dict) else None
+    fields = fields.get_object() if fields is not None else None
+    if not fields:
+        return
+    stack = [(ref, None, 0) for ref in reversed(fields)]
+    seen = set()
+    while stack:
+        ref, inherited_type, inherited_flags = stack.pop()
+        key = _pypdf_key(ref)
+        field = ref.get_object()
+        if key in seen or not isinstance(field, dict):
+            continue
+        seen.add(key)
+        field_type = field.get("/FT", inherited_type)
+        flags = _pypdf_flags(field.get("/Ff"), inherited_flags) if "/Ff" in field else inherited_flags
+        yield key, field, field_type, flags
+        kids = field.get("/Kids")
+        kids = kids.get_object() if kids is not None else None
+        if kids:
+            stack.extend((kid, field_type, flags) for kid in reversed(kids))
+
+
+def _clear_field_pypdf(field: "pypdf.generic.DictionaryObject", field_type: Optional[str],
+                       flags: int) -> None:
+    """Reset the value and appearance entries of one field/widget (see _clear_field_xref)."""
+    if field_type == "/Btn":
+        if flags & PUSHBUTTON_FLAG:
+            return  # Pushbuttons hold no user data; keep their captions
+        # Checkboxes and radio buttons: turn off, keep the on/off appearances
+        for key in ("/V", "/AS"):
+            if key in field:
+                field[pypdf.generic.NameObject(key)] = pypdf.generic.NameObject("/Off")
+        return
+
+    # Text, choice, signature and unknown fields: drop the value and the
+    # appearance stream that renders it; viewers rebuild it via NeedAppearances
+    for key in ("/V", "/RV", "/I", "/AP"):
+        if key in field:
+            del field[key]
+
+
+def _widget_field_type_pypdf(widget: "pypdf.generic.DictionaryObject") -> tuple:
+    """(field_type, field_flags) of a widget not reached from the field tree."""
+    field_type, flags, node, depth = None, 0, widget, 0
+    while isinstance(node, dict) and field_type is None and depth < 32:
+        field_type = node.get("/FT")
+        if not flags and "/Ff" in node:
+            flags = _pypdf_flags(node.get("/Ff"))
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+        depth += 1
+    return field_type, flags
+
+
+def clear_reader_pypdf(reader: "pypdf.PdfReader") -> "pypdf.PdfWriter":
+    """
+    Clear form fields from an open pypdf reader.
+    The document is cloned into the writer in one step and the complete
+    /AcroForm field tree is walked iteratively, resetting values in place
+    as the xref engine does. The AcroForm is kept, with NeedAppearances
+    set, and the same user-data annotations as the other engines are removed.
+    Returns a writer holding the cleared document.
+    """
+    with pdf_metrics.stage("clone"):
+        writer = pypdf.PdfWriter(clone_from=reader)
+
+    cleared = set()
+    with pdf_metrics.stage("fields"):
+        for key, field, field_type, flags in iter_acroform_fields_pypdf(writer._root_object):
+            _clear_field_pypdf(field, field_type, flags)
+            cleared.add(key)
+    pdf_metrics.count("fields", len(cleared))
+
+    # Page-level pass over the /Annots arrays: widgets missing from the
+    # field tree, plus annotations that carry user data
+    removed = 0
+    with pdf_metrics.stage("pages"):
+        for page in writer.pages:
+            annots = page.get("/Annots")
+            annots = annots.get_object() if annots is not None else None
+            if not annots:
+                continue
+            # Remove user-data annotations together with their popups
+            dropped = set()
+            for ref in annots:
+                annot = ref.get_object()
+                if isinstance(annot, dict) and annot.get("/Subtype") in USER_DATA_ANNOT_SUBTYPES:
+                    dropped.add(_pypdf_key(ref))
+                    if "/Popup" in annot:
+                        dropped.add(_pypdf_key(annot.raw_get("/Popup")))
+                    removed += 1
+            keep = pypdf.generic.ArrayObject()
+            for ref in annots:
+                if _pypdf_key(ref) in dropped:
+                    continue
+                annot = ref.get_object()
+                subtype = annot.get("/Subtype") if isinstance(annot, dict) else None
+                keep.append(ref)
+                if subtype == "/Widget" and _pypdf_key(ref) not in cleared:
+                    _clear_field_pypdf(annot, *_widget_field_type_pypdf(annot))
+                    cleared.add(_pypdf_key(ref))
+                    pdf_metrics.count("orphan_widgets")
+            if len(keep) != len(annots):
+                page[pypdf.generic.NameObject("/Annots")] = keep
+                # Empty the dropped objects: an annotation and its popup
+                # reference each other, which would keep both from being
+                # dropped as orphans
+                for ref in annots:
+                    if _pypdf_key(ref) in dropped:
+                        ref.get_object().clear()
+    pdf_metrics.count("pages", len(writer.pages))
+
+    # The writer keeps every cloned object; drop the removed annotations
+    # (and their popups and appearance streams) so they are not written out
+    if removed:
+        pdf_metrics.count("annotations", removed)
+        with pdf_metrics.stage("orphans"):
+            writer.compress_identical_objects(remove_duplicates=False, remove_unreferenced=True)
+
+    # Let viewers build blank appearances for fields whose /AP was dropped
+    if "/AcroForm" in writer._root_object:
+        writer.set_need_appearances_writer(True)
+
+    return writer
+
+
+def clear_pdf_answers_pypdf(input_path: str, output_path: Optional[str] = None,
+                            profile: str = DEFAULT_PROFILE) -> bool:
+    """
+    Clear form fields from PDF using pypdf (see clear_reader_pypdf).
+    Lightweight engine that needs no PyMuPDF; also the 'auto' fallback.
+    """
+    try:
+        with pdf_metrics.stage("open"):
+            reader = pypdf.PdfReader(input_path)
+        writer = clear_reader_pypdf(reader)
         
         # Write output
         if output_path is None:
             output_path = input_path.replace(".pdf", "_cleared.pdf")
         
-        with open(output_path, "wb") as output_file:
-            writer.write(output_file)
+        with pdf_metrics.stage("save"):
+            write_pypdf(writer, output_path, profile)
         
         return True
     except Exception as e:
@@ -228,14 +621,21 @@ def clear_pdf_answers_pypdf(input_path: str, output_path: Optional[str] = None)
         return False
 
 
-def clear_pdf_answers(input_path: str, output_path: Optional[str] = None, method: str = "auto") -> bool:
+def clear_pdf_answers(input_path: str, output_path: Optional[str] = None, method: str = "auto",
+                      profile: str = DEFAULT_PROFILE, template_cache: Optional[str] = None,
+                      memory: Optional[MemoryBudget] = None) -> bool:
     """
     Completely clear all answers from a PDF file, leaving only the blank template.
     
     Args:
         input_path: Path to input PDF file
         output_path: Path to output PDF file (default: adds '_cleared' to filename)
-        method: 'auto', 'pypdf', or 'pymupdf' - which method to use
+        method: 'auto', 'pypdf', 'pymupdf', or 'xref' - which method to use
+        profile: Save profile from save_profiles.SAVE_PROFILES
+        template_cache: Optional form_templates cache directory; the PyMuPDF
+                        and xref engines reuse the field schema cached per template
+        memory: Optional MemoryBudget; the PyMuPDF engine then clears pages in
+                chunks under an RSS ceiling (bounded-memory mode)
     
     Returns:
         True if successful, False otherwise
@@ -249,9 +649,18 @@ def clear_pdf_answers(input_path: str, output_path: Optional[str] = None, method
         directory = Path(input_path).parent
         output_path = str(directory / f"{base_name}_cleared.pdf")
     
+    # Low-level engine: edits field objects directly, fastest on large forms
+    if method == "xref":
+        if clear_pdf_answers_xref(input_path, output_path, profile, template_cache):
+            print(f"[OK] Successfully cleared: {input_path}")
+            print(f"     Output: {output_path}")
+            return True
+        print(f"[FAILED] Failed to clear: {input_path}")
+        return False
+    
     # Use PyMuPDF by default (most comprehensive)
     if method == "auto" or method == "pymupdf":
-        if clear_pdf_answers_pymupdf(input_path, output_path):
+        if clear_pdf_answers_pymupdf(input_path, output_path, profile, template_cache, memory):
             print(f"[OK] Successfully cleared: {input_path}")
             print(f"     Output: {output_path}")
             return True
@@ -260,7 +669,7 @@ def clear_pdf_answers(input_path: str, output_path: Optional[str] = None, method
     
     # Fallback to pypdf
     if method == "auto" or method == "pypdf":
-        if clear_pdf_answers_pypdf(input_path, output_path):
+        if clear_pdf_answers_pypdf(input_path, output_path, profile):
             print(f"[OK] Successfully cleared: {input_path}")
             print(f"     Output: {output_path}")
             return True
@@ -269,8 +678,58 @@ def clear_pdf_answers(input_path: str, output_path: Optional[str] = None, method
     return False
 
 
+def clear_pdf_bytes(source: PdfSource, destination: Optional[BinaryIO] = None,
+                    method: str = "auto", profile: str = DEFAULT_PROFILE) -> bytes:
+    """
+    Completely clear all answers from an in-memory PDF, without temp files.
+    
+    Args:
+        source: PDF data as bytes or a readable binary buffer
+        destination: Optional writable binary buffer that also receives the output
+        method: 'auto', 'pypdf', 'pymupdf', or 'xref' - which method to use
+        profile: Save profile; 'incremental' is not available in memory
+    
+    Returns:
+        The cleared PDF as bytes
+    
+    Raises:
+        ValueError: If the PDF could not be cleared
+    """
+    data = read_source(source)
+    if profile == "incremental":
+        raise ValueError("incremental profile needs a file to append to; use fast for in-memory output")
+    
+    if method in ("auto", "pymupdf", "xref"):
+        try:
+            doc = fitz.open(stream=data, filetype="pdf")
+            try:
+                if method == "xref":
+                    clear_document_xref(doc)
+                else:
+                    clear_document_pymupdf(doc)
+                return deliver(document_bytes(doc, profile), destination)
+            finally:
+                doc.close()
+        except Exception as e:
+            if method != "auto":
+                raise ValueError(f"Failed to clear PDF with {method} method: {e}") from e
+    
+    # Fallback to pypdf
+    try:
+        writer = clear_reader_pypdf(pypdf.PdfReader(io.BytesIO(data)))
+        return deliver(pypdf_bytes(writer, profile), destination)
+    except Exception as e:
+        raise ValueError(f"Failed to clear PDF with pypdf method: {e}") from e
+
+
 def clear_all_pdfs_in_directory(directory: str = ".", pattern: str = "*.pdf", 
-                                 exclude_cleared: bool = True) -> List[str]:
+                                 exclude_cleared: bool = True, method: str = "auto",
+                                 jobs: int = 1, force: bool = False,
+                                 profile: str = DEFAULT_PROFILE,
+                                 metrics: Optional[pdf_metrics.MetricsWriter] = None,
+                                 template_cache: Optional[str] = None,
+                                 memory: Optional[MemoryBudget] = None,
+                                 catalog: Optional[Catalog] = None) -> List[str]:
     """
     Clear answers from all PDFs in a directory.
     
@@ -278,26 +737,65 @@ def clear_all_pdfs_in_directory(directory: str = ".", pattern: str = "*.pdf",
         directory: Directory to process (default: current directory)
         pattern: File pattern to match (default: "*.pdf")
         exclude_cleared: Skip files that already have "_cleared" in name
+        method: 'auto', 'pypdf', 'pymupdf', or 'xref' - which method to use
+        jobs: Number of worker processes (1 = sequential, 0 = one per CPU)
+        force: Reprocess every file, ignoring the incremental manifest
+        profile: Save profile from save_profiles.SAVE_PROFILES
+        metrics: Optional MetricsWriter receiving one record per processed file
+        template_cache: Optional form_templates cache directory (see clear_pdf_answers)
+        memory: Optional MemoryBudget for the bounded-memory mode (see clear_pdf_answers)
+        catalog: Optional Catalog recording each file's run status and counts
     
     Returns:
         List of successfully processed files
     """
     directory_path = Path(directory)
-    pdf_files = list(directory_path.glob(pattern))
+    pdf_files = sorted(directory_path.glob(pattern))
     
     if exclude_cleared:
         pdf_files = [f for f in pdf_files if "_cleared" not in f.name and "test" not in f.name.lower()]
     
-    successful = []
-    
     print(f"Found {len(pdf_files)} PDF file(s) to process...\n")
     
-    for pdf_file in pdf_files:
-        if clear_pdf_answers(str(pdf_file)):
-            successful.append(str(pdf_file))
+    tasks = [
+        (str(pdf_file), str(pdf_file.parent / f"{pdf_file.stem}_cleared.pdf"), method, profile,
+         template_cache, memory)
+        for pdf_file in pdf_files
+    ]
+    
+    # Skip inputs whose content, method, profile and output are unchanged since the last run
+    manifest = BatchManifest(str(directory_path / MANIFEST_NAME))
+    options = {'method': method, 'profile': profile}
+    if not force:
+        tasks = manifest.filter_tasks(tasks, "pdf_clearer", options)
+        skipped = len(pdf_files) - len(tasks)
+        if skipped:
+            print(f"Skipping {skipped} unchanged file(s) (use --force to reprocess)\n")
+    
+    def report(result):
+        if metrics:
+            metrics.write(result['metrics'])
+        if catalog:
+            catalog.record_run(result, "pdf_clearer", options, manifest.input_hash(result['input']))
+        if result['ok']:
+            manifest.record(result['input'], result['output'], "pdf_clearer", options)
+        elif result['error'] and result['error'] != "worker reported failure":
+            print(f"[FAILED] {result['input']}: {result['error']}")
+        if memory and result['peak_rss_bytes']:
+            print(f"     Peak RSS: {result['peak_rss_bytes'] / 2**20:.0f} MiB")
         print()  # Blank line between files
     
-    print(f"\nCompleted: {len(successful)}/{len(pdf_files)} files processed successfully")
+    try:
+        results = run_batch(clear_pdf_answers, tasks, jobs=jobs, on_result=report,
+                            metrics_label="pdf_clearer" if metrics or catalog else None)
+    finally:
+        manifest.save()
+    successful = [r['input'] for r in results if r['ok']]
+    
+    print(f"\nCompleted: {len(successful)}/{len(tasks)} files processed successfully")
+    summary = peak_rss_summary(results)
+    if summary:
+        print(summary)
     return successful
 
 
@@ -313,15 +811,50 @@ if __name__ == "__main__":
                        help="Process all PDFs in the current directory")
     parser.add_argument("-d", "--directory", default=".", 
                        help="Directory to process (used with --all)")
-    parser.add_argument("-m", "--method", choices=["auto", "pypdf", "pymupdf"], 
+    parser.add_argument("-m", "--method", choices=["auto", "pypdf", "pymupdf", "xref"], 
                        default="auto", help="Method to use for clearing PDFs")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                       help="Worker processes for --all (default: 1, 0 = one per CPU)")
+    parser.add_argument("-f", "--force", action="store_true",
+                       help="With --all, reprocess files even if unchanged since the last run")
+    parser.add_argument("-p", "--profile", choices=list(SAVE_PROFILES), default=DEFAULT_PROFILE,
+                       help="Save profile: fast, standard, compact or incremental "
+                            "(incremental keeps the original answers in an earlier revision)")
+    parser.add_argument("--template-cache", metavar="DIR",
+                       help="Cache field schemas per form template in DIR and reuse them "
+                            "(pymupdf and xref methods)")
+    add_memory_arguments(parser)
+    pdf_metrics.add_metrics_arguments(parser)
+    add_catalog_arguments(parser)
     
     args = parser.parse_args()
+    metrics = pdf_metrics.writer_from_args(args)
+    memory = budget_from_args(args)
     
     if args.all:
-        clear_all_pdfs_in_directory(args.directory)
+        catalog = catalog_from_args(args)
+        try:
+            clear_all_pdfs_in_directory(args.directory, method=args.method, jobs=args.jobs,
+                                        force=args.force, profile=args.profile, metrics=metrics,
+                                        template_cache=args.template_cache, memory=memory,
+                                        catalog=catalog)
+        finally:
+            if catalog:
+                catalog.close()
     elif args.input:
-        clear_pdf_answers(args.input, args.output, args.method)
+        output = args.output or str(Path(args.input).parent / f"{Path(args.input).stem}_cleared.pdf")
+        with pdf_metrics.track(args.input, output, "pdf_clearer") as document:
+            try:
+                document.ok = clear_pdf_answers(args.input, output, args.method, args.profile,
+                                                args.template_cache, memory)
+            except MemoryLimitExceeded as e:
+                print(f"[FAILED] {args.input}: {e}")
+                document.ok = False
+                document.error = f"{type(e).__name__}: {e}"
+        if document.peak_rss_bytes:
+            print(f"Peak RSS: {document.peak_rss_bytes / 2**20:.0f} MiB")
+        if metrics:
+            metrics.write(document.to_dict())
     else:
         print("No input specified. Use --all to process all PDFs or provide an input file.")
         print("\nUsage examples:")
@@ -329,3 +862,11 @@ if __name__ == "__main__":
         print("  python pdf_clearer.py file.pdf -o output.pdf")
         print("  python pdf_clearer.py --all")
         print("  python pdf_clearer.py --all -d /path/to/pdfs")
+        print("  python pdf_clearer.py --all --jobs 8")
+        print("  python pdf_clearer.py file.pdf --profile compact")
+        print("  python pdf_clearer.py --all -m xref --template-cache .template_cache")
+        print("  python pdf_clearer.py --all -m pymupdf --jobs 8 --max-rss-mb 1024 --chunk-pages 25")
+        print("  python pdf_clearer.py --all --metrics metrics.jsonl --metrics-prom metrics.prom")
+    
+    if metrics:
+        metrics.close()
@@ -0,0 +1,322 @@
+"""
+Per-stage, per-document performance metrics for the PDF pipelines.
+
+The clearing and purge functions call stage() and count() at their
+interesting points (open, widget iteration, widget.update(), annotation
+deletion, redaction, save). These are no-ops unless a document is being
+tracked, so the instrumentation costs nothing in normal runs:
+
+    with track("in.pdf", "out.pdf", "pdf_clearer") as metrics:
+        clear_pdf_answers("in.pdf", "out.pdf")
+    writer = MetricsWriter("metrics.jsonl", "metrics.prom")
+    writer.write(metrics.to_dict())
+    writer.close()
+
+MetricsWriter appends one JSON line per document and, on close(), writes the
+run's aggregates in Prometheus text format (for the node_exporter textfile
+collector or any scraper that reads files).
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds (seconds) of the pdf_document_seconds histogram buckets
+DOCUMENT_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_active: Optional["DocumentMetrics"] = None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the process high-water mark (Linux only); True if it was reset."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process in bytes, or None where unsupported."""
+    try:
+        with open("/proc/self/status") as f:
+            match = re.search(r"VmHWM:\s+(\d+) kB", f.read())
+        if match:
+            return int(match.group(1)) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics: "DocumentMetrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        stages = self.metrics.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.started
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class DocumentMetrics:
+    """Stage timings and counters for one document."""
+
+    def __init__(self, input_path: Optional[str] = None, output_path: Optional[str] = None,
+                 pipeline: Optional[str] = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.pipeline = pipeline
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.ok = True
+        self.error: Optional[str] = None
+        self.seconds = 0.0
+        self.bytes_in: Optional[int] = None
+        self.bytes_out: Optional[int] = None
+        self.peak_rss_bytes: Optional[int] = None
+        self.started_at = time.time()
+
+    def stage(self, name: str) -> _StageTimer:
+        """Context manager adding the elapsed wall time to stage name (repeatable)."""
+        return _StageTimer(self, name)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        return {
+            "timestamp": self.started_at,
+            "pipeline": self.pipeline,
+            "input": self.input_path,
+            "output": self.output_path,
+            "ok": self.ok,
+            "error": self.error,
+            "seconds": self.seconds,
+            "stages": self.stages,
+            "counts": self.counts,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+
+def stage(name: str):
+    """Time a stage of the tracked document; a no-op when nothing is tracked."""
+    if _active is None:
+        return _NULL_TIMER
+    return _StageTimer(_active, name)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter of the tracked document; a no-op when nothing is tracked."""
+    if _active is not None:
+        _active.count(name, n)
+
+
+def _file_size(path: Optional[str]) -> Optional[int]:
+    try:
+        return os.path.getsize(path) if path else None
+    except OSError:
+        return None
+
+
+@contextmanager
+def track(input_path: Optional[str], output_path: Optional[str] = None,
+          pipeline: Optional[str] = None) -> Iterator[DocumentMetrics]:
+    """
+    Collect metrics for one document processed inside the with block.
+    Exceptions are recorded (ok=False) and re-raised; callers that detect
+    failure another way should set metrics.ok themselves.
+    """
+    global _active
+    metrics = DocumentMetrics(input_path, output_path, pipeline)
+    metrics.bytes_in = _file_size(input_path)
+    reset_peak_rss()
+    previous, _active = _active, metrics
+    started = time.perf_counter()
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.ok = False
+        metrics.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _active = previous
+        metrics.seconds = time.perf_counter() - started
+        metrics.bytes_out = _file_size(metrics.output_path)
+        metrics.peak_rss_bytes = peak_rss_bytes()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    """
+    Sink for per-document metric records.
+
+    Args:
+        jsonl_path: File to append one JSON object per document to (optional)
+        prom_path: File to (re)write with aggregate Prometheus text-format
+                   metrics on close() (optional)
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, prom_path: Optional[str] = None):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self._jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+        self._documents: Dict[tuple, int] = {}
+        self._seconds: Dict[str, list] = {}
+        self._stage_total: Dict[tuple, float] = {}
+        self._stage_max: Dict[tuple, float] = {}
+        self._items: Dict[tuple, int] = {}
+        self._bytes: Dict[tuple, int] = {}
+        self._peak_rss: Dict[str, int] = {}
+
+    def write(self, record: Optional[dict]) -> None:
+        """Record one document (a DocumentMetrics.to_dict() result)."""
+        if not record:
+            return
+        if self._jsonl:
+            self._jsonl.write(json.dumps(record) + "\n")
+            self._jsonl.flush()
+
+        pipeline = record.get("pipeline") or "unknown"
+        status = "ok" if record.get("ok") else "failed"
+        self._documents[(pipeline, status)] = self._documents.get((pipeline, status), 0) + 1
+        self._seconds.setdefault(pipeline, []).append(record.get("seconds") or 0.0)
+        for name, seconds in (record.get("stages") or {}).items():
+            key = (pipeline, name)
+            self._stage_total[key] = self._stage_total.get(key, 0.0) + seconds
+            self._stage_max[key] = max(self._stage_max.get(key, 0.0), seconds)
+        for name, n in (record.get("counts") or {}).items():
+            self._items[(pipeline, name)] = self._items.get((pipeline, name), 0) + n
+        for direction in ("in", "out"):
+            size = record.get(f"bytes_{direction}")
+            if size is not None:
+                self._bytes[(pipeline, direction)] = self._bytes.get((pipeline, direction), 0) + size
+        peak = record.get("peak_rss_bytes")
+        if peak is not None:
+            self._peak_rss[pipeline] = max(self._peak_rss.get(pipeline, 0), peak)
+
+    def prometheus_text(self) -> str:
+        """Aggregates of every record written so far, in Prometheus text format."""
+        lines = [
+            "# HELP pdf_documents_total Documents processed.",
+            "# TYPE pdf_documents_total counter",
+        ]
+        for (pipeline, status), n in sorted(self._documents.items()):
+            lines.append(f"pdf_documents_total{_labels(pipeline=pipeline, status=status)} {n}")
+
+        lines += [
+            "# HELP pdf_document_seconds Wall time per document.",
+            "# TYPE pdf_document_seconds histogram",
+        ]
+        for pipeline, values in sorted(self._seconds.items()):
+            for bound in DOCUMENT_SECONDS_BUCKETS:
+                n = sum(1 for v in values if v <= bound)
+                lines.append(f"pdf_document_seconds_bucket{_labels(pipeline=pipeline, le=bound)} {n}")
+            lines.append(f"pdf_document_seconds_bucket{_labels(pipeline=pipeline, le='+Inf')} {len(values)}")
+            lines.append(f"pdf_document_seconds_sum{_labels(pipeline=pipeline)} {sum(values)}")
+            lines.append(f"pdf_document_seconds_count{_labels(pipeline=pipeline)} {len(values)}")
+
+        lines += [
+            "# HELP pdf_stage_seconds_total Wall time spent in each stage across documents.",
+            "# TYPE pdf_stage_seconds_total counter",
+        ]
+        for (pipeline, name), seconds in sorted(self._stage_total.items()):
+            lines.append(f"pdf_stage_seconds_total{_labels(pipeline=pipeline, stage=name)} {seconds}")
+
+        lines += [
+            "# HELP pdf_stage_seconds_max Slowest single document for each stage.",
+            "# TYPE pdf_stage_seconds_max gauge",
+        ]
+        for (pipeline, name), seconds in sorted(self._stage_max.items()):
+            lines.append(f"pdf_stage_seconds_max{_labels(pipeline=pipeline, stage=name)} {seconds}")
+
+        lines += [
+            "# HELP pdf_items_total Pages, widgets, annotations and other items processed.",
+            "# TYPE pdf_items_total counter",
+        ]
+        for (pipeline, name), n in sorted(self._items.items()):
+            lines.append(f"pdf_items_total{_labels(pipeline=pipeline, item=name)} {n}")
+
+        lines += [
+            "# HELP pdf_bytes_total Input and output file bytes.",
+            "# TYPE pdf_bytes_total counter",
+        ]
+        for (pipeline, direction), n in sorted(self._bytes.items()):
+            lines.append(f"pdf_bytes_total{_labels(pipeline=pipeline, direction=direction)} {n}")
+
+        lines += [
+            "# HELP pdf_peak_rss_bytes Largest per-document peak resident set size.",
+            "# TYPE pdf_peak_rss_bytes gauge",
+        ]
+        for pipeline, peak in sorted(self._peak_rss.items()):
+            lines.append(f"pdf_peak_rss_bytes{_labels(pipeline=pipeline)} {peak}")
+
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        """Close the JSONL file and write the Prometheus file atomically."""
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+        if self.prom_path:
+            tmp_path = f"{self.prom_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prom_path)
+
+
+def add_metrics_arguments(parser) -> None:
+    """Add the --metrics/--metrics-prom options to an argparse parser."""
+    parser.add_argument("--metrics", metavar="FILE.jsonl",
+                        help="Append per-document stage timings and counters to this JSON-lines file")
+    parser.add_argument("--metrics-prom", metavar="FILE.prom",
+                        help="Write aggregate metrics in Prometheus text format to this file")
+
+
+def writer_from_args(args) -> Optional[MetricsWriter]:
+    """MetricsWriter for parsed --metrics/--metrics-prom options, or None if neither was given."""
+    if not (args.metrics or args.metrics_prom):
+        return None
+    return MetricsWriter(args.metrics, args.metrics_prom)
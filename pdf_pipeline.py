@@ -0,0 +1,197 @@
+"""
+Single-pass PDF pipeline.
+Opens a document once, runs a configured list of stages (widget clear,
+annotation purge, embedded-file removal, zone and pattern redaction,
+flatten) against
+the same in-memory document, and saves once, reporting per-stage timings.
+
+Usage:
+    python pdf_pipeline.py input.pdf output.pdf
+    python pdf_pipeline.py input.pdf output.pdf --stages clear remove_embedded flatten
+    python pdf_pipeline.py input.pdf output.pdf --stages clear purge_annotations redact_zones --zones zones.json
+    python pdf_pipeline.py input.pdf output.pdf --stages clear redact_patterns flatten --patterns ssn email
+    python pdf_pipeline.py input.pdf output.pdf --profile fast
+"""
+
+import argparse
+import re
+import time
+from typing import Dict, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+
+from pattern_redaction import BUILTIN_PATTERNS, compile_patterns, redact_patterns, select_patterns
+from pdf_clearer import clear_document_pymupdf, clear_document_xref
+from pdf_purge_and_redact import (apply_redaction_zones, load_zones, purge_annotations,
+                                  purge_widgets, remove_embedded_files)
+from save_profiles import DEFAULT_PROFILE, SAVE_PROFILES, open_document, save_document
+
+
+def _stage_clear(doc: fitz.Document, options: dict) -> int:
+    """Clear every form field value, keeping the fields themselves."""
+    if options.get("clear_method", "xref") == "pymupdf":
+        return clear_document_pymupdf(doc)
+    return clear_document_xref(doc)
+
+
+def _stage_purge_widgets(doc: fitz.Document, options: dict) -> int:
+    """Delete form fields entirely."""
+    return sum(purge_widgets(page) for page in doc)
+
+
+def _stage_purge_annotations(doc: fitz.Document, options: dict) -> int:
+    """Delete every non-widget annotation."""
+    return sum(purge_annotations(page) for page in doc)
+
+
+def _stage_remove_embedded(doc: fitz.Document, options: dict) -> int:
+    return remove_embedded_files(doc)
+
+
+def _stage_redact_zones(doc: fitz.Document, options: dict) -> int:
+    """True-redact the rectangles in options['zones'] (zones.json format)."""
+    zones = options.get("zones")
+    if not zones:
+        raise ValueError("redact_zones stage requires zones")
+    return apply_redaction_zones(doc, zones)
+
+
+def _stage_redact_patterns(doc: fitz.Document, options: dict) -> int:
+    """True-redact text matching options['patterns'] (see pattern_redaction)."""
+    patterns = options.get("patterns")
+    if patterns is None:
+        patterns = compile_patterns(select_patterns())
+    return sum(redact_patterns(doc, patterns).values())
+
+
+def _stage_flatten(doc: fitz.Document, options: dict) -> int:
+    """Burn remaining annotations and fields into the page content."""
+    if not hasattr(doc, "bake"):
+        raise RuntimeError("flatten stage requires a PyMuPDF version with Document.bake()")
+    doc.bake(annots=True, widgets=True)
+    return doc.page_count
+
+
+# Stage name -> function(doc, options) returning the number of items it processed
+STAGES = {
+    "clear": _stage_clear,
+    "purge_widgets": _stage_purge_widgets,
+    "purge_annotations": _stage_purge_annotations,
+    "remove_embedded": _stage_remove_embedded,
+    "redact_zones": _stage_redact_zones,
+    "redact_patterns": _stage_redact_patterns,
+    "flatten": _stage_flatten,
+}
+
+DEFAULT_STAGES = ("clear", "purge_annotations", "remove_embedded", "flatten")
+
+# Stages that remove content; their output is saved sanitized (clean=True),
+# as the purge scripts do, to drop orphaned objects
+PURGE_STAGES = {"purge_widgets", "purge_annotations", "remove_embedded", "redact_zones", "redact_patterns"}
+
+
+def run_stages(doc: fitz.Document, stages: Sequence[str], options: Optional[dict] = None) -> List[Dict]:
+    """
+    Run stages in order against an open document.
+
+    Returns:
+        One {'stage', 'seconds', 'count'} dict per stage.
+    """
+    options = options or {}
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. Choose from: {', '.join(STAGES)}")
+
+    report = []
+    for name in stages:
+        started = time.perf_counter()
+        count = STAGES[name](doc, options)
+        report.append({"stage": name, "seconds": time.perf_counter() - started, "count": count})
+    return report
+
+
+def run_pipeline(input_path: str, output_path: str, stages: Sequence[str] = DEFAULT_STAGES,
+                 zones: Optional[dict] = None, clear_method: str = "xref",
+                 profile: str = DEFAULT_PROFILE, patterns: Optional["re.Pattern"] = None) -> Dict:
+    """
+    Open input_path once, run stages, and save output_path once.
+
+    Args:
+        input_path: Path to input PDF
+        output_path: Path to output PDF
+        stages: Stage names from STAGES, run in the given order
+        zones: Redaction zones (zones.json format) for the redact_zones stage
+        clear_method: 'xref' or 'pymupdf' engine for the clear stage
+        profile: Save profile from save_profiles.SAVE_PROFILES
+        patterns: Compiled regex (pattern_redaction.compile_patterns) for the
+                  redact_patterns stage; defaults to every built-in pattern
+
+    Returns:
+        Dict with 'stages' (per-stage timing and counts) plus 'open', 'save'
+        and 'total' seconds.
+    """
+    total_started = time.perf_counter()
+
+    started = time.perf_counter()
+    doc = open_document(input_path, output_path, profile)
+    open_seconds = time.perf_counter() - started
+
+    try:
+        report = run_stages(doc, stages, {"zones": zones, "clear_method": clear_method,
+                                          "patterns": patterns})
+
+        started = time.perf_counter()
+        save_document(doc, output_path, profile, sanitize=bool(PURGE_STAGES.intersection(stages)))
+        save_seconds = time.perf_counter() - started
+    finally:
+        doc.close()
+
+    return {
+        "stages": report,
+        "open": open_seconds,
+        "save": save_seconds,
+        "total": time.perf_counter() - total_started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run clear/purge/redact/flatten stages in a single open/save.")
+    parser.add_argument("input_pdf", help="Path to input PDF")
+    parser.add_argument("output_pdf", help="Path to output PDF")
+    parser.add_argument("-s", "--stages", nargs="+", choices=list(STAGES), default=list(DEFAULT_STAGES),
+                        help=f"Stages to run, in order (default: {' '.join(DEFAULT_STAGES)})")
+    parser.add_argument("--zones", help="zones.json for the redact_zones stage")
+    parser.add_argument("--patterns", nargs="+", choices=list(BUILTIN_PATTERNS),
+                        help="Built-in patterns for the redact_patterns stage (default: all)")
+    parser.add_argument("--regex", action="append", default=[],
+                        help="Custom regex for the redact_patterns stage (repeatable)")
+    parser.add_argument("-m", "--clear-method", choices=["xref", "pymupdf"], default="xref",
+                        help="Engine for the clear stage (default: xref)")
+    parser.add_argument("-p", "--profile", choices=list(SAVE_PROFILES), default=DEFAULT_PROFILE,
+                        help="Save profile (default: standard)")
+    args = parser.parse_args()
+
+    zones = load_zones(args.zones) if args.zones else None
+    if "redact_zones" in args.stages and not zones:
+        parser.error("the redact_zones stage requires --zones")
+    try:
+        patterns = compile_patterns(select_patterns(args.patterns, args.regex))
+    except ValueError as e:
+        parser.error(str(e))
+
+    result = run_pipeline(args.input_pdf, args.output_pdf, args.stages, zones, args.clear_method,
+                          args.profile, patterns)
+
+    print(f"{'Stage':<20} {'Items':>8} {'Time (ms)':>10}")
+    print("-" * 40)
+    print(f"{'open':<20} {'':>8} {result['open'] * 1000:>10.1f}")
+    for stage in result["stages"]:
+        print(f"{stage['stage']:<20} {stage['count']:>8} {stage['seconds'] * 1000:>10.1f}")
+    print(f"{'save':<20} {'':>8} {result['save'] * 1000:>10.1f}")
+    print("-" * 40)
+    print(f"{'total':<20} {'':>8} {result['total'] * 1000:>10.1f}")
+    print(f"\nOutput: {args.output_pdf}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@
 # 2) Deletes ALL annotations (free-text, highlights, stamps, ink, etc.)
 # 3) Removes embedded files (when supported)
 # 4) Optionally applies TRUE REDACTION to user-defined zones (guaranteed removal in those areas)
+# 5) Optionally TRUE-redacts text matching patterns (SSNs, dates, emails, phones, license numbers, custom regexes)
 #
 # Usage:
 #   pip install pymupdf
@@ -15,6 +16,18 @@
 #   # Option B: purge + true redaction by zones (recommended if typed content is "baked in")
 #   python pdf_purge_and_redact.py input.pdf output.pdf --zones zones.json
 #
+#   # Option B2: zones looked up by form template (see zone_registry.py)
+#   python pdf_purge_and_redact.py input.pdf output.pdf --zone-registry zone_registry.json
+#
+#   # Option C: purge + true redaction of matching text (see pattern_redaction.py)
+#   python pdf_purge_and_redact.py input.pdf output.pdf --patterns ssn date email --regex "ID-\d{6}"
+#
+#   # Save profile: fast, standard (default), compact or incremental
+#   python pdf_purge_and_redact.py input.pdf output.pdf --profile compact
+#
+#   # Per-stage timings/counters as JSON lines and Prometheus text
+#   python pdf_purge_and_redact.py input.pdf output.pdf --metrics metrics.jsonl --metrics-prom metrics.prom
+#
 # zones.json format (page indexes are 0-based):
 # {
 #   "0": [{"x1":72,"y1":120,"x2":540,"y2":170}],
@@ -33,11 +46,19 @@
 # If the filled text is normal page content and you don't specify zones or patterns,
 # it cannot be reliably distinguished from the original template text.
 
+import re
 import sys
 import json
 import argparse
+from typing import BinaryIO, Optional
 import fitz  # PyMuPDF
 
+import pdf_metrics
+from pattern_redaction import BUILTIN_PATTERNS, compile_patterns, redact_patterns, select_patterns
+from pdf_streams import PdfSource, deliver, read_source
+from save_profiles import (DEFAULT_PROFILE, SAVE_PROFILES, discard_copy, document_bytes,
+                           open_document, save_document)
+
 
 def purge_widgets(page: fitz.Page) -> int:
     """Delete/clear AcroForm widgets (text fields, checkboxes, etc.)."""
@@ -138,40 +159,141 @@ def apply_redaction_zones(doc: fitz.Document, zones: dict) -> int:
     return total
 
 
+def purge_and_redact_document(doc: fitz.Document, zones: Optional[dict] = None,
+                              patterns: Optional["re.Pattern"] = None) -> dict:
+    """
+    Purge widgets, annotations and embedded files from an open document and
+    optionally true-redact zones and text matching patterns (a regex from
+    pattern_redaction.compile_patterns).
+    Returns a dict of counts: widgets, annotations, embedded_files,
+    redaction_zones, pattern_matches.
+    """
+    total_widgets = 0
+    total_annots = 0
+
+    for page in doc:
+        with pdf_metrics.stage("widgets"):
+            total_widgets += purge_widgets(page)
+        with pdf_metrics.stage("annotations"):
+            total_annots += purge_annotations(page)
+
+    with pdf_metrics.stage("embedded_files"):
+        embedded_removed = remove_embedded_files(doc)
+
+    redacted_zones = 0
+    if zones:
+        with pdf_metrics.stage("redaction"):
+            redacted_zones = apply_redaction_zones(doc, zones)
+
+    pattern_matches = 0
+    if patterns is not None:
+        pattern_matches = sum(redact_patterns(doc, patterns).values())
+
+    pdf_metrics.count("pages", doc.page_count)
+    pdf_metrics.count("widgets", total_widgets)
+    pdf_metrics.count("annotations", total_annots)
+    pdf_metrics.count("embedded_files", embedded_removed)
+    pdf_metrics.count("redaction_zones", redacted_zones)
+
+    return {
+        "widgets": total_widgets,
+        "annotations": total_annots,
+        "embedded_files": embedded_removed,
+        "redaction_zones": redacted_zones,
+        "pattern_matches": pattern_matches,
+    }
+
+
+def purge_and_redact_pdf(input_pdf: str, output_pdf: str, zones: Optional[dict] = None,
+                         profile: str = DEFAULT_PROFILE, patterns: Optional["re.Pattern"] = None) -> dict:
+    """
+    Purge input_pdf (see purge_and_redact_document) and save to output_pdf
+    using the given save profile. Returns the purge counts.
+    On failure the partial output is discarded and the error re-raised.
+    """
+    doc = None
+    try:
+        with pdf_metrics.stage("open"):
+            doc = open_document(input_pdf, output_pdf, profile)
+        counts = purge_and_redact_document(doc, zones, patterns)
+
+        # Save with cleanup to drop orphaned objects and reduce the chance of recoverable remnants
+        with pdf_metrics.stage("save"):
+            save_document(doc, output_pdf, profile, sanitize=True)
+    except Exception:
+        if doc is not None and not doc.is_closed:
+            doc.close()
+        discard_copy(input_pdf, output_pdf, profile)
+        raise
+    finally:
+        if doc is not None and not doc.is_closed:
+            doc.close()
+
+    return counts
+
+
+def purge_and_redact_bytes(source: PdfSource, destination: Optional[BinaryIO] = None,
+                           zones: Optional[dict] = None, profile: str = DEFAULT_PROFILE,
+                           patterns: Optional["re.Pattern"] = None) -> bytes:
+    """
+    Purge an in-memory PDF (bytes or readable buffer) without temp files.
+    Returns the purged PDF bytes, also writing them to destination if given.
+    """
+    doc = fitz.open(stream=read_source(source), filetype="pdf")
+    try:
+        purge_and_redact_document(doc, zones, patterns)
+        data = document_bytes(doc, profile, sanitize=True)
+    finally:
+        doc.close()
+    return deliver(data, destination)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Purge interactive PDF data and optionally true-redact zones.")
     parser.add_argument("input_pdf", help="Path to input PDF")
     parser.add_argument("output_pdf", help="Path to output PDF")
     parser.add_argument("--zones", help="Optional zones.json to true-redact (content removal)")
+    parser.add_argument("--zone-registry",
+                        help="Template zone registry to look the zones up in when --zones is not given")
+    parser.add_argument("--patterns", nargs="+", choices=list(BUILTIN_PATTERNS),
+                        help="True-redact text matching these built-in patterns")
+    parser.add_argument("--regex", action="append", default=[],
+                        help="True-redact text matching this regular expression (repeatable)")
+    parser.add_argument("-p", "--profile", choices=list(SAVE_PROFILES), default=DEFAULT_PROFILE,
+                        help="Save profile (default: standard; incremental keeps the purged "
+                             "content in an earlier revision)")
+    pdf_metrics.add_metrics_arguments(parser)
 
     args = parser.parse_args()
 
-    doc = fitz.open(args.input_pdf)
-
-    total_widgets = 0
-    total_annots = 0
-
-    for page in doc:
-        total_widgets += purge_widgets(page)
-        total_annots += purge_annotations(page)
-
-    embedded_removed = remove_embedded_files(doc)
-
-    redacted_zones = 0
-    if args.zones:
-        zones = load_zones(args.zones)
-        redacted_zones = apply_redaction_zones(doc, zones)
+    zones = load_zones(args.zones) if args.zones else None
+    if zones is None and args.zone_registry:
+        from zone_registry import load_registry
+        with fitz.open(args.input_pdf) as doc:
+            zones = load_registry(args.zone_registry).zones_for(args.input_pdf, doc) or None
+        print(f"Template zones: {'found' if zones else 'no matching template'}")
+    patterns = None
+    if args.patterns or args.regex:
+        try:
+            patterns = compile_patterns(select_patterns(args.patterns, args.regex))
+        except ValueError as e:
+            parser.error(str(e))
+    with pdf_metrics.track(args.input_pdf, args.output_pdf, "purge_and_redact") as document:
+        counts = purge_and_redact_pdf(args.input_pdf, args.output_pdf, zones, args.profile, patterns)
 
-    # Save with cleanup to drop orphaned objects and reduce the chance of recoverable remnants
-    doc.save(args.output_pdf, deflate=True, garbage=4, clean=True)
-    doc.close()
+    metrics = pdf_metrics.writer_from_args(args)
+    if metrics:
+        metrics.write(document.to_dict())
+        metrics.close()
 
     print("Done.")
-    print(f"Widgets removed/cleared: {total_widgets}")
-    print(f"Annotations removed:     {total_annots}")
-    print(f"Embedded files removed:  {embedded_removed}")
-    if args.zones:
-        print(f"Redaction zones applied: {redacted_zones}")
+    print(f"Widgets removed/cleared: {counts['widgets']}")
+    print(f"Annotations removed:     {counts['annotations']}")
+    print(f"Embedded files removed:  {counts['embedded_files']}")
+    if zones:
+        print(f"Redaction zones applied: {counts['redaction_zones']}")
+    if patterns is not None:
+        print(f"Pattern matches redacted: {counts['pattern_matches']}")
     print(f"Output: {args.output_pdf}")
 
 
@@ -0,0 +1,31 @@
+"""
+Helpers for the in-memory (bytes-to-bytes) PDF APIs.
+Accept PDF input as bytes or a readable buffer and deliver output as bytes
+and/or into a writable buffer, without touching the filesystem.
+"""
+
+from typing import BinaryIO, Optional, Union
+
+PdfSource = Union[bytes, bytearray, memoryview, BinaryIO]
+
+
+def read_source(source: PdfSource) -> Union[bytes, bytearray]:
+    """Return the PDF data held by source (bytes-like or readable buffer)."""
+    if hasattr(source, "read"):
+        data = source.read()
+    elif isinstance(source, memoryview):
+        data = source.tobytes()
+    else:
+        data = source
+    if not isinstance(data, (bytes, bytearray)):
+        raise TypeError(f"Expected PDF bytes or a binary buffer, got {type(source).__name__}")
+    if not data:
+        raise ValueError("Empty PDF input")
+    return data
+
+
+def deliver(data: bytes, destination: Optional[BinaryIO] = None) -> bytes:
+    """Write data to destination (if given) and return it."""
+    if destination is not None:
+        destination.write(data)
+    return data
@@ -0,0 +1,130 @@
+"""
+Named save profiles shared by every PDF writer in this project.
+
+    fast         Drop unreferenced objects only (garbage=1) and skip
+                 recompression. Removed field values, annotations and
+                 attachments are still dropped from the file.
+    standard     garbage=4 + deflate: the behaviour the scripts always had.
+    compact      Full garbage collection, object streams, and deflate of
+                 content, images and fonts. Smallest output, slowest save.
+    incremental  Append only the changes to a copy of the input. Fastest on
+                 very large files, but the original filled-in revision stays
+                 inside the output and can be recovered - do not use it when
+                 the answers must be unrecoverable.
+"""
+
+import io
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+SAVE_PROFILES = {
+    "fast": {"garbage": 1, "deflate": False},
+    "standard": {"garbage": 4, "deflate": True},
+    "compact": {"garbage": 4, "deflate": True, "deflate_images": True, "deflate_fonts": True,
+                "use_objstms": 1, "clean": True},
+    "incremental": {"incremental": True, "encryption": fitz.PDF_ENCRYPT_KEEP},
+}
+
+DEFAULT_PROFILE = "standard"
+
+# pypdf writers build a new file, so they cannot append to the input
+PYPDF_PROFILES = ("fast", "standard", "compact")
+
+
+def _check_profile(profile: str) -> None:
+    if profile not in SAVE_PROFILES:
+        raise ValueError(f"Unknown save profile '{profile}'. Choose from: {', '.join(SAVE_PROFILES)}")
+
+
+def save_options(profile: str = DEFAULT_PROFILE, sanitize: bool = False) -> dict:
+    """
+    Keyword arguments for Document.save()/tobytes() under profile.
+    sanitize requests content-stream cleanup (clean=True), as the purge
+    scripts use; the fast and incremental profiles skip it.
+    """
+    _check_profile(profile)
+    options = dict(SAVE_PROFILES[profile])
+    if sanitize and profile in ("standard", "compact"):
+        options["clean"] = True
+    return options
+
+
+def open_document(input_path: str, output_path: Optional[str] = None,
+                  profile: str = DEFAULT_PROFILE) -> fitz.Document:
+    """
+    Open input_path for processing under profile. For the incremental
+    profile the input is first copied to output_path and that copy is opened,
+    since incremental saves can only append to the file they were read from.
+    """
+    _check_profile(profile)
+    if profile == "incremental" and output_path and Path(output_path).resolve() != Path(input_path).resolve():
+        shutil.copyfile(input_path, output_path)
+        return fitz.open(output_path)
+    return fitz.open(input_path)
+
+
+def discard_copy(input_path: str, output_path: Optional[str], profile: str = DEFAULT_PROFILE) -> None:
+    """
+    Delete the copy open_document made at output_path for the incremental
+    profile, so a failed run leaves no half-processed output behind.
+    Close the document first.
+    """
+    if profile == "incremental" and output_path and Path(output_path).resolve() != Path(input_path).resolve():
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+
+
+def save_document(doc: fitz.Document, output_path: str, profile: str = DEFAULT_PROFILE,
+                  sanitize: bool = False) -> None:
+    """Save doc to output_path using profile (see open_document for incremental)."""
+    options = save_options(profile, sanitize)
+    if profile == "incremental":
+        if Path(doc.name).resolve() != Path(output_path).resolve():
+            raise ValueError("incremental profile requires the document to be opened with open_document()")
+        doc.save(doc.name, **options)
+    else:
+        doc.save(output_path, **options)
+
+
+def document_bytes(doc: fitz.Document, profile: str = DEFAULT_PROFILE, sanitize: bool = False) -> bytes:
+    """Serialize doc to bytes using profile."""
+    if profile == "incremental":
+        raise ValueError("incremental profile needs a file to append to; use fast for in-memory output")
+    return doc.tobytes(**save_options(profile, sanitize))
+
+
+def write_pypdf(writer, destination, profile: str = DEFAULT_PROFILE) -> None:
+    """
+    Write a pypdf PdfWriter to a path or binary buffer using profile.
+    fast and standard write the file as built; compact also deduplicates
+    objects and compresses page content streams.
+    """
+    _check_profile(profile)
+    if profile not in PYPDF_PROFILES:
+        raise ValueError(f"'{profile}' profile is not supported by the pypdf engines; "
+                         f"choose from: {', '.join(PYPDF_PROFILES)}")
+    if profile == "compact":
+        for page in writer.pages:
+            try:
+                page.compress_content_streams()
+            except Exception:
+                pass
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    if isinstance(destination, (str, Path)):
+        with open(destination, "wb") as f:
+            writer.write(f)
+    else:
+        writer.write(destination)
+
+
+def pypdf_bytes(writer, profile: str = DEFAULT_PROFILE) -> bytes:
+    """Serialize a pypdf PdfWriter to bytes using profile."""
+    buffer = io.BytesIO()
+    write_pypdf(writer, buffer, profile)
+    return buffer.getvalue()
@@ -0,0 +1,104 @@
+"""
+Resumable JSON-lines checkpoint for find_blank_forms.
+
+Each finished application's result is appended as one JSON line and flushed
+right away. An interrupted run therefore loses at most the searches that were
+in flight. Only a byte offset per application is kept in memory. The final
+JSON and HTML reports are streamed from the checkpoint in application order,
+so memory stays flat however long the application list is.
+
+With resume=True, an existing checkpoint is kept: applications it already
+holds are skipped, and a partially written last line (from a crash
+mid-write) is dropped. Otherwise the checkpoint starts empty.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+CHECKPOINT_NAME = "form_search_results.jsonl"
+
+
+def application_key(app: dict) -> str:
+    """Identity of an application (or of its result record) in the checkpoint."""
+    return "\x1f".join(str(app.get(field)) for field in ("state", "state_name", "license_type", "app_type"))
+
+
+class SearchCheckpoint:
+    """
+    Append-only JSON-lines file of search results, indexed by application_key.
+
+    Args:
+        path: Checkpoint file
+        resume: Keep and index an existing checkpoint instead of starting over
+    """
+
+    def __init__(self, path: str = CHECKPOINT_NAME, resume: bool = False):
+        self.path = Path(path)
+        self.offsets: Dict[str, int] = {}
+        if resume and self.path.exists():
+            self._load()
+            self._file = open(self.path, "ab")
+        else:
+            self._file = open(self.path, "wb")
+        self.resumed = len(self.offsets)
+
+    def _load(self) -> None:
+        """Index the existing lines and cut off an incomplete last line."""
+        end = 0
+        with open(self.path, "rb") as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                end = f.tell()
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                self.offsets[application_key(result)] = offset
+        if end != self.path.stat().st_size:
+            os.truncate(self.path, end)
+
+    def __contains__(self, app: dict) -> bool:
+        return application_key(app) in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def append(self, result: dict) -> None:
+        """Record a finished application's result."""
+        self._file.seek(0, os.SEEK_END)
+        self.offsets[application_key(result)] = self._file.tell()
+        self._file.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._file.flush()
+
+    def get(self, app: dict) -> Optional[dict]:
+        """Stored result for an application, or None."""
+        offset = self.offsets.get(application_key(app))
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def results(self, applications: Iterable[dict]) -> Iterator[dict]:
+        """Stored results in the order of applications (skipping ones not done)."""
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            for app in applications:
+                offset = self.offsets.get(application_key(app))
+                if offset is not None:
+                    f.seek(offset)
+                    yield json.loads(f.readline())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SearchCheckpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
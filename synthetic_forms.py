@@ -0,0 +1,181 @@
+"""
+Synthetic filled-form generator for benchmarking the clearing pipelines.
+Builds PDF forms locally with PyMuPDF, varying page count, widget count,
+field types, annotation density and embedded files.
+"""
+
+import argparse
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import fitz  # PyMuPDF
+
+FIELD_TYPES = ("text", "checkbox", "combobox", "listbox")
+
+# Named corpus profiles: each describes one kind of filled application
+CORPUS_PROFILES = {
+    "small": {"pages": 2, "widgets_per_page": 12, "annots_per_page": 1, "embedded_files": 0},
+    "medium": {"pages": 10, "widgets_per_page": 40, "annots_per_page": 2, "embedded_files": 1},
+    "large": {"pages": 50, "widgets_per_page": 60, "annots_per_page": 2, "embedded_files": 2},
+    "text_only": {"pages": 10, "widgets_per_page": 80, "annots_per_page": 0, "embedded_files": 0,
+                  "field_types": ("text",)},
+    "annotation_heavy": {"pages": 10, "widgets_per_page": 10, "annots_per_page": 25, "embedded_files": 0},
+    "attachments": {"pages": 4, "widgets_per_page": 20, "annots_per_page": 1, "embedded_files": 10},
+}
+
+CHOICES = ["Alpha", "Bravo", "Charlie", "Delta"]
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter
+
+
+def _add_widget(page: fitz.Page, field_type: str, name: str, rect: fitz.Rect, rng: random.Random) -> None:
+    widget = fitz.Widget()
+    widget.field_name = name
+    widget.rect = rect
+    if field_type == "checkbox":
+        widget.field_type = fitz.PDF_WIDGET_TYPE_CHECKBOX
+        widget.field_value = True
+    elif field_type in ("combobox", "listbox"):
+        widget.field_type = (fitz.PDF_WIDGET_TYPE_COMBOBOX if field_type == "combobox"
+                             else fitz.PDF_WIDGET_TYPE_LISTBOX)
+        widget.choice_values = CHOICES
+        widget.field_value = rng.choice(CHOICES)
+    else:
+        widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+        widget.field_value = f"Applicant answer {rng.randint(100000, 999999)}"
+    page.add_widget(widget)
+
+
+def _add_annotations(page: fitz.Page, count: int, rng: random.Random) -> None:
+    for i in range(count):
+        x = rng.uniform(40, PAGE_WIDTH - 200)
+        y = rng.uniform(40, PAGE_HEIGHT - 60)
+        kind = i % 3
+        if kind == 0:
+            page.add_text_annot((x, y), f"Reviewer note {i}")
+        elif kind == 1:
+            page.add_freetext_annot(fitz.Rect(x, y, x + 150, y + 24), f"Typed comment {i}")
+        else:
+            page.add_highlight_annot(fitz.Rect(x, y, x + 120, y + 12))
+
+
+def build_form(output_path: str, pages: int = 2, widgets_per_page: int = 10,
+               annots_per_page: int = 0, embedded_files: int = 0,
+               field_types: Sequence[str] = FIELD_TYPES, seed: int = 0) -> Dict:
+    """
+    Build one synthetic filled form and save it to output_path.
+
+    Returns:
+        Dict with the path and the pages, fields, annotations and embedded
+        files it contains, plus its size in bytes.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    # Lay widgets out in a grid under the static template text
+    columns = max(2, -(-widgets_per_page // 45))
+    rows = -(-widgets_per_page // columns)
+    col_width = (PAGE_WIDTH - 72) / columns
+    row_height = min(30, (PAGE_HEIGHT - 140) / max(rows, 1))
+
+    fields = 0
+    for page_num in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((36, 40), f"State Board License Application - Page {page_num + 1}", fontsize=14)
+        page.insert_text((36, 60), "Complete all sections. Attach supporting documents.", fontsize=9)
+
+        for i in range(widgets_per_page):
+            col, row = i % columns, i // columns
+            x0 = 36 + col * col_width
+            y0 = 80 + row * row_height
+            rect = fitz.Rect(x0 + 70, y0, x0 + col_width - 8, y0 + row_height * 0.7)
+            field_type = field_types[i % len(field_types)]
+            if field_type == "checkbox":
+                rect = fitz.Rect(rect.x0, rect.y0, rect.x0 + rect.height, rect.y1)
+            page.insert_text((x0, y0 + row_height * 0.5), f"Field {i + 1}", fontsize=7)
+            _add_widget(page, field_type, f"p{page_num}_{field_type}_{i}", rect, rng)
+            fields += 1
+
+        _add_annotations(page, annots_per_page, rng)
+
+    for i in range(embedded_files):
+        doc.embfile_add(f"attachment_{i}.txt", f"Applicant document {i}\n".encode() * 200)
+
+    doc.save(output_path, garbage=3, deflate=True)
+    doc.close()
+
+    return {
+        "path": str(output_path),
+        "pages": pages,
+        "fields": fields,
+        "annotations": pages * annots_per_page,
+        "embedded_files": embedded_files,
+        "bytes": Path(output_path).stat().st_size,
+    }
+
+
+def build_corpus(directory: str, profiles: Optional[List[str]] = None, copies: int = 1) -> List[Dict]:
+    """
+    Build copies of each named profile into directory.
+
+    Returns:
+        One build_form() result per file, with an added 'profile' key.
+    """
+    out_dir = Path(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    corpus = []
+    for name in profiles or list(CORPUS_PROFILES):
+        spec = CORPUS_PROFILES[name]
+        for copy in range(copies):
+            info = build_form(str(out_dir / f"synthetic_{name}_{copy}.pdf"), seed=copy, **spec)
+            info["profile"] = name
+            corpus.append(info)
+    return corpus
+
+
+def describe_form(path: str) -> Dict:
+    """build_form()-style summary of an existing PDF, with its 'profile' taken from the file name."""
+    with fitz.open(path) as doc:
+        widgets = sum(1 for page in doc for _ in page.widgets())
+        annotations = sum(1 for page in doc for _ in page.annots())
+        info = {
+            "path": str(path),
+            "pages": doc.page_count,
+            "fields": widgets,
+            "annotations": annotations,
+            "embedded_files": doc.embfile_count(),
+            "bytes": Path(path).stat().st_size,
+        }
+    # synthetic_<profile>_<copy>.pdf as written by build_corpus
+    stem = Path(path).stem
+    name = stem[len("synthetic_"):].rsplit("_", 1)[0] if stem.startswith("synthetic_") else ""
+    info["profile"] = name if name in CORPUS_PROFILES else stem
+    return info
+
+
+def load_corpus(directory: str, profiles: Optional[List[str]] = None) -> List[Dict]:
+    """describe_form() for every PDF in directory, optionally only those of the named profiles."""
+    corpus = [describe_form(str(path)) for path in sorted(Path(directory).glob("*.pdf"))]
+    if profiles:
+        corpus = [info for info in corpus if info["profile"] in profiles]
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic corpus of filled PDF forms.")
+    parser.add_argument("output_dir", help="Directory to write the corpus to")
+    parser.add_argument("-p", "--profiles", nargs="+", choices=list(CORPUS_PROFILES),
+                        help="Profiles to build (default: all)")
+    parser.add_argument("-c", "--copies", type=int, default=1, help="Files per profile")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.output_dir, args.profiles, args.copies)
+    for info in corpus:
+        print(f"{info['path']}: {info['pages']} pages, {info['fields']} fields, "
+              f"{info['annotations']} annotations, {info['embedded_files']} embedded, "
+              f"{info['bytes'] / 1024:.0f} KB")
+    print(f"\nBuilt {len(corpus)} file(s) in {Path(args.output_dir).absolute()}")
+
+
+if __name__ == "__main__":
+    main()
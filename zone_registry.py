@@ -0,0 +1,191 @@
+"""
+Registry of redaction zones per form template.
+
+Each entry gives the zones.json rectangles for one template. A template is
+identified by any of the (state, license_type, app_type) values that
+analyze_applications.parse_filename extracts from the file name, or by a
+structural fingerprint of the form (see structural_fingerprint). The batch
+purge and pdf_purge_and_redact look the zones up automatically.
+
+zone_registry.json format:
+{
+  "templates": [
+    {"name": "FL ARNP initial", "state": "FL", "license_type": "ARNP", "app_type": "Initial",
+     "zones": {"0": [{"x1": 72, "y1": 120, "x2": 540, "y2": 170}]}},
+    {"name": "TX board renewal", "fingerprint": "3f2a...",
+     "zones": {"1": [{"x1": 72, "y1": 100, "x2": 540, "y2": 150}]}}
+  ]
+}
+
+Entries that omit state, license_type or app_type match any value there.
+Fingerprint entries win over name entries, and otherwise the entry that
+names the most of the three keys wins.
+
+Usage:
+    python zone_registry.py fingerprint form.pdf [...]   # print fingerprints to register
+    python zone_registry.py lookup form.pdf [...]        # show which entry each file uses
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from analyze_applications import parse_filename
+from pdf_clearer import iter_acroform_fields
+
+REGISTRY_NAME = "zone_registry.json"
+
+TEMPLATE_KEYS = ("state", "license_type", "app_type")
+
+# Loaded registries by resolved path, reloaded when the file's mtime changes
+_registries: Dict[str, Tuple[int, "ZoneRegistry"]] = {}
+
+
+def structural_fingerprint(doc: fitz.Document) -> str:
+    """
+    Fingerprint of a form's structure: page count, page sizes and the
+    AcroForm field names and types. It ignores page content and field
+    values, so every filled-in copy of a template shares it, including
+    copies whose typed answers were baked into the page.
+    Compute it before purging widgets.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"pages:{doc.page_count}\n".encode())
+    for page in doc:
+        rect = page.rect
+        digest.update(f"{round(rect.width)}x{round(rect.height)}\n".encode())
+    fields = sorted(f"{doc.xref_get_key(xref, 'T')[1]}:{field_type or ''}"
+                    for xref, field_type, _ in iter_acroform_fields(doc))
+    digest.update("\n".join(fields).encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def _valid_zones(zones) -> dict:
+    """Keep only well-formed pageIndex -> [rect] entries of a zones mapping."""
+    if not isinstance(zones, dict):
+        return {}
+    valid = {}
+    for page_index, rects in zones.items():
+        if not str(page_index).lstrip("-").isdigit() or not isinstance(rects, list):
+            continue
+        rects = [r for r in rects if isinstance(r, dict) and all(k in r for k in ("x1", "y1", "x2", "y2"))]
+        if rects:
+            valid[str(page_index)] = rects
+    return valid
+
+
+class ZoneRegistry:
+    """
+    Template -> zones lookup with in-memory caching. Resolving a
+    (state, license_type, app_type) key or a fingerprint scans the entries
+    once; every later file of the same template is a dict hit.
+    """
+
+    def __init__(self, templates: List[dict]):
+        self.by_fingerprint: Dict[str, dict] = {}
+        self.by_name: List[dict] = []
+        for entry in templates:
+            if not isinstance(entry, dict):
+                continue
+            entry = dict(entry, zones=_valid_zones(entry.get("zones")))
+            if entry.get("fingerprint"):
+                self.by_fingerprint[entry["fingerprint"]] = entry
+            elif any(entry.get(key) for key in TEMPLATE_KEYS):
+                self.by_name.append(entry)
+        self._name_cache: Dict[tuple, Optional[dict]] = {}
+        self._file_cache: Dict[str, tuple] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "ZoneRegistry":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        templates = data.get("templates") if isinstance(data, dict) else data
+        if not isinstance(templates, list):
+            raise ValueError(f"{path}: expected {{\"templates\": [...]}}")
+        return cls(templates)
+
+    def match_key(self, key: tuple) -> Optional[dict]:
+        """Most specific name entry matching a (state, license_type, app_type) key."""
+        if key not in self._name_cache:
+            best, best_score = None, 0
+            for entry in self.by_name:
+                score = 0
+                for value, name in zip(key, TEMPLATE_KEYS):
+                    wanted = entry.get(name)
+                    if wanted is None:
+                        continue
+                    if value is None or str(wanted).upper() != str(value).upper():
+                        score = -1
+                        break
+                    score += 1
+                if score > best_score:
+                    best, best_score = entry, score
+            self._name_cache[key] = best
+        return self._name_cache[key]
+
+    def match(self, filename: Optional[str] = None, doc: Optional[fitz.Document] = None) -> Optional[dict]:
+        """
+        Registry entry for a file: by structural fingerprint of doc when any
+        fingerprint entries exist, else by the template key parsed from
+        filename.
+        """
+        if doc is not None and self.by_fingerprint:
+            entry = self.by_fingerprint.get(structural_fingerprint(doc))
+            if entry:
+                return entry
+        if filename and self.by_name:
+            name = Path(filename).name
+            if name not in self._file_cache:
+                info = parse_filename(name)
+                self._file_cache[name] = tuple(info[key] for key in TEMPLATE_KEYS)
+            return self.match_key(self._file_cache[name])
+        return None
+
+    def zones_for(self, filename: Optional[str] = None, doc: Optional[fitz.Document] = None) -> dict:
+        """Zones (zones.json format) for a file, or {} if no template matches."""
+        entry = self.match(filename, doc)
+        return entry["zones"] if entry else {}
+
+
+def load_registry(path: str) -> ZoneRegistry:
+    """Load (or reuse) the registry at path; reloaded only when the file changes."""
+    resolved = str(Path(path).resolve())
+    mtime = os.stat(resolved).st_mtime_ns
+    cached = _registries.get(resolved)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    registry = ZoneRegistry.load(resolved)
+    _registries[resolved] = (mtime, registry)
+    return registry
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the template zone registry.")
+    parser.add_argument("command", choices=["fingerprint", "lookup"])
+    parser.add_argument("pdfs", nargs="+", help="PDF files")
+    parser.add_argument("-r", "--registry", default=REGISTRY_NAME,
+                        help=f"Registry file (default: {REGISTRY_NAME})")
+    args = parser.parse_args()
+
+    registry = load_registry(args.registry) if args.command == "lookup" else None
+    for pdf in args.pdfs:
+        with fitz.open(pdf) as doc:
+            if registry is None:
+                print(f"{structural_fingerprint(doc)}  {pdf}")
+                continue
+            entry = registry.match(pdf, doc)
+            if entry:
+                zones = sum(len(rects) for rects in entry["zones"].values())
+                print(f"{pdf}: {entry.get('name') or entry.get('fingerprint')} ({zones} zone(s))")
+            else:
+                print(f"{pdf}: no matching template")
+
+
+if __name__ == "__main__":
+    main()